@@ -8,26 +8,47 @@ CLI-gebruik:
   pmctl list              # overzicht alle projecten
   pmctl status [naam]     # gedetailleerde status
   pmctl start <naam>      # project opstarten
-  pmctl stop <naam>       # project stoppen
+  pmctl stop <naam> ...   # project(en) stoppen, parallel
   pmctl restart <naam>    # herstart
   pmctl logs <naam>       # logs bekijken
   pmctl disk              # schijfruimte overzicht
   pmctl deps <naam>       # dependencies tonen
+  pmctl tokens [naam]     # tokenverbruik per uur/dag
+  pmctl grep <patroon>    # zoeken in alle projectlogs
+  pmctl report [--since]  # resourcegebruik uit het metriekarchief
   pmctl web [--port 7777] # web dashboard
   pmctl add <naam> <pad>  # project toevoegen
   pmctl remove <naam>     # project verwijderen
+  pmctl config import     # projects.json naar SQLite (voor duizenden projecten)
 """
 
+import asyncio
+import base64
+import ctypes
+import gzip
+import heapq
+import http.client
 import json
 import os
 import re
+import select
+import shutil
+import socket
+import sqlite3
 import subprocess
 import sys
+import tempfile
 import time
 import threading
-from concurrent.futures import ThreadPoolExecutor
+import urllib.parse
+import zlib
+from array import array
+from contextlib import asynccontextmanager
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from collections import deque
+from typing import Optional, List, Dict, Any, Set, Iterable
 
 # ── Optionele imports ─────────────────────────────────────────────────────────
 try:
@@ -35,6 +56,11 @@ try:
 except ImportError:
     psutil = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 try:
     import typer
     from rich.console import Console
@@ -56,7 +82,7 @@ except ImportError:
 
 try:
     from fastapi import FastAPI, Request
-    from fastapi.responses import HTMLResponse, JSONResponse
+    from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
     from fastapi.middleware.cors import CORSMiddleware
     import uvicorn as _uvicorn
     HAS_FASTAPI = True
@@ -66,157 +92,1186 @@ except ImportError:
 # ── Config ────────────────────────────────────────────────────────────────────
 PMCTL_DIR = Path(__file__).parent.resolve()
 PROJECTS_FILE = PMCTL_DIR / "projects.json"
+STATE_DIR = PMCTL_DIR / ".pmctl"  # caches en runtime-toestand
+
+
+def _write_atomic(path: Path, data: str):
+    """
+    Schrijf via een uniek tijdelijk bestand naast `path` en os.replace: lezers zien
+    nooit een half bestand en CLI en webserver overschrijven elkaars tmp niet.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        mode = 0o644
+    f = tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False)
+    try:
+        with f:
+            os.fchmod(f.fileno(), mode)  # tempfile maakt 0600; rechten van het doel behouden
+            f.write(data)
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+
+class ConfigStore:
+    """
+    projects.json in het geheugen; alleen opnieuw geparsed als mtime, inode of grootte
+    verandert (één stat per aanroep). `version` telt elke herlading, zodat afgeleide
+    gegevens zoals de poortkaart per configversie berekend kunnen worden. Een half
+    geschreven bestand (ongeldige JSON) laat de vorige config staan.
+    """
+
+    def __init__(self, path: Path = PROJECTS_FILE):
+        self.path = path
+        self.version = 0
+        self._projects: Optional[Dict[str, Any]] = None
+        self._sig: Optional[tuple] = None
+        self._lock = threading.RLock()  # put/delete houden hem vast rond load() + save()
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            st = os.stat(self.path)
+            sig = (st.st_mtime_ns, st.st_ino, st.st_size)
+        except OSError:
+            sig = None
+        with self._lock:
+            if self._projects is None or sig != self._sig:
+                if sig is None:
+                    projects = {}
+                else:
+                    try:
+                        with open(self.path) as f:
+                            projects = json.load(f).get("projects", {})
+                    except ValueError:
+                        if self._projects is None:
+                            raise
+                        projects = self._projects  # volgende aanroep opnieuw proberen
+                        sig = self._sig
+                if projects is not self._projects:
+                    self._projects = projects
+                    self.version += 1
+                self._sig = sig
+            # Ondiepe kopie: toevoegen/verwijderen door de aanroeper raakt de cache niet
+            return dict(self._projects)
+
+    def save(self, projects: Dict[str, Any]):
+        with self._lock:
+            _write_atomic(self.path, json.dumps({"projects": projects}, indent=2))
+
+    # Dezelfde gerichte queries als SqliteConfigStore, hier gewoon op de volledige config
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.load().get(name)
+
+    def query(self, category: Optional[str] = None, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        projects = self.load()
+        if names is not None:
+            projects = {n: projects[n] for n in names if n in projects}
+        if category is not None:
+            projects = {n: p for n, p in projects.items() if p.get("category") == category}
+        return projects
+
+    def on_ports(self, ports: Set[int], services: Set[str]) -> Dict[str, Any]:
+        """Projecten met een van deze poorten of services in hun config."""
+        return {
+            n: p for n, p in self.load().items()
+            if ports.intersection(p.get("ports", [])) or services.intersection(p.get("services", []))
+        }
+
+    def put(self, name: str, project: Dict[str, Any]):
+        with self._lock:
+            projects = self.load()
+            projects[name] = project
+            self.save(projects)
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            projects = self.load()
+            if projects.pop(name, None) is None:
+                return False
+            self.save(projects)
+            return True
+
+
+PROJECTS_DB = PMCTL_DIR / "projects.db"
+
+
+class SqliteConfigStore:
+    """
+    Projectregister in SQLite (WAL) voor duizenden projecten. Eén rij per project met
+    de volledige config als JSON, met indexen op naam, categorie, pm2_name, service en
+    poort. Een wijziging raakt één rij in één transactie en verhoogt een globale revisie;
+    load() haalt alleen rijen op die sinds de vorige keer veranderden, en lezers wachten
+    nooit op schrijvers. Zelfde interface als ConfigStore. Actief zodra projects.db
+    bestaat (pmctl config import).
+    """
+
+    def __init__(self, path: Path = PROJECTS_DB):
+        self.path = path
+        self.version = 0
+        self._projects: Dict[str, Dict[str, Any]] = {}
+        self._rev = -1
+        self._lock = threading.Lock()
+        self._local = threading.local()  # één verbinding per thread
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS projects (
+                    name TEXT PRIMARY KEY, category TEXT, pm2_name TEXT, rev INTEGER NOT NULL, data TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS projects_category ON projects (category);
+                CREATE INDEX IF NOT EXISTS projects_pm2 ON projects (pm2_name);
+                CREATE INDEX IF NOT EXISTS projects_rev ON projects (rev);
+                CREATE TABLE IF NOT EXISTS project_ports (
+                    port INTEGER, name TEXT, PRIMARY KEY (port, name)) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS project_services (
+                    service TEXT, name TEXT, PRIMARY KEY (service, name)) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS removed (name TEXT PRIMARY KEY, rev INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+                INSERT OR IGNORE INTO meta VALUES ('rev', 0);
+            """)
+            self._local.db = db
+        return db
+
+    def load(self) -> Dict[str, Any]:
+        db = self._db()
+        db.execute("BEGIN")  # één consistente momentopname voor de revisie en de rijen
+        try:
+            rev = db.execute("SELECT value FROM meta WHERE key = 'rev'").fetchone()[0]
+            with self._lock:
+                if rev != self._rev:
+                    if self._rev < 0:
+                        rows = db.execute("SELECT name, data FROM projects ORDER BY rowid")
+                    else:
+                        rows = db.execute("SELECT name, data FROM projects WHERE rev > ? ORDER BY rowid", (self._rev,))
+                        for (name,) in db.execute("SELECT name FROM removed WHERE rev > ?", (self._rev,)).fetchall():
+                            self._projects.pop(name, None)
+                    for name, data in rows.fetchall():
+                        self._projects[name] = json.loads(data)
+                    self._rev = rev
+                    self.version += 1
+                return dict(self._projects)
+        finally:
+            db.execute("COMMIT")
+
+    def _rows(self, sql: str, args: tuple = ()) -> Dict[str, Any]:
+        return {name: json.loads(data) for name, data in self._db().execute(sql, args)}
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self._rows("SELECT name, data FROM projects WHERE name = ?", (name,)).get(name)
+
+    def query(self, category: Optional[str] = None, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        where, args = [], []
+        if category is not None:
+            where.append("category = ?")
+            args.append(category)
+        if names is not None:
+            where.append(f"name IN ({','.join('?' * len(names))})")
+            args += names
+        sql = "SELECT name, data FROM projects"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._rows(sql + " ORDER BY rowid", tuple(args))
+
+    def on_ports(self, ports: Set[int], services: Set[str]) -> Dict[str, Any]:
+        """Projecten met een van deze poorten of services in hun config (via de indexen)."""
+        return self._rows(f"""
+            SELECT name, data FROM projects WHERE name IN (
+                SELECT name FROM project_ports WHERE port IN ({','.join('?' * len(ports))})
+                UNION SELECT name FROM project_services WHERE service IN ({','.join('?' * len(services))}))
+        """, (*ports, *services))
+
+    def _write(self, db: sqlite3.Connection, rev: int, name: str, project: Dict[str, Any]):
+        db.execute("""
+            INSERT INTO projects (name, category, pm2_name, rev, data) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                category = excluded.category, pm2_name = excluded.pm2_name, rev = excluded.rev, data = excluded.data
+        """, (name, project.get("category"), project.get("pm2_name"), rev, json.dumps(project)))
+        db.execute("DELETE FROM project_ports WHERE name = ?", (name,))
+        db.execute("DELETE FROM project_services WHERE name = ?", (name,))
+        db.executemany("INSERT OR IGNORE INTO project_ports VALUES (?, ?)",
+                       [(port, name) for port in project.get("ports", [])])
+        db.executemany("INSERT OR IGNORE INTO project_services VALUES (?, ?)",
+                       [(svc, name) for svc in project.get("services", [])])
+        db.execute("DELETE FROM removed WHERE name = ?", (name,))
+
+    def _remove(self, db: sqlite3.Connection, rev: int, name: str) -> bool:
+        if not db.execute("DELETE FROM projects WHERE name = ?", (name,)).rowcount:
+            return False
+        db.execute("DELETE FROM project_ports WHERE name = ?", (name,))
+        db.execute("DELETE FROM project_services WHERE name = ?", (name,))
+        db.execute("INSERT OR REPLACE INTO removed VALUES (?, ?)", (name, rev))
+        return True
+
+    def _transaction(self, fn):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rev = db.execute("UPDATE meta SET value = value + 1 WHERE key = 'rev' RETURNING value").fetchone()[0]
+            result = fn(db, rev)
+            db.execute("COMMIT")
+            return result
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def put(self, name: str, project: Dict[str, Any]):
+        self._transaction(lambda db, rev: self._write(db, rev, name, project))
+
+    def delete(self, name: str) -> bool:
+        return self._transaction(lambda db, rev: self._remove(db, rev, name))
+
+    def save(self, projects: Dict[str, Any]):
+        """Hele set vervangen (import); alleen werkelijk gewijzigde rijen worden geschreven."""
+        def _sync(db: sqlite3.Connection, rev: int):
+            current = dict(db.execute("SELECT name, data FROM projects"))
+            for name in current.keys() - projects.keys():
+                self._remove(db, rev, name)
+            for name, project in projects.items():
+                if current.get(name) != json.dumps(project):
+                    self._write(db, rev, name, project)
+
+        self._transaction(_sync)
+
+
+config = SqliteConfigStore() if PROJECTS_DB.exists() else ConfigStore()
 
 
 def load_projects() -> Dict[str, Any]:
-    if not PROJECTS_FILE.exists():
-        return {}
-    with open(PROJECTS_FILE) as f:
-        return json.load(f).get("projects", {})
+    return config.load()
 
 
 def save_projects(projects: Dict[str, Any]):
-    with open(PROJECTS_FILE, "w") as f:
-        json.dump({"projects": projects}, f, indent=2)
+    config.save(projects)
 
 
 def get_project(name: str) -> Dict[str, Any]:
-    projects = load_projects()
-    if name not in projects:
+    project = config.get(name)
+    if project is None:
         console.print(f"[red]✗  Project '[bold]{name}[/]' niet gevonden.[/]")
         console.print("   Gebruik [bold cyan]pmctl list[/] voor een overzicht.")
         raise typer.Exit(1)
-    return projects[name]
+    return project
+
+
+# ── Hulpmiddelen ──────────────────────────────────────────────────────────────
+class _SingleFlight:
+    """Gelijktijdige aanvragen voor dezelfde sleutel delen één berekening."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, Dict[str, Any]] = {}
+
+    def do(self, key: Any, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+
+# ── PM2 integratie ────────────────────────────────────────────────────────────
+PM2_BIN = os.environ.get("PMCTL_PM2_BIN", "pm2")  # overschrijfbaar (bv. nep-pm2 in tests)
+PM2_CACHE_TTL = 5.0     # `pm2 jlist` start telkens Node.js: niet bij elke collectorronde
+PM2_RETRY_AFTER = 30.0  # zo lang niet opnieuw proberen als pm2 ontbreekt
+PM2_TIMEOUT = 30
+
+
+def _parse_jlist(out: str) -> List[Dict[str, Any]]:
+    """
+    De JSON-array uit `pm2 jlist`. pm2 zet soms eigen regels ervoor ("[PM2] Spawning
+    PM2 daemon ...") die ook met '[' beginnen; de array staat op de laatste regel die
+    als JSON-lijst te lezen is.
+    """
+    for line in reversed(out.splitlines()):
+        line = line.strip()
+        if not line.startswith("["):
+            continue
+        try:
+            apps = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(apps, list):
+            return apps
+    return []
+
+
+class PM2Adapter:
+    """
+    Toestand van alle PM2-processen via één `pm2 jlist` per refreshronde,
+    en acties voor meerdere apps in één pm2-aanroep.
+    """
+
+    def __init__(self, binary: str = PM2_BIN):
+        self.binary = binary
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._cache_time = 0.0
+        self._unavailable_until = 0.0
+        self._flight = _SingleFlight()
+
+    def jlist(self) -> Dict[str, Dict[str, Any]]:
+        """{pm2-naam: {pid, status, restarts, started_at, cpu, memory_mb}}; leeg als PM2 niet draait."""
+        now = time.time()
+        if now - self._cache_time < PM2_CACHE_TTL or now < self._unavailable_until:
+            return self._cache
+        return self._flight.do("jlist", self._fetch)
+
+    def available(self) -> bool:
+        """Of de pm2-binary te vinden is (en niet net onbereikbaar bleek)."""
+        return shutil.which(self.binary) is not None and time.time() >= self._unavailable_until
+
+    def _fetch(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            r = subprocess.run([self.binary, "jlist"], capture_output=True, text=True, timeout=PM2_TIMEOUT)
+        except (subprocess.TimeoutExpired, FileNotFoundError, PermissionError):
+            self._unavailable_until = time.time() + PM2_RETRY_AFTER
+            self._cache = {}
+            return self._cache
+        apps = _parse_jlist(r.stdout) if r.returncode == 0 else []
+
+        now = time.time()
+        result = {}
+        for app_info in apps:
+            env = app_info.get("pm2_env", {})
+            monit = app_info.get("monit", {})
+            online = env.get("status") == "online"
+            result[app_info.get("name")] = {
+                "pid": app_info.get("pid") or None,
+                "status": env.get("status", "unknown"),
+                "restarts": env.get("restart_time", 0),
+                "started_at": env["pm_uptime"] / 1000 if online and env.get("pm_uptime") else None,
+                "cpu": monit.get("cpu", 0),
+                "memory_mb": round(monit.get("memory", 0) / 1024 / 1024, 1),
+            }
+        self._cache = result
+        self._cache_time = now
+        return result
+
+    def action(self, action: str, names: List[str]) -> bool:
+        """Voer één pm2-actie uit voor alle namen tegelijk (start/stop/restart/delete)."""
+        if not names:
+            return True
+        if time.time() < self._unavailable_until:
+            return False  # binary ontbrak net nog: niet bij elke actie opnieuw proberen
+        try:
+            r = subprocess.run([self.binary, action, *names], capture_output=True, text=True, timeout=PM2_TIMEOUT)
+            return r.returncode == 0
+        except subprocess.TimeoutExpired:
+            return False
+        except (FileNotFoundError, PermissionError):
+            self._unavailable_until = time.time() + PM2_RETRY_AFTER
+            return False
+        finally:
+            self._cache_time = 0.0  # volgende jlist is vers
+
+
+pm2 = PM2Adapter()
+
+
+# ── Sessieregister ────────────────────────────────────────────────────────────
+SESSIONS_FILE = STATE_DIR / "sessions.json"
+SESSION_RESCAN = 10.0  # sessie periodiek opnieuw opmeten: vangt later geforkte processen
+
+
+def _session_pids(sid: int) -> List[int]:
+    """Alle PID's in een sessie; os.getsid is één syscall per proces, geen bestanden lezen."""
+    pids = []
+    for pid in psutil.pids():
+        try:
+            if os.getsid(pid) == sid:
+                pids.append(pid)
+        except OSError:
+            pass
+    return pids
+
+
+class SessionRegistry:
+    """
+    Sessies van door pmctl gestarte projecten: sessie-ID plus de leden (PID met
+    create_time, tegen hergebruik van PID's). Voor deze projecten is de status een
+    directe lookup; alleen elders gestarte projecten vragen een volledige scan op
+    cmdline en werkdirectory. Het bestand wordt gedeeld tussen CLI en webserver en
+    opnieuw ingelezen zodra het op schijf verandert.
+    """
+
+    def __init__(self, path: Path = SESSIONS_FILE):
+        self.path = path
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._mtime: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as f:
+                self._sessions = json.load(f)
+        except (OSError, ValueError):
+            self._sessions = {}
+        self._mtime = mtime
+
+    def _save(self):
+        try:
+            _write_atomic(self.path, json.dumps(self._sessions, separators=(",", ":")))
+            self._mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            pass
+
+    def record(self, name: str, sid: int) -> int:
+        """Leg de sessie van een net gestart project vast. Geeft het aantal leden."""
+        members = {}
+        for pid in _session_pids(sid):
+            try:
+                p = psutil.Process(pid)
+                if p.status() != psutil.STATUS_ZOMBIE:
+                    members[str(pid)] = p.create_time()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        with self._lock:
+            self._sync()
+            if members:
+                now = time.time()
+                self._sessions[name] = {"sid": sid, "members": members, "started_at": now, "scanned_at": now}
+            else:
+                # Script heeft zich volledig losgekoppeld → terug naar zoeken op patronen
+                self._sessions.pop(name, None)
+            self._save()
+        return len(members)
+
+    def forget(self, name: str):
+        with self._lock:
+            self._sync()
+            if self._sessions.pop(name, None) is not None:
+                self._save()
+
+    @staticmethod
+    def _verified(pid: int, create_time: float, sid: int):
+        try:
+            p = psutil.Process(pid)
+            if (abs(p.create_time() - create_time) < 0.01 and os.getsid(pid) == sid
+                    and p.status() != psutil.STATUS_ZOMBIE):
+                return p
+        except (psutil.NoSuchProcess, psutil.AccessDenied, OSError):
+            pass
+        return None
+
+    def lookup(self, name: str) -> Optional[Dict[int, Any]]:
+        """
+        Levende processen van de sessie van `name`, of None als pmctl dit project niet
+        (meer) kent. Verdwijnt een lid (of is de laatste meting ouder dan SESSION_RESCAN),
+        dan wordt de sessie opnieuw opgemeten; is de hele sessie weg, dan vervalt de
+        registratie.
+        """
+        with self._lock:
+            self._sync()
+            entry = self._sessions.get(name)
+            if not entry:
+                return None
+            sid, members = entry["sid"], entry["members"]
+            alive = {}
+            for pid, create_time in members.items():
+                p = self._verified(int(pid), create_time, sid)
+                if p:
+                    alive[p.pid] = p
+            fresh = time.time() - entry.get("scanned_at", 0) < SESSION_RESCAN
+            if fresh and len(alive) == len(members):
+                return alive
+
+            alive = {}
+            for pid in _session_pids(sid):
+                try:
+                    p = psutil.Process(pid)
+                    if p.status() != psutil.STATUS_ZOMBIE:
+                        alive[pid] = p
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            if alive:
+                before = entry["members"]
+                entry["members"] = {str(pid): p.create_time() for pid, p in alive.items()}
+                # Alleen het meetmoment is nieuw: in het geheugen houden, niet herschrijven
+                entry["scanned_at"] = time.time()
+                if entry["members"] != before:
+                    self._save()
+            else:
+                del self._sessions[name]
+                self._save()
+            return alive or None
+
+
+sessions = SessionRegistry()
 
 
 # ── Procesdetectie ────────────────────────────────────────────────────────────
-def find_processes(project: Dict) -> List:
-    """Vind alle processen die bij dit project horen."""
-    if not psutil:
-        return []
+class _PatternMatcher:
+    """
+    Aho–Corasick-automaat over de process_patterns van alle projecten.
+    Eén doorloop van een cmdline geeft alle projecten waarvan een patroon erin voorkomt.
+    """
 
-    found: Dict[int, Any] = {}
-    path = project.get("path", "")
-    ports = project.get("ports", [])
-    patterns = project.get("process_patterns", [])
+    def __init__(self, patterns: Dict[str, Set[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[str]] = [set()]
+
+        for pattern, owners in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                node = nxt
+            self._out[node] |= owners
+
+        # Faalverwijzingen breedte-eerst opbouwen
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def match(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return found
+
+
+class _PathTrie:
+    """Trie over padcomponenten: geeft alle projecten waarvan de map een voorouder van (of gelijk aan) een cwd is."""
+
+    def __init__(self, paths: Dict[str, str]):
+        self._root: Dict[str, Any] = {}
+        for name, path in paths.items():
+            node = self._root
+            for part in path.strip("/").split("/"):
+                if part:
+                    node = node.setdefault(part, {})
+            node.setdefault(None, set()).add(name)
+
+    def match(self, cwd: str) -> Set[str]:
+        if not cwd.startswith("/"):
+            return set()
+        found: Set[str] = set(self._root.get(None, ()))
+        node = self._root
+        for part in cwd.strip("/").split("/"):
+            if not part:
+                continue
+            node = node.get(part)
+            if node is None:
+                break
+            found |= node.get(None, set())
+        return found
+
+
+PROC_NET_TCP = ("/proc/net/tcp", "/proc/net/tcp6")
+_TCP_LISTEN = "0A"
+
+
+class ListenIndex:
+    """
+    Luisterende TCP-poorten rechtstreeks uit /proc/net/tcp{,6}: poort → socket-inodes.
+    Welke PID een socket bezit wordt pas opgezocht voor poorten waar om gevraagd wordt,
+    via /proc/<pid>/fd (stopt zodra alle sockets gevonden zijn). Zonder
+    leesbare /proc/net valt het terug op psutil.net_connections. Processen van andere
+    gebruikers zonder rechten blijven dan eigenaarloos, de poort telt wel als open.
+    """
 
-    # Via poort (meest betrouwbaar)
-    if ports:
+    def __init__(self):
+        self._inodes: Dict[int, Set[int]] = {}
+        self._pids: Dict[int, Set[int]] = {}  # alleen opgeloste poorten
+        if not self._read_proc():
+            self._read_psutil()
+
+    def _read_proc(self) -> bool:
+        found = False
+        for path in PROC_NET_TCP:
+            try:
+                f = open(path)
+            except OSError:
+                continue
+            found = True
+            with f:
+                next(f, None)  # kopregel
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 10 or parts[3] != _TCP_LISTEN:
+                        continue
+                    port = int(parts[1].rsplit(":", 1)[1], 16)
+                    self._inodes.setdefault(port, set()).add(int(parts[9]))
+        return found
+
+    def _read_psutil(self):
         try:
             for conn in psutil.net_connections(kind="inet"):
-                if conn.status == "LISTEN" and conn.laddr.port in ports and conn.pid:
-                    try:
-                        proc = psutil.Process(conn.pid)
-                        found[proc.pid] = proc
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        pass
+                if conn.status == "LISTEN" and conn.laddr:
+                    self._inodes.setdefault(conn.laddr.port, set())
+                    pids = self._pids.setdefault(conn.laddr.port, set())
+                    if conn.pid:
+                        pids.add(conn.pid)
         except (psutil.AccessDenied, PermissionError):
             pass
 
-    # Via process_patterns + werkdirectory (alleen als er patronen zijn)
-    if path and patterns:
-        # Exacte padgrens: /project of /project/...  maar NIET /project-other
-        path_norm = path.rstrip("/")
+    def __contains__(self, port: int) -> bool:
+        return port in self._inodes
+
+    def pids(self, ports: Iterable[int]) -> Dict[int, Set[int]]:
+        """PID's achter de luisterende sockets van `ports`."""
+        ports = [p for p in ports if p in self._inodes]
+        todo = {inode: port for port in ports if port not in self._pids for inode in self._inodes[port]}
+        for port in ports:
+            self._pids.setdefault(port, set())
+        if todo:
+            self._resolve(todo)
+        return {port: self._pids[port] for port in ports}
+
+    def _resolve(self, todo: Dict[int, int]):
+        for pid in psutil.pids():
+            fd_dir = f"/proc/{pid}/fd"
+            try:
+                fds = os.listdir(fd_dir)
+            except OSError:
+                continue
+            for fd in fds:
+                try:
+                    target = os.readlink(f"{fd_dir}/{fd}")
+                except OSError:
+                    continue
+                if target.startswith("socket:["):
+                    port = todo.pop(int(target[8:-1]), None)
+                    if port is not None:
+                        self._pids[port].add(pid)
+            if not todo:
+                break
+
+
+PROC_CACHE_TTL = 60.0    # handles die zo lang niet gezien zijn vervallen
+PROC_CACHE_SWEEP = 30.0
+
+
+class ProcessCache:
+    """
+    Langlevende psutil.Process-handles per (pid, create_time), over refreshes heen.
+    Omdat elke meting dezelfde handle gebruikt is cpu_percent(None) een echte delta
+    sinds de vorige meting, zonder te blokkeren. Handles van verdwenen of lang niet
+    geziene processen worden periodiek opgeruimd.
+    """
+
+    def __init__(self):
+        self._entries: Dict[tuple, List[Any]] = {}  # (pid, create_time) → [proc, laatst gezien, gemeten]
+        self._lock = threading.Lock()
+        self._swept = time.monotonic()
+
+    def adopt(self, proc):
+        """De vaste handle voor dit proces (`proc` zelf als het nieuw is)."""
+        key = (proc.pid, proc.create_time())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [proc, now, False]
+            else:
+                entry[1] = now
+            if now - self._swept > PROC_CACHE_SWEEP:
+                self._sweep(now)
+        return entry[0]
+
+    def _sweep(self, now: float):
+        self._swept = now
+        for key, entry in list(self._entries.items()):
+            if now - entry[1] > PROC_CACHE_TTL or not psutil.pid_exists(key[0]):
+                del self._entries[key]
+
+    def cpu_percent(self, proc, lifetime: bool = True) -> Optional[float]:
+        """
+        CPU% sinds de vorige meting. De eerste keer is er nog geen vorige meting;
+        dan het gemiddelde sinds de start van het proces (zoals ps dat toont), of
+        None met lifetime=False: de collector mag dat niet als meting boeken.
+        """
+        proc = self.adopt(proc)
+        key = (proc.pid, proc.create_time())
+        with self._lock:
+            entry = self._entries.get(key)
+            first = entry is not None and not entry[2]
+            if entry is not None:
+                entry[2] = True
+        if not first:
+            return proc.cpu_percent(None)
+        proc.cpu_percent(None)  # startpunt voor de volgende delta
+        if not lifetime:
+            return None
+        times = proc.cpu_times()
+        age = max(time.time() - proc.create_time(), 1e-3)
+        return (times.user + times.system) / age * 100
+
+
+proc_cache = ProcessCache()
+
+
+class SystemSnapshot:
+    """
+    Eén momentopname van alle processen en luisterende sockets.
+    Processen worden in één doorloop aan projecten toegewezen; alle projecten
+    van een refresh (list, status, dashboard) lezen uit dezelfde snapshot.
+    """
+
+    def __init__(self, projects: Dict[str, Any], resolve_ports: bool = True):
+        self.taken_at = time.time()
+        if resolve_ports:
+            self.ports: Dict[str, List[int]] = port_index(projects)["ports"]
+        else:
+            self.ports = {name: project.get("ports", []) for name, project in projects.items()}
+        # Luisterende sockets, alleen opgebouwd als een project poorten heeft
+        self.listening: Optional[ListenIndex] = None
+        self._procs: Dict[str, Dict[int, Any]] = {name: {} for name in projects}
+        # PM2 is de primaire statusbron voor projecten met een pm2_name
+        self.pm2: Dict[str, Dict[str, Any]] = {}
+        if any(p.get("pm2_name") for p in projects.values()):
+            apps = pm2.jlist()
+            self.pm2 = {
+                name: apps[p["pm2_name"]]
+                for name, p in projects.items() if p.get("pm2_name") in apps
+            }
+        if psutil:
+            self._collect(projects)
+
+    def _collect(self, projects: Dict[str, Any]):
+        for name, info in self.pm2.items():
+            if info["pid"] and info["status"] == "online":
+                try:
+                    self._procs[name][info["pid"]] = proc_cache.adopt(psutil.Process(info["pid"]))
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+
+        # Door pmctl gestart → sessie uit het register, geen scan nodig
+        known: Set[str] = set()
+        for name in projects:
+            if name in self.pm2:
+                continue
+            members = sessions.lookup(name)
+            if members is not None:
+                self._procs[name].update((pid, proc_cache.adopt(p)) for pid, p in members.items())
+                known.add(name)
+
+        wanted_ports: Dict[int, List[str]] = {}
+        for name, ports in self.ports.items():
+            for port in ports:
+                wanted_ports.setdefault(port, []).append(name)
+
+        # Luisterende sockets: één keer voor alle projecten
+        if wanted_ports:
+            self.listening = ListenIndex()
+            # Eigenaar alleen opzoeken voor poorten van projecten zonder bekende processen
+            unknown = [port for port, names in wanted_ports.items() if any(n not in known for n in names)]
+
+            # Via poort (meest betrouwbaar)
+            for port, pids in self.listening.pids(unknown).items():
+                for pid in pids:
+                    try:
+                        proc = proc_cache.adopt(psutil.Process(pid))
+                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                        continue
+                    for name in wanted_ports[port]:
+                        if name not in known:
+                            self._procs[name][pid] = proc
+
+        # Via process_patterns + werkdirectory (alleen projecten met patronen)
+        patterns: Dict[str, Set[str]] = {}
+        paths: Dict[str, str] = {}
+        for name, project in projects.items():
+            project_patterns = [p.lower() for p in project.get("process_patterns", []) if p]
+            if not project_patterns or name in known:
+                continue
+            for p in project_patterns:
+                patterns.setdefault(p, set()).add(name)
+            if project.get("path"):
+                paths[name] = project["path"].rstrip("/")
+        if not patterns:
+            return
+
+        matcher = _PatternMatcher(patterns)
+        trie = _PathTrie(paths)
         try:
             for proc in psutil.process_iter(["pid", "cwd", "cmdline", "name"]):
                 try:
-                    cwd = proc.info.get("cwd") or ""
                     cmdline = " ".join(proc.info.get("cmdline") or [])
-                    # Cwd moet exact in de projectmap zijn
-                    cwd_match = cwd == path_norm or cwd.startswith(path_norm + "/")
-                    # Cmdline moet een van de geconfigureerde patronen bevatten
-                    pattern_match = any(p.lower() in cmdline.lower() for p in patterns)
-                    if (cwd_match or pattern_match) and "pmctl" not in cmdline:
-                        found[proc.pid] = proc
+                    if "pmctl" in cmdline:
+                        continue
+                    # Exacte padgrens: /project of /project/...  maar NIET /project-other
+                    owners = trie.match(proc.info.get("cwd") or "")
+                    owners |= matcher.match(cmdline.lower())
+                    if owners:
+                        proc = proc_cache.adopt(proc)
+                    for name in owners:
+                        self._procs[name][proc.pid] = proc
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                     pass
         except (psutil.AccessDenied, PermissionError):
             pass
 
-    return list(found.values())
+    def processes(self, name: str) -> List:
+        return list(self._procs.get(name, {}).values())
 
+    def is_running(self, name: str) -> bool:
+        if name in self.pm2:
+            return self.pm2[name]["status"] == "online"
+        return bool(self._procs.get(name))
 
-def is_running(project: Dict) -> bool:
-    return len(find_processes(project)) > 0
+    def memory_mb(self, name: str) -> float:
+        total = 0.0
+        for p in self.processes(name):
+            try:
+                total += p.memory_info().rss / 1024 / 1024
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return total
 
+    def open_ports(self, name: str) -> List[int]:
+        if self.listening is None:
+            return []
+        return sorted(p for p in set(self.ports.get(name, [])) if p in self.listening)
 
-def get_memory_mb(project: Dict) -> float:
-    total = 0.0
-    for p in find_processes(project):
-        try:
-            total += p.memory_info().rss / 1024 / 1024
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-    return total
 
-
-def get_open_ports(project: Dict) -> List[int]:
+def find_processes(project: Dict, name: Optional[str] = None) -> List:
+    """Vind alle processen die bij dit project horen (met `name` eerst via het sessieregister)."""
     if not psutil:
         return []
-    ports = project.get("ports", [])
-    result = []
-    try:
-        for conn in psutil.net_connections(kind="inet"):
-            if conn.status == "LISTEN" and conn.laddr.port in ports:
-                result.append(conn.laddr.port)
-    except (psutil.AccessDenied, PermissionError):
-        pass
-    return sorted(set(result))
+    key = name or "_"
+    return SystemSnapshot({key: project}, resolve_ports=False).processes(key)
 
 
-def get_process_list(project: Dict) -> List[Dict]:
-    procs = find_processes(project)
-    result = []
-    for p in procs:
-        try:
-            info = {
-                "pid": p.pid,
-                "name": p.name(),
-                "cmdline": " ".join(p.cmdline() or [])[:80],
-                "memory_mb": round(p.memory_info().rss / 1024 / 1024, 1),
-                "cpu_percent": p.cpu_percent(interval=0.1),
-            }
-            result.append(info)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-    return result
+def is_running(project: Dict, name: Optional[str] = None) -> bool:
+    key = name or "_"
+    return SystemSnapshot({key: project}, resolve_ports=False).is_running(key)
 
 
 # ── Schijfruimte ──────────────────────────────────────────────────────────────
-def get_disk_usage(project: Dict) -> str:
+DISK_INDEX_FILE = STATE_DIR / "disk_index.json"
+# Bestanden in een map waarvan de mtime niet veranderde worden na deze tijd toch
+# opnieuw gemeten (een groeiend bestand verandert de mtime van de map niet)
+DISK_RESCAN_AFTER = 3600
+
+
+def _human_size(num: float) -> str:
+    """Grootte in het formaat van `du -h` (4.0K, 12M, 1.3G)."""
+    for unit in ("", "K", "M", "G", "T"):
+        if num < 1024 or unit == "T":
+            if not unit:
+                return str(int(num))
+            return f"{num:.1f}{unit}" if num < 10 else f"{num:.0f}{unit}"
+        num /= 1024
+    return "?"
+
+
+class DiskUsageIndex:
+    """
+    Incrementele schijfruimte-index op basis van os.scandir.
+    Per map worden (mtime, inode), de grootte van de eigen bestanden en de
+    submappen bewaard; alleen mappen waarvan de mtime veranderde worden opnieuw
+    gelezen. De index blijft bewaard tussen runs. Bestanden met meerdere hard
+    links (pnpm-store, .git/objects) tellen zoals bij `du` één keer per scan.
+    """
+
+    def __init__(self, path: Path = DISK_INDEX_FILE):
+        self.path = path
+        self._dirs: Optional[Dict[str, list]] = None
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def _load(self) -> Dict[str, list]:
+        with self._lock:
+            if self._dirs is None:
+                try:
+                    with open(self.path) as f:
+                        self._dirs = json.load(f)
+                except (OSError, ValueError):
+                    self._dirs = {}
+        return self._dirs
+
+    def save(self):
+        if not self._dirty:
+            return
+        with self._lock:
+            data = dict(self._dirs or {})
+            self._dirty = False
+        try:
+            _write_atomic(self.path, json.dumps(data, separators=(",", ":")))
+        except OSError:
+            pass
+
+    def scan(self, root: str) -> Dict[str, Any]:
+        """
+        Meet een projectmap. Geeft {"total": bytes, "files": bytes,
+        "breakdown": {submap: bytes}} met de eigen bestanden van de map apart.
+        """
+        dirs = self._load()
+        root = os.path.abspath(root)
+        seen: Set[str] = set()
+        inodes: Set[tuple] = set()  # (st_dev, st_ino) van hard links die al geteld zijn
+        try:
+            st = os.stat(root)
+        except OSError:
+            return {"total": 0, "files": 0, "breakdown": {}}
+
+        files, subdirs = self._dir_entry(root, st, seen, inodes)
+        breakdown = {}
+        for name in subdirs:
+            sub = os.path.join(root, name)
+            try:
+                breakdown[name] = self._walk(sub, os.lstat(sub), seen, inodes)
+            except OSError:
+                pass
+
+        # Verdwenen mappen onder deze root uit de index halen
+        prefix = root.rstrip("/") + "/"
+        stale = [p for p in dirs if p.startswith(prefix) and p not in seen]
+        if stale:
+            with self._lock:
+                for p in stale:
+                    dirs.pop(p, None)
+                self._dirty = True
+
+        return {"total": files + sum(breakdown.values()), "files": files, "breakdown": breakdown}
+
+    def _walk(self, path: str, st: os.stat_result, seen: Set[str], inodes: Set[tuple]) -> int:
+        total, subdirs = self._dir_entry(path, st, seen, inodes)
+        for name in subdirs:
+            sub = os.path.join(path, name)
+            try:
+                total += self._walk(sub, os.lstat(sub), seen, inodes)
+            except OSError:
+                pass
+        return total
+
+    def _dir_entry(self, path: str, st: os.stat_result, seen: Set[str], inodes: Set[tuple]):
+        """
+        Eigen bestandsgrootte (incl. de map zelf) en submappen, uit cache als de map
+        onveranderd is. Hard links worden apart bewaard en pas hier tegen `inodes` geteld.
+        """
+        seen.add(path)
+        entry = self._dirs.get(path)
+        if (entry and len(entry) == 6 and entry[0] == st.st_mtime_ns and entry[1] == st.st_ino
+                and time.time() - entry[4] < DISK_RESCAN_AFTER):
+            own, subdirs, links = entry[2], entry[3], entry[5]
+        else:
+            own = st.st_blocks * 512
+            subdirs, links = [], []
+            try:
+                with os.scandir(path) as it:
+                    for e in it:
+                        try:
+                            if e.is_dir(follow_symlinks=False):
+                                subdirs.append(e.name)
+                                continue
+                            fst = e.stat(follow_symlinks=False)
+                            if fst.st_nlink > 1:
+                                links.append([fst.st_dev, fst.st_ino, fst.st_blocks * 512])
+                            else:
+                                own += fst.st_blocks * 512
+                        except OSError:
+                            pass
+            except OSError:
+                pass
+            with self._lock:
+                self._dirs[path] = [st.st_mtime_ns, st.st_ino, own, subdirs, time.time(), links]
+                self._dirty = True
+
+        for dev, ino, size in links:
+            if (dev, ino) not in inodes:
+                inodes.add((dev, ino))
+                own += size
+        return own, subdirs
+
+
+disk_index = DiskUsageIndex()
+
+
+def get_disk_breakdown(project: Dict) -> Optional[Dict[str, Any]]:
     path = project.get("path", "")
     if not path or not Path(path).exists():
-        return "?"
-    try:
-        r = subprocess.run(
-            ["du", "-sh", path], capture_output=True, text=True, timeout=15
-        )
-        return r.stdout.split()[0] if r.stdout.strip() else "?"
-    except Exception:
-        return "?"
+        return None
+    usage = disk_index.scan(path)
+    disk_index.save()
+    return usage
+
+
+def get_disk_usage(project: Dict) -> str:
+    usage = get_disk_breakdown(project)
+    return _human_size(usage["total"]) if usage else "?"
 
 
 # ── Port Registry integratie ──────────────────────────────────────────────────
-REGISTRY_URL = "http://localhost:4444"
-_registry_cache: Dict = {}
-_registry_cache_time: float = 0
-CACHE_TTL = 5  # seconden
+REGISTRY_URL = os.environ.get("PMCTL_REGISTRY_URL", "http://localhost:4444")
+CACHE_TTL = 5  # seconden; daarna ververst een achtergrondthread
+REGISTRY_TIMEOUT = 2.0
+REGISTRY_BREAKER_FAILS = 3        # zoveel mislukte aanvragen op rij openen de breaker
+REGISTRY_BREAKER_COOLDOWN = 30.0  # zo lang een dood register niet opnieuw proberen
+
+
+class RegistryClient:
+    """
+    Client voor het centraal poortenregister: één keep-alive verbinding, gedeeld onder
+    een lock. Stale-while-revalidate: alleen de allereerste ophaalactie wacht, daarna
+    krijgt de aanroeper meteen de laatst bekende services en ververst een
+    achtergrondthread zodra CACHE_TTL verstreken is. Na REGISTRY_BREAKER_FAILS
+    netwerkfouten op rij gaat de circuit breaker open: het register wordt
+    REGISTRY_BREAKER_COOLDOWN seconden met rust gelaten, daarna mag één proefaanvraag door.
+    """
+
+    def __init__(self, url: str = REGISTRY_URL):
+        parts = urllib.parse.urlsplit(url)
+        self.url = url
+        self._host, self._port = parts.hostname or "localhost", parts.port or 80
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._conn_lock = threading.Lock()
+        self._services: Dict[str, Any] = {}
+        self.version = 0         # telt elke inhoudelijke wijziging van het register
+        self.fetched_at = 0.0    # laatste geslaagde ophaalactie
+        self.error: Optional[str] = None
+        self._checked_at = 0.0   # laatste poging, geslaagd of niet
+        self._failures = 0
+        self._open_until = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()  # kort vastgehouden, anders dan _conn_lock tijdens een aanvraag
+        self._flight = _SingleFlight()
+
+    @property
+    def breaker(self) -> str:
+        if self._failures < REGISTRY_BREAKER_FAILS:
+            return "closed"
+        return "open" if time.time() < self._open_until else "half-open"
+
+    @property
+    def online(self) -> bool:
+        return self.fetched_at > 0 and self.error is None
+
+    def _send(self, method: str, path: str, body: Optional[bytes]) -> Any:
+        headers = {"Accept": "application/json"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        with self._conn_lock:
+            while True:
+                reused = self._conn is not None
+                if not reused:
+                    self._conn = http.client.HTTPConnection(self._host, self._port, timeout=REGISTRY_TIMEOUT)
+                try:
+                    self._conn.request(method, path, body=body, headers=headers)
+                    r = self._conn.getresponse()
+                    payload = r.read()
+                except (OSError, http.client.HTTPException):
+                    self._conn.close()
+                    self._conn = None
+                    if reused:
+                        continue  # de server sloot de keep-alive verbinding: één keer vers opnieuw
+                    raise
+                if r.will_close:
+                    self._conn.close()
+                    self._conn = None
+                if r.status >= 400:
+                    raise ValueError(f"HTTP {r.status}")
+                return json.loads(payload)
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Eén aanvraag via de gedeelde verbinding. Netwerkfouten tellen mee voor de
+        breaker; een HTTP-fout (ValueError) betekent dat het register wel leeft.
+        """
+        if time.time() < self._open_until:
+            raise ConnectionError(f"register {self.url} overgeslagen (circuit breaker open)")
+        try:
+            result = self._send(method, path, json.dumps(body).encode() if body is not None else None)
+        except (OSError, http.client.HTTPException) as e:
+            self._failures += 1
+            self.error = str(e) or type(e).__name__
+            if self._failures >= REGISTRY_BREAKER_FAILS:
+                self._open_until = time.time() + REGISTRY_BREAKER_COOLDOWN
+            raise
+        self._failures = 0
+        self._open_until = 0.0
+        self.error = None
+        return result
+
+    def services(self) -> Dict[str, Any]:
+        """{service: {port, project, description, in_use}}; leeg als het register nooit bereikbaar was."""
+        if not self._checked_at:
+            self._flight.do("services", self._refresh)
+            return self._services
+        with self._lock:
+            stale = time.time() - self._checked_at >= CACHE_TTL and not self._refreshing
+            if stale:
+                self._refreshing = True  # precies één achtergrondverversing tegelijk
+        if stale:
+            threading.Thread(target=self._refresh, daemon=True, name="pmctl-registry").start()
+        return self._services
+
+    def _refresh(self):
+        try:
+            data = self.request("GET", "/ports")
+            if not isinstance(data, dict):
+                raise ValueError("onverwacht antwoord van het register")
+            if data != self._services:
+                self._services = data
+                self.version += 1
+            self.fetched_at = time.time()
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            self.error = str(e) or type(e).__name__  # laatst bekende services blijven staan
+        finally:
+            with self._lock:
+                self._checked_at = time.time()
+                self._refreshing = False
+
+    def invalidate(self):
+        """Volgende services() ververst (op de achtergrond), bv. na het aanvragen van een poort."""
+        if self._checked_at:
+            self._checked_at -= CACHE_TTL
+
+
+port_registry = RegistryClient()
 
 
 def fetch_registry() -> Dict:
-    """Haal alle services op uit het centraal register (gecached)."""
-    global _registry_cache, _registry_cache_time
-    now = time.time()
-    if now - _registry_cache_time < CACHE_TTL and _registry_cache:
-        return _registry_cache
-    try:
-        import urllib.request as _ur
-        with _ur.urlopen(f"{REGISTRY_URL}/ports", timeout=2) as r:
-            _registry_cache = json.loads(r.read())
-            _registry_cache_time = now
-            return _registry_cache
-    except Exception:
-        return _registry_cache  # verouderde cache of leeg
+    """Alle services uit het centraal register (laatst bekende stand, blokkeert niet)."""
+    return port_registry.services()
 
 
 def resolve_project_ports(project: Dict) -> List[int]:
@@ -237,33 +1292,64 @@ def resolve_project_ports(project: Dict) -> List[int]:
     return ports
 
 
+_port_index: Optional[tuple] = None  # (sleutel, projects, index)
+
+
+def port_index(projects: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Poorten per project ("ports"), projecten per poort ("by_port") en conflicten
+    ("conflicts"), één keer berekend per registerversie en set projectconfigs.
+    De config-dicts zelf zijn de sleutel: de ConfigStore geeft dezelfde objecten
+    terug tot projects.json verandert.
+    """
+    global _port_index
+    fetch_registry()  # ververst het register (en zijn versie) als de TTL verstreken is
+    key = (port_registry.version, tuple((name, id(p)) for name, p in projects.items()))
+    cached = _port_index
+    if cached is not None and cached[0] == key:
+        return cached[2]
+
+    index = _build_port_index(projects)
+    # `projects` meebewaren houdt de id()'s in de sleutel geldig
+    _port_index = (key, projects, index)
+    return index
+
+
+def _build_port_index(projects: Dict[str, Any]) -> Dict[str, Any]:
+    ports = {name: resolve_project_ports(project) for name, project in projects.items()}
+    by_port: Dict[int, List[str]] = {}
+    for name, project_ports in ports.items():
+        for port in project_ports:
+            names = by_port.setdefault(port, [])
+            if name not in names:
+                names.append(name)
+    return {
+        "ports": ports,
+        "by_port": by_port,
+        "conflicts": {port: names for port, names in by_port.items() if len(names) > 1},
+    }
+
+
 def get_port_conflicts(projects: Dict) -> Dict[int, List[str]]:
     """
     Detecteer poortconflicten via het register (als actief),
     anders via hardcoded ports in projects.json.
     """
-    registry = fetch_registry()
-    port_map: Dict[int, List[str]] = {}
+    return port_index(projects)["conflicts"]
 
-    for name, project in projects.items():
-        ports = resolve_project_ports(project)
-        for port in ports:
-            port_map.setdefault(port, []).append(name)
 
-    # Controleer ook register op conflicten (meerdere services, zelfde project kan OK zijn)
-    if registry:
-        svc_by_port: Dict[int, List[str]] = {}
-        for svc, info in registry.items():
-            p = info["port"]
-            proj = info.get("project", "?")
-            svc_by_port.setdefault(p, []).append(proj)
-        for port, projs in svc_by_port.items():
-            if len(set(projs)) > 1:  # twee VERSCHILLENDE projecten, zelfde poort
-                for name, project in projects.items():
-                    if port in resolve_project_ports(project):
-                        port_map.setdefault(port, []).append(name)
-
-    return {port: list(set(names)) for port, names in port_map.items() if len(set(names)) > 1}
+def get_port_conflicts_for(targets: Dict[str, Any]) -> Dict[int, List[str]]:
+    """
+    Poortconflicten van alleen `targets`, zonder de hele config te laden: er worden
+    alleen projecten bij gehaald die dezelfde poorten of (register)services hebben.
+    """
+    ports = {port for project in targets.values() for port in resolve_project_ports(project)}
+    if not ports:
+        return {}
+    services = {svc for svc, info in fetch_registry().items() if info.get("port") in ports}
+    related = {**config.on_ports(ports, services), **targets}
+    conflicts = _build_port_index(related)["conflicts"]
+    return {port: names for port, names in conflicts.items() if port in ports}
 
 
 # ── Token Usage uit logs ──────────────────────────────────────────────────────
@@ -278,34 +1364,318 @@ TOKEN_PATTERNS = [
 ]
 
 
-def parse_token_usage(project: Dict) -> int:
+# Tijdstempel aan het begin van een logregel (ISO 8601 / "2024-01-31 12:00:00,123")
+_LINE_TS_RE = re.compile(
+    r"(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})(?:[.,](\d{1,6}))?\s?(Z|[+-]\d{2}:?\d{2})?"
+)
+
+
+def _line_timestamp(line: str) -> Optional[float]:
+    """Epoch-tijd van de tijdstempel vooraan een logregel, of None."""
+    m = _LINE_TS_RE.search(line, 0, 64)
+    if not m:
+        return None
+    date, clock, frac, tz = m.groups()
+    iso = f"{date}T{clock}"
+    if frac:
+        iso += "." + frac.ljust(6, "0")
+    if tz:
+        iso += "+00:00" if tz == "Z" else (tz if ":" in tz else f"{tz[:3]}:{tz[3:]}")
+    try:
+        dt = datetime.fromisoformat(iso)
+    except ValueError:
+        return None
+    return dt.timestamp()  # naïeve tijd = lokale tijd
+
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def _parse_duration(text: str) -> int:
+    """'90s', '15m', '24h', '7d', '2w' → seconden."""
+    m = re.fullmatch(r"\s*(\d+)\s*([smhdw]?)\s*", text or "")
+    if not m:
+        raise ValueError(f"ongeldige duur: {text!r} (gebruik bv. 15m, 24h, 7d)")
+    return int(m.group(1)) * _DURATION_UNITS[m.group(2) or "s"]
+
+
+# Eén gecombineerd patroon; groep i+1 hoort bij TOKEN_PATTERNS[i]
+_TOKEN_RE = re.compile("|".join(f"(?:{p})" for p in TOKEN_PATTERNS))
+TOKEN_STATE_FILE = STATE_DIR / "token_offsets.json"
+_TOKEN_CHUNK = 1024 * 1024
+_TOKEN_MAX_CARRY = 64 * 1024  # langere regels zonder newline worden weggegooid
+
+
+def _log_names(project: Dict) -> List[str]:
+    """Geconfigureerde log_files, anders alle *.log in de projectmap (relatief)."""
     path = project.get("path", "")
     if not path:
-        return 0
-
-    total = 0
+        return []
     log_files = project.get("log_files", [])
-    search_paths = [Path(path) / lf for lf in log_files]
-    if not search_paths:
-        search_paths = list(Path(path).glob("*.log"))
+    if not log_files:
+        log_files = [str(p.relative_to(path)) for p in Path(path).glob("*.log")]
+    return log_files
 
-    for log_path in search_paths:
-        if not log_path.exists():
-            continue
+
+def _log_paths(project: Dict) -> List[Path]:
+    return [Path(project["path"]) / lf for lf in _log_names(project)]
+
+
+LOG_HEAD_BYTES = 4096  # vingerafdruk van het begin van een log
+
+
+def _head_crc(path: Path, length: int) -> Optional[int]:
+    """
+    crc32 van de eerste min(length, LOG_HEAD_BYTES) bytes. Verandert die bij gelijke
+    inode, dan is het log afgekapt en weer aangegroeid (copytruncate): de bewaarde
+    offset klopt dan niet meer, ook al is het bestand niet kleiner geworden.
+    """
+    try:
+        with open(path, "rb") as f:
+            return zlib.crc32(f.read(min(length, LOG_HEAD_BYTES)))
+    except OSError:
+        return None
+
+
+def _head_changed(path: Path, offset: int, head: Optional[int]) -> bool:
+    """True als het begin van het log niet meer past bij de vingerafdruk `head`."""
+    if head is None:
+        return False  # (nog) geen vingerafdruk, bv. state van een oudere versie
+    current = _head_crc(path, offset)
+    return current is not None and current != head
+
+
+class TokenUsageTracker:
+    """
+    Incrementele token-teller per logbestand.
+    Bewaart per bestand offset, inode, onvolledige laatste regel en exacte
+    cumulatieve tellingen per patroon; elke aanroep leest alleen nieuwe bytes.
+    Rotatie (andere inode) en truncatie (kleiner dan offset of ander begin, zie
+    _head_crc) beginnen opnieuw vanaf het begin van het bestand, zonder de
+    totalen kwijt te raken.
+    """
+
+    def __init__(self, path: Path = TOKEN_STATE_FILE):
+        self.path = path
+        self._files: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._files is None:
+            try:
+                with open(self.path) as f:
+                    self._files = json.load(f)
+            except (OSError, ValueError):
+                self._files = {}
+        return self._files
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._files, separators=(",", ":"))
+            self._dirty = False
         try:
-            with open(log_path, "r", errors="ignore") as f:
-                f.seek(0, 2)
-                size = f.tell()
-                f.seek(max(0, size - 150 * 1024))
-                content = f.read()
-            for pattern in TOKEN_PATTERNS:
-                matches = re.findall(pattern, content)
-                if matches:
-                    total += sum(int(m) for m in matches[-100:])
-                    break
-        except Exception:
+            _write_atomic(self.path, data)
+        except OSError:
             pass
 
+    def update(self, log_path: Path, series_name: Optional[str] = None) -> int:
+        """
+        Lees nieuwe bytes van één logbestand en geef het cumulatieve totaal.
+        Met series_name worden de nieuw gevonden tokens ook in token_series geboekt.
+        """
+        key = str(log_path)
+        with self._lock:
+            files = self._load()
+            state = files.get(key)
+            try:
+                st = os.stat(log_path)
+            except OSError:
+                return self._total(state) if state else 0
+
+            # Eerste scan van een bestaand log: regels zonder tijdstip zijn oud, niet "nu"
+            backfill = state is None
+            if state is None:
+                state = files[key] = {"inode": st.st_ino, "offset": 0, "carry": "", "head": None,
+                                      "counts": [0] * len(TOKEN_PATTERNS)}
+            elif (state["inode"] != st.st_ino or st.st_size < state["offset"]
+                    or _head_changed(log_path, state["offset"], state.get("head"))):
+                # Geroteerd of afgekapt (ook als het daarna weer voorbij de offset groeide)
+                state.update(inode=st.st_ino, offset=0, carry="", head=None)
+                self._dirty = True
+
+            if st.st_size > state["offset"]:
+                events = self._scan(log_path, state, backfill)
+                state["head"] = _head_crc(log_path, state["offset"])
+                self._dirty = True
+                if series_name:
+                    effective = self._effective(state)
+                    for idx, ts, value in events:
+                        if idx == effective and ts is not None:
+                            token_series.record(series_name, ts, value)
+            return self._total(state)
+
+    def _scan(self, log_path: Path, state: Dict[str, Any], backfill: bool = False) -> List[tuple]:
+        """
+        Verwerk de nieuwe bytes; geeft (patroon, tijdstip, tokens) per treffer. Een
+        treffer zonder tijdstip in de regel krijgt "nu", behalve bij backfill: dan
+        None (alleen het totaal telt mee, niet de tijdreeks).
+        """
+        now = None if backfill else time.time()
+        events = []
+        counts = state["counts"]
+        carry = state["carry"].encode("latin-1")
+        try:
+            with open(log_path, "rb") as f:
+                f.seek(state["offset"])
+                while True:
+                    chunk = f.read(_TOKEN_CHUNK)
+                    if not chunk:
+                        break
+                    state["offset"] += len(chunk)
+                    data = carry + chunk
+                    cut = data.rfind(b"\n") + 1
+                    carry = data[cut:]
+                    if len(carry) > _TOKEN_MAX_CARRY:
+                        carry = b""
+                    text = data[:cut].decode("utf-8", "ignore")
+                    for m in _TOKEN_RE.finditer(text):
+                        idx, value = m.lastindex - 1, int(m.group(m.lastindex))
+                        counts[idx] += value
+                        line_start = text.rfind("\n", 0, m.start()) + 1
+                        events.append((idx, _line_timestamp(text[line_start:line_start + 64]) or now, value))
+        except OSError:
+            pass
+        state["carry"] = carry.decode("latin-1")
+        return events
+
+    @staticmethod
+    def _effective(state: Dict[str, Any]) -> Optional[int]:
+        # Zelfde voorrang als TOKEN_PATTERNS: het eerste patroon dat voorkomt telt
+        for idx, count in enumerate(state["counts"]):
+            if count:
+                return idx
+        return None
+
+    @classmethod
+    def _total(cls, state: Dict[str, Any]) -> int:
+        idx = cls._effective(state)
+        return state["counts"][idx] if idx is not None else 0
+
+
+# ── Token-tijdreeks ───────────────────────────────────────────────────────────
+TOKEN_SERIES_FILE = STATE_DIR / "token_series.json"
+TOKEN_MINUTE_RETENTION = 2 * 86400     # minuutbuckets: 48 uur
+TOKEN_HOUR_RETENTION = 400 * 86400     # uurbuckets: ruim een jaar
+TOKEN_RATE_WINDOW = 15 * 60            # venster voor het huidige verbruik
+
+
+class TokenSeries:
+    """
+    Tokenverbruik per project in vaste tijdbuckets (per minuut en per uur),
+    in het geheugen en bewaard op schijf. Queries lezen alleen de buckets.
+    """
+
+    def __init__(self, path: Path = TOKEN_SERIES_FILE):
+        self.path = path
+        self._data: Optional[Dict[str, Dict[str, Dict[int, int]]]] = None
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict[str, Dict[int, int]]]:
+        if self._data is None:
+            try:
+                with open(self.path) as f:
+                    raw = json.load(f)
+                self._data = {
+                    name: {tier: {int(t): n for t, n in buckets.items()} for tier, buckets in tiers.items()}
+                    for name, tiers in raw.items()
+                }
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def record(self, name: str, ts: float, tokens: int):
+        now = time.time()
+        with self._lock:
+            tiers = self._load().setdefault(name, {"m": {}, "h": {}})
+            if now - ts < TOKEN_MINUTE_RETENTION:
+                minute = int(ts // 60 * 60)
+                tiers["m"][minute] = tiers["m"].get(minute, 0) + tokens
+            if now - ts < TOKEN_HOUR_RETENTION:
+                hour = int(ts // 3600 * 3600)
+                tiers["h"][hour] = tiers["h"].get(hour, 0) + tokens
+            self._dirty = True
+
+    def save(self):
+        now = time.time()
+        with self._lock:
+            if not self._dirty:
+                return
+            # Verlopen buckets opruimen vóór het wegschrijven
+            for tiers in self._data.values():
+                for tier, keep in (("m", TOKEN_MINUTE_RETENTION), ("h", TOKEN_HOUR_RETENTION)):
+                    buckets = tiers[tier]
+                    for t in [t for t in buckets if now - t >= keep]:
+                        del buckets[t]
+            data = json.dumps(self._data, separators=(",", ":"))
+            self._dirty = False
+        try:
+            _write_atomic(self.path, data)
+        except OSError:
+            pass
+
+    @staticmethod
+    def tier(range_s: float, step: int) -> str:
+        """
+        Uurbuckets ("h") voor stappen van hele uren, anders minuten ("m"). Minuutbuckets
+        bestaan maar TOKEN_MINUTE_RETENTION lang: verder terug met kleinere stappen
+        zou stilzwijgend nullen geven, dus ValueError.
+        """
+        step = max(60, step // 60 * 60)
+        if step % 3600 == 0:
+            return "h"
+        if range_s > TOKEN_MINUTE_RETENTION:
+            raise ValueError(f"stappen kleiner dan een uur gaan maar {TOKEN_MINUTE_RETENTION // 3600} uur terug; "
+                             f"gebruik een stap van hele uren of een kortere periode")
+        return "m"
+
+    def query(self, name: str, since: float, until: Optional[float] = None, step: int = 3600) -> List[Dict[str, int]]:
+        """Tokens per stap (seconden, veelvoud van 60) tussen since en until; zie tier()."""
+        until = until or time.time()
+        tier = self.tier(until - since, step)
+        step = max(60, step // 60 * 60)
+        with self._lock:
+            tiers = self._load().get(name, {"m": {}, "h": {}})
+            buckets = dict(tiers[tier])
+
+        start = int(since // step * step)
+        points = {t: 0 for t in range(start, int(until) + 1, step)}
+        for t, n in buckets.items():
+            slot = int(t // step * step)
+            if slot in points:
+                points[slot] += n
+        return [{"t": t, "tokens": n} for t, n in points.items()]
+
+    def rate_per_hour(self, name: str) -> float:
+        """Huidig verbruik: tokens in het laatste TOKEN_RATE_WINDOW, omgerekend naar per uur."""
+        cutoff = time.time() - TOKEN_RATE_WINDOW
+        with self._lock:
+            minutes = self._load().get(name, {}).get("m", {})
+            recent = sum(n for t, n in minutes.items() if t >= cutoff)
+        return recent * 3600 / TOKEN_RATE_WINDOW
+
+
+token_tracker = TokenUsageTracker()
+token_series = TokenSeries()
+
+
+def parse_token_usage(project: Dict, name: Optional[str] = None) -> int:
+    total = sum(token_tracker.update(p, series_name=name) for p in _log_paths(project))
+    token_tracker.save()
+    token_series.save()
     return total
 
 
@@ -352,105 +1722,255 @@ def get_dependencies(project: Dict) -> Dict[str, List[str]]:
 
 
 # ── Gecombineerde projectinfo ─────────────────────────────────────────────────
-def get_project_info(name: str, project: Dict, include_disk: bool = True) -> Dict[str, Any]:
-    # Poorten live uit register (of fallback hardcoded)
-    ports = resolve_project_ports(project)
-    # Zet ook terug in project zodat find_processes ze gebruikt
-    project = {**project, "ports": ports}
+def _static_info(name: str, project: Dict) -> Dict[str, Any]:
+    """Velden die rechtstreeks uit projects.json komen."""
+    return {
+        "name": name,
+        "description": project.get("description", ""),
+        "tech": project.get("tech", ""),
+        "path": project.get("path", ""),
+        "category": project.get("category", ""),
+        "relations": project.get("relations", []),
+        "start_script": project.get("start_script"),
+        "notes": project.get("notes", ""),
+        "log_files": project.get("log_files", []),
+        "pm2_name": project.get("pm2_name"),
+    }
+
 
-    # Eén keer processen ophalen en hergebruiken
-    procs = find_processes(project)
-    running = len(procs) > 0
+def _runtime_info(
+    name: str,
+    snapshot: SystemSnapshot,
+    conflicts: Dict[int, List[str]],
+    with_processes: bool = True,
+    cpu_lifetime: bool = True,
+) -> Dict[str, Any]:
+    """
+    Goedkope runtimevelden (status, geheugen, cpu, poorten) uit een snapshot. De
+    proceslijst (naam en cmdline per proces) alleen met with_processes. Zonder
+    cpu_lifetime is cpu_percent None zolang een proces nog niet echt gemeten is.
+    """
+    # Poorten live uit register (of fallback hardcoded)
+    ports = snapshot.ports.get(name, [])
+    procs = snapshot.processes(name)
 
     # Geheugen en CPU uit al opgehaalde processen
     mem_mb = 0.0
-    cpu_percent = 0.0
+    cpu_percent: Optional[float] = 0.0
     proc_list = []
     for p in procs:
         try:
             mem = p.memory_info().rss / 1024 / 1024
             mem_mb += mem
-            # Eerste call geeft 0.0, we gebruiken een kort interval voor een live-indicatie
-            cpu = p.cpu_percent(interval=None) 
-            cpu_percent += cpu
-            
+            cpu = proc_cache.cpu_percent(p, cpu_lifetime)
+            cpu_percent = None if cpu is None or cpu_percent is None else cpu_percent + cpu
+            if not with_processes:
+                continue
             proc_list.append({
                 "pid": p.pid,
                 "name": p.name(),
                 "cmdline": " ".join(p.cmdline() or [])[:80],
                 "memory_mb": round(mem, 1),
-                "cpu_percent": round(cpu, 1),
+                "cpu_percent": round(cpu, 1) if cpu is not None else None,
             })
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             pass
 
-    # Open poorten
-    open_ports = []
-    if psutil and ports:
-        try:
-            for conn in psutil.net_connections(kind="inet"):
-                if conn.status == "LISTEN" and conn.laddr.port in ports:
-                    open_ports.append(conn.laddr.port)
-        except (psutil.AccessDenied, PermissionError):
-            pass
-
-    # Poortconflicten
-    all_projects = load_projects()
-    conflicts = get_port_conflicts(all_projects)
-    conflicting_ports = {p: conflicts[p] for p in ports if p in conflicts}
-
-    return {
-        "name": name,
-        "description": project.get("description", ""),
-        "tech": project.get("tech", ""),
-        "path": project.get("path", ""),
-        "category": project.get("category", ""),
-        "status": "running" if running else "stopped",
+    info = {
+        "status": "running" if snapshot.is_running(name) else "stopped",
+        # Alleen stabiele PM2-velden; cpu/geheugen komen uit de procesmeting
+        "pm2": {k: v for k, v in snapshot.pm2[name].items() if k in ("pid", "status", "restarts", "started_at")}
+        if name in snapshot.pm2 else None,
         "ports": ports,
-        "open_ports": sorted(set(open_ports)),
+        "open_ports": snapshot.open_ports(name),
         "memory_mb": round(mem_mb, 1),
-        "cpu_percent": round(cpu_percent, 1),
+        "cpu_percent": round(cpu_percent, 1) if cpu_percent is not None else None,
+        "pid_count": len(procs),
+        "port_conflicts": {p: conflicts[p] for p in ports if p in conflicts},
+    }
+    if with_processes:
+        info["processes"] = proc_list
+    return info
+
+
+def get_project_info(
+    name: str,
+    project: Dict,
+    include_disk: bool = True,
+    snapshot: Optional[SystemSnapshot] = None,
+    conflicts: Optional[Dict[int, List[str]]] = None,
+) -> Dict[str, Any]:
+    # Eén snapshot hergebruiken als de aanroeper die al heeft (list/status/dashboard)
+    if snapshot is None:
+        snapshot = SystemSnapshot({name: project})
+    if conflicts is None:
+        conflicts = get_port_conflicts_for({name: project})
+    # Ook de opgeloste poorten doorgeven aan de helpers
+    project = {**project, "ports": snapshot.ports.get(name, [])}
+
+    return {
+        **_static_info(name, project),
+        **_runtime_info(name, snapshot, conflicts),
         "disk_usage": get_disk_usage(project) if include_disk else "...",
-        "token_usage": parse_token_usage(project),
-        "relations": project.get("relations", []),
+        "token_usage": parse_token_usage(project, name),
         "dependencies": get_dependencies(project),
-        "start_script": project.get("start_script"),
-        "notes": project.get("notes", ""),
-        "log_files": project.get("log_files", []),
-        "processes": proc_list,
-        "pid_count": len(procs),
-        "port_conflicts": conflicting_ports,
-        "pm2_name": project.get("pm2_name"),
     }
 
 
 # ── Start / Stop ──────────────────────────────────────────────────────────────
 def pm2_action(pm2_name: str, action: str) -> bool:
     """Voer een PM2-actie uit (start/stop/restart/status)."""
+    return pm2.action(action, [pm2_name])
+
+
+# Gereedheid na het starten; per project te overschrijven met "readiness" in projects.json:
+#   {"timeout": 30, "ports": [8001], "process_patterns": ["uvicorn"], "log_pattern": "Application startup complete"}
+READY_TIMEOUT = 12.0
+READY_BACKOFF_MIN = 0.05
+READY_BACKOFF_MAX = 0.5
+READY_MIN_ALIVE = 0.5  # zonder criteria: gereed als het script zo lang overleeft
+
+
+def _port_open(port: int) -> bool:
     try:
-        r = subprocess.run(
-            ["pm2", action, pm2_name],
-            capture_output=True, text=True, timeout=15
-        )
-        return r.returncode == 0
-    except (subprocess.TimeoutExpired, FileNotFoundError):
+        with socket.create_connection(("localhost", port), timeout=0.2):
+            return True
+    except OSError:
         return False
 
 
+def _session_processes(proc: subprocess.Popen) -> List:
+    """Het gestarte script en al zijn (klein)kinderen."""
+    if not psutil:
+        return []
+    try:
+        root = psutil.Process(proc.pid)
+        return [root] + root.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return []
+
+
+def _wait_exit(proc: subprocess.Popen, pidfd: Optional[int], timeout: float):
+    """Wacht tot `timeout` verstreken is of het script eindigt (wat eerst komt)."""
+    if pidfd is not None:
+        select.select([pidfd], [], [], timeout)
+        return
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        pass
+
+
+def wait_until_ready(project: Dict, proc: subprocess.Popen, ports: List[int]) -> Dict[str, Any]:
+    """
+    Wacht tot een net gestart project gereed is: verwachte poorten open, een proces
+    uit de gestarte sessie dat op de patronen past en/of een regel in de logs.
+    Reageert direct op het eindigen van het script (pidfd) en controleert verder met
+    exponentiële backoff. Geeft {"ready", "latency", "exit_code", "pending", "processes"}.
+    """
+    cfg = project.get("readiness") or {}
+    timeout = float(cfg.get("timeout", READY_TIMEOUT))
+    pending_ports = set(cfg.get("ports", ports))
+    patterns = [p.lower() for p in cfg.get("process_patterns", project.get("process_patterns", [])) if p]
+    log_re = re.compile(cfg["log_pattern"]) if cfg.get("log_pattern") else None
+    follower = None
+    if log_re:
+        follower = LogFollower({lf: Path(project["path"]) / lf for lf in _log_names(project)})
+    need_process = bool(patterns)
+    need_log = log_re is not None
+    criteria = bool(pending_ports) or need_process or need_log
+
+    try:
+        pidfd = os.pidfd_open(proc.pid)
+    except (AttributeError, OSError):
+        pidfd = None
+
+    t0 = time.monotonic()
+    deadline = t0 + timeout
+    delay = READY_BACKOFF_MIN
+    procs: List = []
+    try:
+        while True:
+            exit_code = proc.poll()
+            if exit_code not in (None, 0):
+                break
+
+            procs = _session_processes(proc)
+            if not procs and exit_code == 0:
+                # Script is klaar en heeft zijn processen losgekoppeld → projectbreed zoeken
+                procs = find_processes(project)
+            if pending_ports:
+                pending_ports = {p for p in pending_ports if not _port_open(p)}
+            if need_process:
+                for p in procs:
+                    try:
+                        cmdline = " ".join(p.cmdline()).lower()
+                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                        continue
+                    if "pmctl" not in cmdline and any(pat in cmdline for pat in patterns):
+                        need_process = False
+                        break
+            if need_log:
+                need_log = not any(log_re.search(line) for _, line in follower.read_new())
+
+            elapsed = time.monotonic() - t0
+            if criteria and not (pending_ports or need_process or need_log):
+                return {"ready": True, "latency": elapsed, "exit_code": exit_code, "pending": [], "processes": procs}
+            if not criteria and (exit_code == 0 or elapsed >= READY_MIN_ALIVE):
+                return {"ready": True, "latency": elapsed, "exit_code": exit_code, "pending": [], "processes": procs}
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if exit_code is None:
+                _wait_exit(proc, pidfd, min(delay, remaining))
+            else:
+                # Script al geëindigd: pidfd en wait() keren direct terug, dus gewoon slapen
+                time.sleep(min(delay, remaining))
+            delay = min(delay * 1.5, READY_BACKOFF_MAX)
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+        if follower:
+            follower.close()
+
+    pending = [f":{p}" for p in sorted(pending_ports)]
+    if need_process:
+        pending.append("proces")
+    if need_log:
+        pending.append("logregel")
+    return {"ready": False, "latency": time.monotonic() - t0, "exit_code": proc.poll(),
+            "pending": pending, "processes": procs}
+
+
+# Uitkomsten van start_project()
+START_READY = "ready"              # gestart en gereed
+START_NOT_READY = "not_ready"      # script draait, maar binnen de timeout niet gereed
+START_UNSTARTABLE = "unstartable"  # geen start_script en geen (werkende) PM2
+START_FAILED = "failed"
+
+
 def do_start(name: str, project: Dict) -> bool:
+    """Start een project; True als het draait (ook als het nog niet gereed is)."""
+    return start_project(name, project) in (START_READY, START_NOT_READY)
+
+
+def start_project(name: str, project: Dict) -> str:
+    """Start een project en geef de uitkomst (START_READY, START_NOT_READY, …)."""
     # PM2-beheerd project → via PM2
     pm2_name = project.get("pm2_name")
-    if pm2_name:
+    pm2_tried = False
+    if pm2_name and pm2.available():
+        pm2_tried = True
         console.print(f"[cyan]▶  PM2 start: [bold]{pm2_name}[/]...")
         if pm2_action(pm2_name, "start"):
             console.print(f"[green]✓  {name} gestart via PM2.[/]")
-            return True
+            return START_READY
         else:
             console.print(f"[yellow]⚠  PM2 start mislukt, probeer script...[/]")
 
     # Waarschuw bij poortconflicten vóór het starten
-    all_projects = load_projects()
-    conflicts = get_port_conflicts(all_projects)
+    conflicts = get_port_conflicts_for({name: project})
     for port in resolve_project_ports(project):
         if port in conflicts:
             others = [p for p in conflicts[port] if p != name]
@@ -464,16 +1984,20 @@ def do_start(name: str, project: Dict) -> bool:
     script = project.get("start_script")
 
     if not script:
-        console.print(f"\n[yellow]⚠  Geen start_script voor '[bold]{name}[/]'.[/]")
+        if pm2_tried:
+            console.print(f"[red]✗  {name}: PM2 start mislukt en geen start_script.[/]")
+            return START_FAILED
+        hint = " en PM2 is niet beschikbaar" if pm2_name else ""
+        console.print(f"\n[yellow]⚠  Geen start_script voor '[bold]{name}[/]'{hint}.[/]")
         notes = project.get("notes", "")
         if notes:
             console.print(Panel(notes, title="Opstartinstructies", border_style="yellow"))
-        return False
+        return START_UNSTARTABLE
 
     script_path = Path(path) / script
     if not script_path.exists():
         console.print(f"[red]✗  Script niet gevonden: {script_path}[/]")
-        return False
+        return START_FAILED
 
     console.print(f"[cyan]▶  Starten: [bold]{name}[/] via [dim]{script}[/]...")
 
@@ -486,32 +2010,107 @@ def do_start(name: str, project: Dict) -> bool:
             start_new_session=True,
         )
 
-        console.print(f"   [dim]Wachten op processen...[/]")
-        for i in range(12):
-            time.sleep(1)
-            if is_running(project):
-                mem = round(get_memory_mb(project), 1)
-                open_ports = get_open_ports(project)
-                console.print(f"[green]✓  {name} is online![/]  "
-                               f"[dim]geheugen: {mem} MB  "
-                               f"poorten: {open_ports or 'geen'}[/]")
-                notes = project.get("notes", "")
-                if notes:
-                    console.print(f"   [dim]{notes}[/]")
-                return True
-
-        if proc.poll() is None:
-            console.print(f"[yellow]⚠  Script draait (PID {proc.pid}), poorten nog niet open.[/]")
-            return True
+        console.print(f"   [dim]Wachten tot {name} gereed is...[/]")
+        ports = resolve_project_ports(project)
+        result = wait_until_ready(project, proc, ports)
+        if psutil and result["exit_code"] in (None, 0):
+            # start_new_session → sessie-ID is de PID van het script
+            sessions.record(name, proc.pid)
+
+        if result["ready"]:
+            mem = 0.0
+            for p in result["processes"]:
+                try:
+                    mem += p.memory_info().rss / 1024 / 1024
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    pass
+            open_ports = [p for p in ports if _port_open(p)]
+            console.print(f"[green]✓  {name} is online![/]  "
+                           f"[dim]na {result['latency']:.2f}s  "
+                           f"geheugen: {mem:.1f} MB  "
+                           f"poorten: {open_ports or 'geen'}[/]")
+            notes = project.get("notes", "")
+            if notes:
+                console.print(f"   [dim]{notes}[/]")
+            return START_READY
+
+        if result["exit_code"] is None:
+            console.print(f"[yellow]⚠  Script draait (PID {proc.pid}), na {result['latency']:.1f}s nog niet gereed "
+                          f"(wacht op: {', '.join(result['pending'])}).[/]")
+            return START_NOT_READY
         else:
-            console.print(f"[red]✗  Script gestopt (exit: {proc.returncode}). Controleer logs.[/]")
-            return False
+            console.print(f"[red]✗  Script gestopt (exit: {result['exit_code']}) na {result['latency']:.2f}s. "
+                          f"Controleer logs.[/]")
+            return START_FAILED
     except Exception as e:
         console.print(f"[red]✗  Fout bij starten: {e}[/]")
-        return False
+        return START_FAILED
+
+
+STOP_GRACE = 5.0      # max wachttijd na SIGTERM; per project te overschrijven met "stop_grace"
+STOP_KILL_WAIT = 2.0  # max wachttijd na SIGKILL
+
+
+def _process_tree(procs: List) -> List:
+    """Processen plus al hun (klein)kinderen, zonder dubbelen (en nooit pmctl zelf)."""
+    tree: Dict[int, Any] = {}
+    for p in procs:
+        tree[p.pid] = p
+        try:
+            for child in p.children(recursive=True):
+                tree.setdefault(child.pid, child)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    tree.pop(os.getpid(), None)
+    return list(tree.values())
+
+
+def _wait_gone(procs: List, timeout: float) -> List:
+    """
+    Zoals psutil.wait_procs, maar een zombie telt als gestopt: die houdt geen
+    poorten of geheugen meer vast en wordt pas opgeruimd als zijn ouder (vaak
+    init, bij via nohup gestarte projecten) er aan toe komt.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    alive = list(procs)
+    while alive:
+        still = []
+        for p in alive:
+            try:
+                if p.is_running() and p.status() != psutil.STATUS_ZOMBIE:
+                    still.append(p)
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.AccessDenied:
+                still.append(p)
+        alive = still
+        remaining = deadline - time.monotonic()
+        if not alive or remaining <= 0:
+            break
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.1)
+    return alive
 
 
-def do_stop(name: str, project: Dict) -> bool:
+def terminate_tree(procs: List, grace: float) -> List:
+    """SIGTERM, wacht hooguit `grace` seconden, daarna SIGKILL. Geeft de overlevers."""
+    for p in procs:
+        try:
+            p.terminate()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    alive = _wait_gone(procs, grace)
+    for p in alive:
+        try:
+            p.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return _wait_gone(alive, STOP_KILL_WAIT)
+
+
+def do_stop(name: str, project: Dict, procs: Optional[List] = None) -> bool:
+    """Stop een project; `procs` uit een gedeelde snapshot bespaart een eigen processcan."""
     # PM2-beheerd project → via PM2
     pm2_name = project.get("pm2_name")
     if pm2_name:
@@ -521,65 +2120,1064 @@ def do_stop(name: str, project: Dict) -> bool:
             return True
         console.print(f"[yellow]⚠  PM2 stop mislukt, probeer proces-kill...[/]")
 
-    procs = find_processes(project)
+    if procs is None:
+        procs = find_processes(project, name)
 
     if not procs:
+        sessions.forget(name)
         console.print(f"[yellow]⚠  '{name}' draait niet.[/]")
         return True
 
-    console.print(f"[cyan]■  Stoppen: [bold]{name}[/] ({len(procs)} proces(sen))...")
+    # Hele procesboom, inclusief kinderen van het startscript
+    tree = _process_tree(procs)
+    console.print(f"[cyan]■  Stoppen: [bold]{name}[/] ({len(tree)} proces(sen))...")
+    t0 = time.monotonic()
+    alive = terminate_tree(tree, float(project.get("stop_grace", STOP_GRACE)))
+
+    if not alive:
+        sessions.forget(name)
+        console.print(f"[green]✓  {name} gestopt.[/]  [dim]na {time.monotonic() - t0:.2f}s[/]")
+        return True
+    else:
+        pids = ", ".join(str(p.pid) for p in alive)
+        console.print(f"[red]✗  Kon {name} niet volledig stoppen (PID {pids}).[/]")
+        return False
+
 
-    for proc in procs:
+def stop_many(projects: Dict[str, Any], names: List[str]) -> Dict[str, bool]:
+    """
+    Stop meerdere projecten tegelijk: PM2-projecten in één pm2-aanroep,
+    de rest parallel, zodat het totaal zo lang duurt als de traagste.
+    """
+    results: Dict[str, bool] = {}
+    pm2_names = {n: projects[n]["pm2_name"] for n in names if projects[n].get("pm2_name")}
+    if pm2_names:
+        console.print(f"[cyan]■  PM2 stop: [bold]{', '.join(pm2_names.values())}[/]...")
+        if pm2.action("stop", list(pm2_names.values())):
+            for n in pm2_names:
+                console.print(f"[green]✓  {n} gestopt via PM2.[/]")
+                results[n] = True
+
+    rest = [n for n in names if n not in results]
+    if rest:
+        # Eén processcan voor alle projecten in plaats van één per worker
+        procs: Dict[str, List] = {}
+        if psutil:
+            snapshot = SystemSnapshot({n: projects[n] for n in rest}, resolve_ports=False)
+            procs = {n: snapshot.processes(n) for n in rest}
+        with ThreadPoolExecutor(max_workers=len(rest)) as ex:
+            results.update(zip(rest, ex.map(lambda n: do_stop(n, projects[n], procs.get(n)), rest)))
+    return results
+
+
+# ── Opstarten met afhankelijkheden ────────────────────────────────────────────
+START_PARALLEL = 4  # standaard max gelijktijdige starts
+
+
+def dependency_graph(projects: Dict[str, Any], targets: List[str], with_deps: bool = True) -> Dict[str, List[str]]:
+    """
+    Afhankelijkheden uit `relations` (project → projecten die eerst moeten draaien),
+    beperkt tot `targets` en — met with_deps — alles waar die transitief van afhangen.
+    """
+    graph: Dict[str, List[str]] = {}
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name in graph:
+            continue
+        deps = [r for r in projects[name].get("relations", []) if r in projects]
+        if not with_deps:
+            deps = [d for d in deps if d in targets]
+        graph[name] = deps
+        todo.extend(deps)
+    return graph
+
+
+def find_cycle(graph: Dict[str, List[str]]) -> Optional[List[str]]:
+    """Eén cyclus als lijst (a → b → a), of None."""
+    state: Dict[str, int] = {}  # 1 = op het pad, 2 = klaar
+    path: List[str] = []
+
+    def visit(node: str) -> Optional[List[str]]:
+        state[node] = 1
+        path.append(node)
+        for dep in graph.get(node, []):
+            if state.get(dep) == 1:
+                return path[path.index(dep):] + [dep]
+            if dep not in state:
+                cycle = visit(dep)
+                if cycle:
+                    return cycle
+        path.pop()
+        state[node] = 2
+        return None
+
+    for node in graph:
+        if node not in state:
+            cycle = visit(node)
+            if cycle:
+                return cycle
+    return None
+
+
+def start_with_dependencies(
+    projects: Dict[str, Any],
+    graph: Dict[str, List[str]],
+    parallel: int = START_PARALLEL,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Start alle projecten uit de graaf; onafhankelijke takken parallel (max `parallel`),
+    een project pas als al zijn afhankelijkheden draaien én gereed zijn. Is een
+    afhankelijkheid mislukt, niet gereed of niet te starten (geen start_script/PM2),
+    dan worden de projecten die erop wachten overgeslagen.
+    Geeft per project {"ok", "skipped", "outcome", "reason", "start", "end"} (seconden sinds de start);
+    outcome is "running", een START_*-uitkomst of "skipped".
+    """
+    t0 = time.monotonic()
+    results: Dict[str, Dict[str, Any]] = {}
+    waiting = {name: set(deps) for name, deps in graph.items()}
+    snapshot = SystemSnapshot({n: projects[n] for n in graph})
+
+    def result(outcome: str, start: float, reason: str = "") -> Dict[str, Any]:
+        return {"ok": outcome in ("running", START_READY), "skipped": outcome == "skipped",
+                "outcome": outcome, "reason": reason, "start": start, "end": time.monotonic() - t0}
+
+    def run(name: str) -> Dict[str, Any]:
+        start = time.monotonic() - t0
+        # Afhankelijkheden kunnen intussen weer gestopt zijn: vlak voor het starten nog eens kijken
+        gone = [d for d in graph[name] if results[d]["outcome"] == START_READY and not is_running(projects[d], d)]
+        if gone:
+            return result("skipped", start, f"{', '.join(gone)} draait niet meer")
+        if snapshot.is_running(name):
+            console.print(f"[dim]●  {name} draait al.[/]")
+            return result("running", start)
+        return result(start_project(name, projects[name]), start)
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as ex:
+        running: Dict[Any, str] = {}
+        while waiting or running:
+            for name in [n for n, deps in waiting.items() if not deps]:
+                del waiting[name]
+                running[ex.submit(run, name)] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                results[name] = fut.result()
+                failed = [name] if not results[name]["ok"] else []
+                # Afhankelijken vrijgeven, of (transitief) overslaan als deze niet gereed is
+                while failed:
+                    bad = failed.pop()
+                    for other in [n for n, deps in waiting.items() if bad in deps]:
+                        del waiting[other]
+                        results[other] = result("skipped", time.monotonic() - t0, f"wacht op {bad}")
+                        failed.append(other)
+                for deps in waiting.values():
+                    deps.discard(name)
+    return results
+
+
+START_LABELS = {
+    "running": "[green]● draaide al[/]",
+    START_READY: "[green]✓ gereed[/]",
+    START_NOT_READY: "[yellow]⚠ niet gereed[/]",
+    START_UNSTARTABLE: "[yellow]⚠ niet te starten (geen start_script/PM2)[/]",
+    START_FAILED: "[red]✗ mislukt[/]",
+    "skipped": "[yellow]overgeslagen[/]",
+}
+
+
+def critical_path(graph: Dict[str, List[str]], results: Dict[str, Dict[str, Any]]) -> List[str]:
+    """De keten van afhankelijkheden die het laatst klaar was (bepaalt de totale duur)."""
+    if not results:
+        return []
+    node = max(results, key=lambda n: results[n]["end"])
+    path = [node]
+    while True:
+        deps = [d for d in graph.get(node, []) if d in results]
+        if not deps:
+            break
+        node = max(deps, key=lambda d: results[d]["end"])
+        path.append(node)
+    return list(reversed(path))
+
+
+# ── Actiejobs ────────────────────────────────────────────────────────────────
+JOB_WORKERS = 8        # globale limiet op gelijktijdig lopende jobs
+JOB_KEEP = 600.0       # afgeronde jobs zo lang opvraagbaar (seconden)
+JOB_HISTORY = 500      # en nooit meer dan zoveel
+
+
+class JobManager:
+    """
+    Acties (start/stop/herstart, ook voor meerdere projecten) als job: submit geeft
+    meteen een job-id, het werk draait op een begrensde pool. Een job start pas als
+    geen van zijn projecten bezig is, en jobs op hetzelfde project lopen in volgorde
+    van binnenkomst; verschillende projecten lopen parallel. Een dubbelklik op een
+    nog wachtende, identieke job geeft die job terug. Elke wijziging verhoogt
+    `version`, zodat een stream alleen gewijzigde jobs hoeft te sturen.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pmctl-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._fns: Dict[str, Any] = {}
+        self._queue: deque = deque()  # wachtende job-id's, oudste eerst
+        self._busy: Set[str] = set()  # projecten met een lopende job
+        self._changed: Dict[str, int] = {}  # job-id → versie van de laatste wijziging
+        self._seq = 0
+        self.version = 0
+
+    def _touch(self, job: Dict[str, Any]):
+        self.version += 1
+        self._changed[job["id"]] = self.version
+
+    def submit(self, action: str, names: List[str], fn) -> Dict[str, Any]:
+        """
+        Plan fn(job) in voor `names`. fn meldt voortgang via progress() en geeft
+        (success, message) terug; een exception maakt de job 'failed'.
+        """
+        with self._lock:
+            for job_id in self._queue:
+                job = self._jobs[job_id]
+                if job["action"] == action and job["projects"] == names:
+                    return dict(job)
+            self._prune()
+            self._seq += 1
+            job = {
+                "id": str(self._seq), "action": action, "projects": names, "state": "queued",
+                "created": time.time(), "started": None, "finished": None,
+                "progress": {n: "wacht" for n in names}, "success": None, "message": "",
+            }
+            self._jobs[job["id"]] = job
+            self._fns[job["id"]] = fn
+            self._queue.append(job["id"])
+            self._touch(job)
+            self._dispatch()
+            return dict(job)
+
+    def _dispatch(self):
+        # Onder self._lock. Een wachtende job die een project deelt met een eerdere
+        # wachtende job blijft erachter staan, ook als dat project nu vrij is.
+        claimed: Set[str] = set()
+        for job_id in list(self._queue):
+            names = set(self._jobs[job_id]["projects"])
+            if not names & (self._busy | claimed):
+                self._queue.remove(job_id)
+                self._busy |= names
+                self._pool.submit(self._run, job_id)
+            claimed |= names
+
+    def _run(self, job_id: str):
+        job = self._jobs[job_id]
+        with self._lock:
+            job["state"] = "running"
+            job["started"] = time.time()
+            self._touch(job)
         try:
-            proc.terminate()
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
+            success, message = self._fns.pop(job_id)(job)
+            state = "done"
+        except Exception as e:
+            success, message, state = False, f"{type(e).__name__}: {e}", "failed"
+        with self._lock:
+            job.update(state=state, success=bool(success), message=message, finished=time.time())
+            self._touch(job)
+            self._busy -= set(job["projects"])
+            self._dispatch()
+
+    def progress(self, job: Dict[str, Any], name: str, step: str):
+        with self._lock:
+            job["progress"][name] = step
+            self._touch(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else {**job, "progress": dict(job["progress"])}
+
+    def recent(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{**job, "progress": dict(job["progress"])} for job in self._jobs.values()]
+
+    def changes_since(self, version: int) -> tuple:
+        """(versie, gewijzigde jobs) sinds `version`; opgeruimde jobs vallen weg."""
+        with self._lock:
+            changed = [
+                {**self._jobs[job_id], "progress": dict(self._jobs[job_id]["progress"])}
+                for job_id, v in self._changed.items() if v > version and job_id in self._jobs
+            ]
+            return self.version, changed
+
+    def _prune(self):
+        # Onder self._lock; alleen afgeronde jobs
+        finished = [job for job in self._jobs.values() if job["finished"] is not None]
+        cutoff = time.time() - JOB_KEEP
+        excess = len(self._jobs) - JOB_HISTORY
+        for job in finished:
+            if job["finished"] < cutoff or excess > 0:
+                del self._jobs[job["id"]]
+                self._changed.pop(job["id"], None)
+                excess -= 1
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ── Logs lezen ────────────────────────────────────────────────────────────────
+LOG_BLOCK = 64 * 1024
+
+
+def _tail_lines(log_path: Path, end: int, n: int) -> List[tuple]:
+    """
+    Laatste n regels vóór byte-offset `end`, achterstevoren in blokken gelezen.
+    Geeft (start, einde, tekst) per regel; een onvolledige laatste regel telt mee.
+    """
+    with open(log_path, "rb") as f:
+        pos, buf = end, b""
+        while pos > 0 and buf.count(b"\n", 0, max(0, len(buf) - 1)) <= n:
+            step = min(LOG_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
 
-    time.sleep(2)
+    result = []
+    offset = pos
+    for piece in buf.split(b"\n"):
+        start, offset = offset, offset + len(piece) + 1
+        result.append((start, min(offset, end), piece))
+    if buf.endswith(b"\n") or not buf:
+        result.pop()  # leeg stuk na de laatste newline
+    if pos > 0 and result:
+        result.pop(0)  # eerste stuk begint midden in een regel
+    return [(a, b, t.decode("utf-8", "replace")) for a, b, t in result[-n:]]
+
+
+def _head_lines(log_path: Path, start: int, n: int) -> List[tuple]:
+    """Eerste n volledige regels vanaf byte-offset `start`."""
+    result = []
+    with open(log_path, "rb") as f:
+        f.seek(start)
+        pos, buf = start, b""
+        while len(result) < n:
+            block = f.read(LOG_BLOCK)
+            if not block:
+                break
+            buf += block
+            while len(result) < n:
+                nl = buf.find(b"\n")
+                if nl < 0:
+                    break
+                result.append((pos, pos + nl + 1, buf[:nl].decode("utf-8", "replace")))
+                pos += nl + 1
+                buf = buf[nl + 1:]
+    return result
 
-    still = find_processes(project)
-    for proc in still:
+
+def _encode_cursor(offsets: Dict[str, int]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(offsets, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Dict[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return {str(k): int(v) for k, v in json.loads(raw).items()}
+    except (ValueError, AttributeError, TypeError):
+        raise ValueError("ongeldige cursor")
+
+
+def _stamp_lines(lines: List[tuple]) -> Optional[List[float]]:
+    """Tijdstempel per regel; regels zonder (tracebacks e.d.) erven die van de vorige. None als er geen is."""
+    stamps = [_line_timestamp(text) for _, _, text in lines]
+    known = [ts for ts in stamps if ts is not None]
+    if not known:
+        return None
+    last = known[0]
+    for i, ts in enumerate(stamps):
+        stamps[i] = last = ts if ts is not None else last
+    return stamps
+
+
+def read_log_window(
+    project: Dict,
+    lines: int = 50,
+    cursor: Optional[str] = None,
+    direction: str = "older",
+) -> Dict[str, Any]:
+    """
+    Een venster van `lines` regels over alle logbestanden van een project, zonder subprocess.
+    Zonder cursor: de staart van de logs. Met cursor: ouder (`older`) of nieuwer (`newer`)
+    dan de vorige pagina. Bestanden met tijdstempels worden op tijd samengevoegd.
+    Geeft {"lines": [...], "merged": bool, "older": cursor, "newer": cursor}.
+    """
+    path = project.get("path", "")
+    positions = _decode_cursor(cursor) if cursor else {}
+    per_file: Dict[str, List[tuple]] = {}
+    bounds: Dict[str, int] = {}
+
+    for lf in _log_names(project):
+        log_path = Path(path) / lf
         try:
-            proc.kill()
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            size = log_path.stat().st_size
+        except OSError:
+            continue
+        if cursor:
+            bound = positions.get(lf, 0)  # nieuw bestand sinds de vorige pagina → vanaf het begin
+        else:
+            bound = size if direction == "older" else 0
+        bound = bounds[lf] = min(bound, size)
+        try:
+            if direction == "newer":
+                per_file[lf] = _head_lines(log_path, bound, lines)
+            else:
+                per_file[lf] = _tail_lines(log_path, bound, lines)
+        except OSError:
+            per_file[lf] = []
+
+    stamps = {lf: _stamp_lines(ls) for lf, ls in per_file.items() if ls}
+    merged = len(stamps) > 1 and all(v is not None for v in stamps.values())
+
+    rows = []  # (ts, bestand, start, einde, tekst)
+    for lf, ls in per_file.items():
+        ts_list = stamps.get(lf) or [None] * len(ls)
+        rows.append([(ts, lf, a, b, t) for ts, (a, b, t) in zip(ts_list, ls)])
+    if merged:
+        combined = list(heapq.merge(*rows, key=lambda r: r[0]))
+        combined = combined[:lines] if direction == "newer" else combined[-lines:]
+    else:
+        # Niet samen te voegen: het budget van `lines` verdelen; wat een kort bestand
+        # overlaat gaat naar de andere
+        quota, left = {}, lines
+        order = sorted(range(len(rows)), key=lambda i: len(rows[i]))
+        for n, i in enumerate(order):
+            quota[i] = min(len(rows[i]), left // (len(order) - n))
+            left -= quota[i]
+        combined = []
+        for i, file_rows in enumerate(rows):
+            take = quota[i]
+            combined += file_rows[:take] if direction == "newer" else file_rows[len(file_rows) - take:]
+
+    # Cursors: per bestand het begin van de eerste en het einde van de laatste getoonde regel
+    older, newer = dict(bounds), dict(bounds)
+    for ts, lf, a, b, text in reversed(combined):
+        older[lf] = a
+    for ts, lf, a, b, text in combined:
+        newer[lf] = b
+    return {
+        "lines": [{"file": lf, "ts": ts, "text": text} for ts, lf, a, b, text in combined],
+        "merged": merged,
+        "older": _encode_cursor(older),
+        "newer": _encode_cursor(newer),
+    }
+
+
+# ── Logs volgen ───────────────────────────────────────────────────────────────
+LOG_FOLLOW_MAX_READ = 256 * 1024        # max bytes per bestand per ronde
+LOG_FOLLOW_MAX_BACKLOG = 4 * 1024 * 1024  # grotere achterstand → overslaan (backpressure)
+LOG_POLL_MIN = 0.1
+LOG_POLL_MAX = 2.0
+
+_IN_MODIFY, _IN_CLOSE_WRITE, _IN_MOVED_TO, _IN_CREATE = 0x2, 0x8, 0x80, 0x100
+
+
+def _inotify_watch(dirs: Set[str]) -> Optional[int]:
+    """Niet-blokkerende inotify-fd op deze mappen, of None (geen Linux of geen toegang)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+    for d in dirs:
+        if libc.inotify_add_watch(fd, os.fsencode(d), mask) < 0:
+            os.close(fd)
+            return None
+    return fd
+
+
+class LogFollower:
+    """
+    Volgt alle logbestanden van een project tegelijk (zoals `tail -F`).
+    Wacht via inotify waar beschikbaar, anders met een adaptieve stat-poll.
+    Overleeft rotatie en truncatie; bij een te grote achterstand worden bytes
+    overgeslagen zodat een druk log het geheugen niet opblaast.
+    """
+
+    def __init__(self, files: Dict[str, Path], start: Optional[Dict[str, int]] = None):
+        self.files = files
+        self.interval = LOG_POLL_MIN
+        self.pending = False  # er staan nog ongelezen bytes klaar
+        self._state: Dict[str, Dict[str, Any]] = {}
+        for label, path in files.items():
+            try:
+                st = os.stat(path)
+                inode, size = st.st_ino, st.st_size
+            except OSError:
+                inode, size = None, 0
+            offset = min(start[label], size) if start and label in start else size
+            self._state[label] = {"inode": inode, "offset": offset, "carry": b"",
+                                  "head": _head_crc(path, offset) if inode is not None else None}
+        self._fd = _inotify_watch({str(p.parent) for p in files.values()})
+
+    def fileno(self) -> Optional[int]:
+        return self._fd
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def drain(self):
+        """Lees wachtende inotify-events weg (de inhoud doet er niet toe)."""
+        if self._fd is None:
+            return
+        try:
+            while os.read(self._fd, 65536):
+                pass
+        except (BlockingIOError, OSError):
             pass
 
-    time.sleep(1)
+    def cursor(self) -> str:
+        """Cursor (zoals read_log_window) vanaf het begin van de nog onvolledige regels."""
+        return _encode_cursor({
+            label: st["offset"] - len(st["carry"]) for label, st in self._state.items()
+        })
 
-    if not is_running(project):
-        console.print(f"[green]✓  {name} gestopt.[/]")
-        return True
-    else:
-        console.print(f"[red]✗  Kon {name} niet volledig stoppen.[/]")
-        return False
+    def wait(self, timeout: float):
+        if self.pending:
+            return
+        if self._fd is not None:
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+            if ready:
+                self.drain()
+        else:
+            time.sleep(min(timeout, self.interval))
+
+    def read_new(self) -> List[tuple]:
+        """Nieuwe volledige regels als (bestand, tekst)."""
+        self.pending = False
+        out = []
+        for label, path in self.files.items():
+            out.extend(self._read_file(label, path))
+        self.interval = LOG_POLL_MIN if out else min(self.interval * 2, LOG_POLL_MAX)
+        return out
+
+    def _read_file(self, label: str, path: Path) -> List[tuple]:
+        state = self._state[label]
+        try:
+            st = os.stat(path)
+        except OSError:
+            return []
+        if (st.st_ino != state["inode"] or st.st_size < state["offset"]
+                or (st.st_size > state["offset"] and _head_changed(path, state["offset"], state["head"]))):
+            # Geroteerd of afgekapt (ook als het daarna weer voorbij de offset groeide) → vanaf het begin
+            state.update(inode=st.st_ino, offset=0, carry=b"", head=None)
+        if st.st_size <= state["offset"]:
+            return []
+
+        out = []
+        skipped = False
+        if st.st_size - state["offset"] > LOG_FOLLOW_MAX_BACKLOG:
+            skip_to = st.st_size - LOG_FOLLOW_MAX_READ
+            out.append((label, f"… {skip_to - state['offset']:,} bytes overgeslagen …"))
+            state.update(offset=skip_to, carry=b"")
+            skipped = True
+        try:
+            with open(path, "rb") as f:
+                f.seek(state["offset"])
+                data = f.read(LOG_FOLLOW_MAX_READ)
+        except OSError:
+            return out
+        state["offset"] += len(data)
+        state["head"] = _head_crc(path, state["offset"])
+        if state["offset"] < st.st_size:
+            self.pending = True
+
+        data = state["carry"] + data
+        if skipped:
+            data = data[data.find(b"\n") + 1:]  # eerste regel is maar half gelezen
+        lines = data.split(b"\n")
+        state["carry"] = lines.pop()
+        if len(state["carry"]) > LOG_FOLLOW_MAX_READ:
+            lines.append(state["carry"])
+            state["carry"] = b""
+        out.extend((label, line.decode("utf-8", "replace")) for line in lines)
+        return out
+
+
+def format_log_window(window: Dict[str, Any]) -> str:
+    """Tekstweergave: samengevoegd met bestandslabel, anders per bestand een kopje."""
+    if window["merged"]:
+        return "\n".join(f"{row['file']} │ {row['text']}" for row in window["lines"])
+
+    output = []
+    current = None
+    for row in window["lines"]:
+        if row["file"] != current:
+            current = row["file"]
+            output.append(f"── {current} ──")
+        output.append(row["text"])
+    return "\n".join(output)
 
 
-# ── Logs lezen ────────────────────────────────────────────────────────────────
 def read_logs(project: Dict, lines: int = 50) -> str:
-    path = project.get("path", "")
-    log_files = project.get("log_files", [])
-    if not log_files:
-        log_files = [str(p.relative_to(path)) for p in Path(path).glob("*.log")]
-    if not log_files:
+    if not _log_names(project):
         return "(geen log-bestanden geconfigureerd)"
 
-    output = []
-    for lf in log_files:
-        log_path = Path(path) / lf
-        if not log_path.exists():
+    window = read_log_window(project, lines)
+    if not window["lines"]:
+        return "(logs zijn leeg)"
+    return format_log_window(window)
+
+
+# ── Log-index (pmctl grep) ────────────────────────────────────────────────────
+LOG_INDEX_DB = STATE_DIR / "logindex.db"
+LOG_INDEX_BLOCK = 64 * 1024          # doelgrootte van een geïndexeerd blok
+LOG_INDEX_BLOOM_BITS = 65536         # trigram-bitmap per blok (8 KB)
+LOG_INDEX_MAX_BLOCKS = 4096          # max blokken per project (≈ 32 MB index)
+_REGEX_META = set(".^$*+?{}[]()|\\")
+
+
+def _trigram_bits(data: bytes) -> Set[int]:
+    """Bitposities van alle (lowercase) trigrammen; stabiel tussen runs, anders dan hash()."""
+    grams = {data[i:i + 3] for i in range(len(data) - 2)}
+    return {(int.from_bytes(g, "big") * 2654435761 >> 7) % LOG_INDEX_BLOOM_BITS for g in grams}
+
+
+def _escape_end(pattern: str, i: int) -> int:
+    """Index na de escape die op `i` begint (backslash + letter/cijfer); -1 als onleesbaar."""
+    nxt = pattern[i + 1:i + 2]
+    if nxt in ("x", "u", "U"):
+        return i + 2 + {"x": 2, "u": 4, "U": 8}[nxt]
+    if nxt == "N":
+        close = pattern.find("}", i)
+        return close + 1 if pattern[i + 2:i + 3] == "{" and close > 0 else -1
+    if nxt.isdigit():
+        # Octaal (\0, \0oo, \ooo) of terugverwijzing (\1 … \99)
+        j = i + 2
+        octal = nxt == "0" or (nxt in "1234567" and len(pattern) > i + 3
+                                and pattern[i + 2] in "01234567" and pattern[i + 3] in "01234567")
+        limit = i + 4 if octal else i + 3
+        while j < min(limit, len(pattern)) and pattern[j].isdigit() and (not octal or pattern[j] in "01234567"):
+            j += 1
+        return j
+    return i + 2  # \d, \w, \s, \b, \A, …
+
+
+def _required_literals(pattern: str) -> List[str]:
+    """
+    Letterlijke stukken (≥ 3 tekens) die in elke treffer van de regex moeten voorkomen.
+    Conservatief: bij alternatie of onduidelijke constructies liever niets dan iets fouts.
+    """
+    if "|" in pattern or re.search(r"\(\?[a-zA-Z]*x", pattern):
+        return []
+    literals: List[str] = []
+    cur = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            nxt = pattern[i + 1:i + 2]
+            if nxt and not nxt.isalnum():
+                cur += nxt  # geëscapet leesteken is letterlijk
+                i += 2
+            else:
+                # \xHH, \d, \1, \N{…}: geen letterlijk stuk; de hele escape overslaan
+                literals.append(cur)
+                cur = ""
+                i = _escape_end(pattern, i)
+                if i < 0:
+                    return []
             continue
+        if c in "?*{":
+            cur = cur[:-1]  # vorige teken is optioneel
+            literals.append(cur)
+            cur = ""
+            if c == "{":
+                i = pattern.find("}", i) if "}" in pattern[i:] else len(pattern)
+        elif c in "[(":
+            # Klassen en groepen overslaan (groep kan optioneel zijn)
+            literals.append(cur)
+            cur = ""
+            close, depth = ("]", 0) if c == "[" else (")", 0)
+            j = i + 1
+            while j < len(pattern):
+                if pattern[j] == "\\":
+                    j += 2
+                    continue
+                if pattern[j] == c and c == "(":
+                    depth += 1
+                elif pattern[j] == close:
+                    if depth == 0:
+                        break
+                    depth -= 1
+                j += 1
+            i = j
+            if i + 1 < len(pattern) and pattern[i + 1] in "?*{":
+                i += 1
+                if pattern[i] == "{":
+                    i = pattern.find("}", i) if "}" in pattern[i:] else len(pattern)
+        elif c in _REGEX_META:
+            literals.append(cur)
+            cur = ""
+        else:
+            cur += c
+        i += 1
+    literals.append(cur)
+    return [lit for lit in literals if len(lit) >= 3]
+
+
+class LogIndex:
+    """
+    Incrementele trigram-index over de logbestanden van alle projecten (SQLite).
+    Elk blok van ~64 KB krijgt een trigram-bitmap en de eerste/laatste tijdstempel;
+    zoeken leest alleen blokken waarvan de bitmap alle trigrammen van de zoekterm
+    bevat en controleert die regel voor regel met de echte regex.
+    """
+
+    def __init__(self, path: Path = LOG_INDEX_DB):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.path), timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                project TEXT, file TEXT, inode INTEGER, offset INTEGER, evicted_to INTEGER DEFAULT 0,
+                head INTEGER, PRIMARY KEY (project, file));
+            CREATE TABLE IF NOT EXISTS blocks (
+                id INTEGER PRIMARY KEY, project TEXT, file TEXT, start INTEGER, "end" INTEGER,
+                first_ts REAL, last_ts REAL, bloom BLOB);
+            CREATE INDEX IF NOT EXISTS blocks_file ON blocks (project, file, start);
+        """)
         try:
-            result = subprocess.run(
-                ["tail", f"-{lines}", str(log_path)],
-                capture_output=True, text=True, timeout=5
-            )
-            if result.stdout.strip():
-                output.append(f"── {lf} ──")
-                output.append(result.stdout)
-        except Exception:
+            db.execute("ALTER TABLE files ADD COLUMN head INTEGER")  # index van een oudere versie
+        except sqlite3.OperationalError:
             pass
+        return db
+
+    def update(self, name: str, project: Dict):
+        """Indexeer alleen de bytes die sinds de vorige keer bij de logs kwamen."""
+        with self._lock:
+            db = self._connect()
+            try:
+                for lf in _log_names(project):
+                    self._update_file(db, name, lf, Path(project["path"]) / lf)
+                self._enforce_cap(db, name)
+                db.commit()
+            finally:
+                db.close()
+
+    def _update_file(self, db: sqlite3.Connection, name: str, lf: str, log_path: Path):
+        try:
+            st = os.stat(log_path)
+        except OSError:
+            return
+        row = db.execute("SELECT inode, offset, head FROM files WHERE project=? AND file=?", (name, lf)).fetchone()
+        offset = 0
+        reset = False
+        if row and row[0] == st.st_ino and st.st_size >= row[1] and not _head_changed(log_path, row[1], row[2]):
+            offset = row[1]
+        elif row:
+            # Geroteerd of afgekapt (ook als het daarna weer voorbij de offset groeide) → opnieuw beginnen
+            reset = True
+            db.execute("DELETE FROM blocks WHERE project=? AND file=?", (name, lf))
+        if st.st_size > offset:
+            with open(log_path, "rb") as f:
+                f.seek(offset)
+                while True:
+                    data = f.read(LOG_INDEX_BLOCK)
+                    if not data:
+                        break
+                    cut = data.rfind(b"\n") + 1
+                    if cut == 0:
+                        if len(data) < LOG_INDEX_BLOCK:
+                            break  # onvolledige laatste regel: volgende keer
+                        cut = len(data)  # extreem lange regel: hard afbreken
+                    block = data[:cut]
+                    db.execute(
+                        'INSERT INTO blocks (project, file, start, "end", first_ts, last_ts, bloom) '
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (name, lf, offset, offset + cut, *self._block_times(block), self._bloom(block)),
+                    )
+                    offset += cut
+                    f.seek(offset)
+        db.execute(
+            "INSERT INTO files (project, file, inode, offset, evicted_to, head) VALUES (?, ?, ?, ?, 0, ?) "
+            "ON CONFLICT (project, file) DO UPDATE SET inode=excluded.inode, offset=excluded.offset, "
+            "head=excluded.head, "
+            "evicted_to=CASE WHEN ? THEN 0 ELSE files.evicted_to END",
+            (name, lf, st.st_ino, offset, _head_crc(log_path, offset), reset),
+        )
 
-    return "\n".join(output) if output else "(logs zijn leeg)"
+    def _enforce_cap(self, db: sqlite3.Connection, name: str):
+        """Oudste blokken vervallen als het project boven LOG_INDEX_MAX_BLOCKS komt."""
+        (count,) = db.execute("SELECT COUNT(*) FROM blocks WHERE project=?", (name,)).fetchone()
+        if count <= LOG_INDEX_MAX_BLOCKS:
+            return
+        doomed = db.execute(
+            'SELECT id, file, "end" FROM blocks WHERE project=? ORDER BY COALESCE(last_ts, 0), id LIMIT ?',
+            (name, count - LOG_INDEX_MAX_BLOCKS),
+        ).fetchall()
+        db.executemany("DELETE FROM blocks WHERE id=?", [(d[0],) for d in doomed])
+        for _, lf, end in doomed:
+            db.execute("UPDATE files SET evicted_to=MAX(evicted_to, ?) WHERE project=? AND file=?", (end, name, lf))
+
+    @staticmethod
+    def _bloom(block: bytes) -> bytes:
+        bits = bytearray(LOG_INDEX_BLOOM_BITS // 8)
+        for b in _trigram_bits(block.lower()):
+            bits[b >> 3] |= 1 << (b & 7)
+        return bytes(bits)
+
+    @staticmethod
+    def _block_times(block: bytes) -> tuple:
+        lines = block.split(b"\n", 50)[:50]
+        first = next((ts for ts in (_line_timestamp(l[:64].decode("utf-8", "replace")) for l in lines) if ts), None)
+        tail = block.rsplit(b"\n", 51)[-51:]
+        last = next((ts for ts in (_line_timestamp(l[:64].decode("utf-8", "replace")) for l in reversed(tail)) if ts), None)
+        return first, last
+
+    def search(
+        self,
+        pattern: str,
+        projects: Dict[str, Any],
+        since: Optional[float] = None,
+        ignore_case: bool = False,
+        limit: int = 200,
+    ) -> Dict[str, Any]:
+        """Zoek `pattern` (regex) in de logs van deze projecten. Indexeert eerst nieuwe bytes."""
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        # Zelfde normalisatie als de index (bytes.lower: alleen ASCII); niet-ASCII
+        # literals zijn bij hoofdletterongevoelig zoeken (ook via (?i)) niet betrouwbaar te filteren
+        folded = bool(regex.flags & re.IGNORECASE)
+        needles = [lit.encode().lower() for lit in _required_literals(pattern)
+                   if lit.isascii() or not folded]
+        wanted = set()
+        for lit in needles:
+            wanted |= _trigram_bits(lit)
+
+        for name, project in projects.items():
+            self.update(name, project)
+
+        matches: List[Dict[str, Any]] = []
+        stats = {"blocks": 0, "blocks_read": 0, "bytes_read": 0, "unindexed_bytes": 0}
+        db = self._connect()
+        try:
+            for name, project in projects.items():
+                for lf, evicted_to in db.execute(
+                        "SELECT file, evicted_to FROM files WHERE project=? ORDER BY file", (name,)):
+                    stats["unindexed_bytes"] += evicted_to
+                    log_path = Path(project["path"]) / lf
+                    rows = db.execute(
+                        'SELECT start, "end", last_ts, bloom FROM blocks WHERE project=? AND file=? ORDER BY start',
+                        (name, lf),
+                    )
+                    for start, end, last_ts, bloom in rows:
+                        stats["blocks"] += 1
+                        if since and last_ts is not None and last_ts < since:
+                            continue
+                        if any(not bloom[b >> 3] & (1 << (b & 7)) for b in wanted):
+                            continue
+                        stats["blocks_read"] += 1
+                        stats["bytes_read"] += end - start
+                        for hit in self._verify(log_path, start, end, regex, since):
+                            matches.append({"project": name, "file": lf, **hit})
+                            if len(matches) >= limit:
+                                return {"matches": matches, "truncated": True, "stats": stats}
+        finally:
+            db.close()
+        return {"matches": matches, "truncated": False, "stats": stats}
+
+    @staticmethod
+    def _verify(log_path: Path, start: int, end: int, regex, since: Optional[float]):
+        try:
+            with open(log_path, "rb") as f:
+                f.seek(start)
+                data = f.read(end - start)
+        except OSError:
+            return
+        offset = start
+        last_ts = None
+        lines = data.split(b"\n")
+        if data.endswith(b"\n"):
+            lines.pop()  # geen lege "regel" na de afsluitende newline
+        for raw in lines:
+            line = raw.decode("utf-8", "replace")
+            line_offset, offset = offset, offset + len(raw) + 1
+            ts = _line_timestamp(line) or last_ts
+            last_ts = ts
+            if since and ts is not None and ts < since:
+                continue
+            m = regex.search(line)
+            if m:
+                yield {"offset": line_offset, "ts": ts, "text": line, "span": [m.start(), m.end()]}
+
+
+log_index = LogIndex()
+
+
+# ── Metriekarchief (pmctl report) ─────────────────────────────────────────────
+METRICS_DB = STATE_DIR / "metrics.db"
+# Tabel per resolutie: (bucketgrootte, bewaartermijn) in seconden
+ARCHIVE_TIERS = {
+    "minute": (60, 14 * 86400),
+    "hour": (3600, 400 * 86400),
+    "day": (86400, 5 * 365 * 86400),
+}
+ARCHIVE_FLUSH = 60.0     # gebufferde minuten zo vaak wegschrijven
+ARCHIVE_PRUNE = 3600.0   # bewaartermijnen zo vaak handhaven
+ARCHIVE_MAX_GAP = 10.0   # langere gaten tussen metingen tellen niet als gemeten tijd
+ARCHIVE_REPORT_BUCKETS = 7 * 1440  # max buckets per project voor een rapport (een week aan minuten)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Percentiel (nearest-rank) van een gesorteerde lijst."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values))) - 1))]
+
+
+class MetricsArchive:
+    """
+    Optioneel, duurzaam archief van de collectormetingen (SQLite, WAL). Metingen worden
+    in het geheugen per minuut opgeteld en in batches naar een minuut-, uur- en dagtabel
+    geschreven (upsert, dus een half gevulde minuut mag later aangevuld worden). Per
+    bucket: gemeten tijd, tijd dat het project draaide, CPU-seconden en rss (som, aantal,
+    max); een rapport telt alleen nog buckets op.
+    """
+
+    def __init__(self, path: Path = METRICS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending: Dict[tuple, List[float]] = {}  # (project, minuut) → [secs, up, cpu, rss_sum, rss_n, rss_max]
+        self._last: Dict[str, float] = {}             # tijd van de vorige meting per project
+        self._flushed = time.monotonic()
+        self._pruned = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.path), timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript("".join(f"""
+            CREATE TABLE IF NOT EXISTS metrics_{tier} (
+                project TEXT NOT NULL, ts INTEGER NOT NULL,
+                secs REAL, up_secs REAL, cpu_secs REAL, rss_sum REAL, rss_n INTEGER, rss_max REAL,
+                PRIMARY KEY (project, ts)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS metrics_{tier}_ts ON metrics_{tier} (ts);
+        """ for tier in ARCHIVE_TIERS))
+        return db
+
+    def add(self, ts: float, results: Dict[str, Dict[str, Any]]):
+        """Neem één collectorronde op; schrijft weg zodra ARCHIVE_FLUSH verstreken is."""
+        minute = int(ts // 60 * 60)
+        with self._lock:
+            for name, info in results.items():
+                prev = self._last.get(name)
+                self._last[name] = ts
+                if prev is None or not 0 < ts - prev <= ARCHIVE_MAX_GAP:
+                    continue
+                if info.get("cpu_percent") is None:
+                    continue  # eerste meting van een proces: telt als gat, niet als cpu
+                dt = ts - prev
+                row = self._pending.setdefault((name, minute), [0.0, 0.0, 0.0, 0.0, 0, 0.0])
+                row[0] += dt
+                if info.get("status") == "running":
+                    rss = info.get("memory_mb", 0.0)
+                    row[1] += dt
+                    row[2] += info.get("cpu_percent", 0.0) / 100 * dt
+                    row[3] += rss
+                    row[4] += 1
+                    row[5] = max(row[5], rss)
+            due = time.monotonic() - self._flushed >= ARCHIVE_FLUSH
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.monotonic()
+        if not pending:
+            return
+        with self._write_lock:
+            try:
+                db = self._connect()
+            except sqlite3.Error as e:
+                console.print(f"[yellow]⚠  Metriekarchief niet beschikbaar: {e}[/]")
+                return
+            try:
+                for tier, (size, _) in ARCHIVE_TIERS.items():
+                    db.executemany(f"""
+                        INSERT INTO metrics_{tier} VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (project, ts) DO UPDATE SET
+                            secs = secs + excluded.secs, up_secs = up_secs + excluded.up_secs,
+                            cpu_secs = cpu_secs + excluded.cpu_secs, rss_sum = rss_sum + excluded.rss_sum,
+                            rss_n = rss_n + excluded.rss_n, rss_max = max(rss_max, excluded.rss_max)
+                    """, [(name, minute // size * size, *vals) for (name, minute), vals in pending.items()])
+                now = time.time()
+                if now - self._pruned >= ARCHIVE_PRUNE:
+                    self._pruned = now
+                    for tier, (_, retention) in ARCHIVE_TIERS.items():
+                        db.execute(f"DELETE FROM metrics_{tier} WHERE ts < ?", (now - retention,))
+                db.commit()
+            except sqlite3.Error as e:
+                console.print(f"[yellow]⚠  Wegschrijven naar metriekarchief mislukt: {e}[/]")
+            finally:
+                db.close()
+
+    def report(self, since_s: float, projects: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Per project over de laatste `since_s` seconden: gemeten tijd, uptime, CPU-uren en
+        p50/p95/max geheugen (MB). Percentielen gaan over bucketgemiddelden van de
+        fijnste tabel die de periode nog bewaart en niet meer dan ARCHIVE_REPORT_BUCKETS telt.
+        """
+        if not self.path.exists():
+            return {}
+        tier = next((t for t, (size, retention) in ARCHIVE_TIERS.items()
+                     if since_s <= retention and since_s / size <= ARCHIVE_REPORT_BUCKETS), "day")
+        size = ARCHIVE_TIERS[tier][0]
+        where, args = "ts >= ?", [int((time.time() - since_s) // size * size)]
+        if projects:
+            where += f" AND project IN ({','.join('?' * len(projects))})"
+            args += projects
+        db = sqlite3.connect(str(self.path), timeout=10)
+        try:
+            totals = db.execute(f"""
+                SELECT project, SUM(secs), SUM(up_secs), SUM(cpu_secs), MAX(rss_max)
+                FROM metrics_{tier} WHERE {where} GROUP BY project ORDER BY project
+            """, args).fetchall()
+            memory: Dict[str, List[float]] = {}
+            for name, avg in db.execute(
+                    f"SELECT project, rss_sum / rss_n FROM metrics_{tier} WHERE {where} AND rss_n > 0", args):
+                memory.setdefault(name, []).append(avg)
+        except sqlite3.Error:
+            return {}
+        finally:
+            db.close()
+
+        result = {}
+        for name, secs, up_secs, cpu_secs, rss_max in totals:
+            mem = sorted(memory.get(name, []))
+            result[name] = {
+                "measured_s": secs or 0.0,
+                "uptime_s": up_secs or 0.0,
+                "cpu_hours": (cpu_secs or 0.0) / 3600,
+                "mem_p50": _percentile(mem, 50),
+                "mem_p95": _percentile(mem, 95),
+                "mem_max": rss_max or 0.0,
+                "resolution": size,
+            }
+        return result
+
+
+metrics_archive = MetricsArchive()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -587,10 +3185,12 @@ def read_logs(project: Dict, lines: int = 50) -> str:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 @app.command("list", help="Overzicht van alle projecten met status")
-def cmd_list():
-    projects = load_projects()
+def cmd_list(
+    category: Optional[str] = typer.Option(None, "--category", "-c", help="Alleen projecten uit deze categorie"),
+):
+    projects = config.query(category=category) if category else load_projects()
     if not projects:
-        console.print("[yellow]Geen projecten geconfigureerd.[/]")
+        console.print(f"[yellow]Geen projecten in categorie '{category}'.[/]" if category else "[yellow]Geen projecten geconfigureerd.[/]")
         return
 
     table = Table(
@@ -610,23 +3210,24 @@ def cmd_list():
     table.add_column("Relaties", style="dim magenta")
     table.add_column("Tech", style="dim")
 
+    snapshot = SystemSnapshot(projects)
     running_count = 0
     for name, project in projects.items():
-        running = is_running(project)
+        running = snapshot.is_running(name)
         if running:
             running_count += 1
             status = "[bold green]● draait[/]"
-            mem = f"{get_memory_mb(project):.0f} MB"
+            mem = f"{snapshot.memory_mb(name):.0f} MB"
         else:
             status = "[red]○ gestopt[/]"
             mem = "—"
 
         disk = get_disk_usage(project)
-        tokens = parse_token_usage(project)
+        tokens = parse_token_usage(project, name)
         token_str = f"{tokens:,}" if tokens else "—"
 
-        ports = project.get("ports", [])
-        open_p = get_open_ports(project)
+        ports = snapshot.ports[name]
+        open_p = snapshot.open_ports(name)
         port_str = " ".join(
             f"[green]:{p}[/]" if p in open_p else f"[dim]:{p}[/]"
             for p in ports
@@ -647,19 +3248,32 @@ def cmd_list():
 
 
 @app.command("ls", help="Alias voor list", hidden=True)
-def cmd_ls():
-    cmd_list()
+def cmd_ls(
+    category: Optional[str] = typer.Option(None, "--category", "-c", help="Alleen projecten uit deze categorie"),
+):
+    cmd_list(category)
 
 
 @app.command("status", help="Gedetailleerde status van één of alle projecten")
 def cmd_status(
-    name: Optional[str] = typer.Argument(None, help="Projectnaam (leeg = alle)")
+    name: Optional[str] = typer.Argument(None, help="Projectnaam (leeg = alle)"),
+    category: Optional[str] = typer.Option(None, "--category", "-c", help="Alleen projecten uit deze categorie"),
 ):
-    projects = load_projects()
-    targets = {name: get_project(name)} if name else projects
+    if name:
+        targets = {name: get_project(name)}
+    elif category:
+        targets = config.query(category=category)
+        if not targets:
+            console.print(f"[yellow]Geen projecten in categorie '{category}'.[/]")
+            return
+    else:
+        targets = load_projects()
+    snapshot = SystemSnapshot(targets)
+    # Deelverzameling: alleen projecten op dezelfde poorten erbij halen
+    conflicts = get_port_conflicts_for(targets) if name or category else get_port_conflicts(targets)
 
     for pname, project in targets.items():
-        info = get_project_info(pname, project)
+        info = get_project_info(pname, project, snapshot=snapshot, conflicts=conflicts)
         running = info["status"] == "running"
 
         status_str = "[bold green]● DRAAIT[/]" if running else "[red]○ GESTOPT[/]"
@@ -700,23 +3314,89 @@ def cmd_status(
         console.print(Panel("\n".join(lines), title=title, border_style="cyan"))
 
 
-@app.command("start", help="Project opstarten")
+@app.command("start", help="Project opstarten (optioneel met afhankelijkheden of alles)")
 def cmd_start(
-    name: str = typer.Argument(..., help="Naam van het project")
+    name: Optional[str] = typer.Argument(None, help="Naam van het project"),
+    all_projects: bool = typer.Option(False, "--all", "-a", help="Alle projecten starten"),
+    with_deps: bool = typer.Option(False, "--with-deps", "-d", help="Eerst de projecten uit 'relations' starten"),
+    parallel: int = typer.Option(START_PARALLEL, "--parallel", "-j", help="Max gelijktijdige starts"),
 ):
-    project = get_project(name)
-    if is_running(project):
-        console.print(f"[yellow]⚠  '{name}' draait al.[/]")
+    if not name and not all_projects:
+        console.print("[red]✗  Geef een projectnaam of gebruik --all.[/]")
+        raise typer.Exit(1)
+
+    if name and not with_deps and not all_projects:
+        project = get_project(name)
+        if is_running(project, name):
+            console.print(f"[yellow]⚠  '{name}' draait al.[/]")
+            return
+        do_start(name, project)
         return
-    do_start(name, project)
+
+    projects = load_projects()
+    targets = list(projects) if all_projects else [name]
+    if name:
+        get_project(name)
+    graph = dependency_graph(projects, targets, with_deps=with_deps or all_projects)
+    cycle = find_cycle(graph)
+    if cycle:
+        console.print(f"[red]✗  Cyclische relaties: [bold]{' → '.join(cycle)}[/]. Pas 'relations' in projects.json aan.[/]")
+        raise typer.Exit(1)
+
+    t0 = time.monotonic()
+    results = start_with_dependencies(projects, graph, parallel)
+    wall = time.monotonic() - t0
+
+    table = Table(box=box.SIMPLE, header_style="bold cyan", title="[bold]Opstarten[/]")
+    table.add_column("Project", style="bold white")
+    table.add_column("Resultaat")
+    table.add_column("Wacht op", style="dim magenta")
+    table.add_column("Start", justify="right")
+    table.add_column("Duur", justify="right")
+    for pname, r in sorted(results.items(), key=lambda kv: kv[1]["start"]):
+        status = START_LABELS.get(r["outcome"], r["outcome"])
+        if r["reason"]:
+            status += f" [dim]({r['reason']})[/]"
+        table.add_row(pname, status, ", ".join(graph[pname]) or "—",
+                      f"+{r['start']:.1f}s", f"{r['end'] - r['start']:.1f}s")
+    console.print()
+    console.print(table)
+    path = critical_path(graph, results)
+    console.print(f"  [dim]Totaal:[/] [bold]{wall:.1f}s[/]   [dim]Kritiek pad:[/] [bold]{' → '.join(path)}[/]\n")
+    if not all(r["ok"] for r in results.values()):
+        raise typer.Exit(1)
 
 
-@app.command("stop", help="Project stoppen")
+@app.command("stop", help="Eén of meer projecten stoppen (parallel)")
 def cmd_stop(
-    name: str = typer.Argument(..., help="Naam van het project")
+    names: Optional[List[str]] = typer.Argument(None, help="Naam/namen van de projecten"),
+    all_projects: bool = typer.Option(False, "--all", "-a", help="Alle projecten stoppen (behalve categorie infra)"),
 ):
-    project = get_project(name)
-    do_stop(name, project)
+    if not names and not all_projects:
+        console.print("[red]✗  Geef een projectnaam of gebruik --all.[/]")
+        raise typer.Exit(1)
+
+    if names and len(names) == 1 and not all_projects:
+        do_stop(names[0], get_project(names[0]))
+        return
+
+    projects = load_projects()
+    if all_projects:
+        snapshot = SystemSnapshot(projects)
+        targets = [n for n, p in projects.items() if p.get("category") != "infra" and snapshot.is_running(n)]
+    else:
+        targets = [n for n in dict.fromkeys(names) if get_project(n)]
+    if not targets:
+        console.print("[yellow]⚠  Niets te stoppen.[/]")
+        return
+
+    t0 = time.monotonic()
+    results = stop_many(projects, targets)
+    ok = sum(results.values())
+    color = "green" if ok == len(results) else "yellow"
+    console.print(f"\n[{color}]■  {ok}/{len(results)} gestopt[/]  [dim]in {time.monotonic() - t0:.1f}s[/]")
+    if ok != len(results):
+        raise typer.Exit(1)
 
 
 @app.command("restart", help="Project herstarten")
@@ -726,7 +3406,6 @@ def cmd_restart(
     project = get_project(name)
     console.print(f"[cyan]↺  Herstarten: [bold]{name}[/]...[/]")
     do_stop(name, project)
-    time.sleep(1)
     do_start(name, project)
 
 
@@ -734,26 +3413,39 @@ def cmd_restart(
 def cmd_logs(
     name: str = typer.Argument(..., help="Naam van het project"),
     lines: int = typer.Option(50, "--lines", "-n", help="Aantal regels"),
-    follow: bool = typer.Option(False, "--follow", "-f", help="Blijf volgen (tail -f)"),
+    follow: bool = typer.Option(False, "--follow", "-f", help="Blijf alle logbestanden live volgen"),
 ):
     project = get_project(name)
-    path = project.get("path", "")
-    log_files = project.get("log_files", [])
-
-    if not log_files:
-        log_files = [str(p.relative_to(path)) for p in Path(path).glob("*.log")]
+    log_files = _log_names(project)
 
     if not log_files:
         console.print(f"[yellow]Geen log-bestanden gevonden voor '{name}'.[/]")
         return
 
-    if follow and len(log_files) == 1:
-        log_path = Path(path) / log_files[0]
-        console.print(f"[dim]Volgen: {log_path}  (Ctrl+C om te stoppen)[/]\n")
+    if follow:
+        multi = len(log_files) > 1
+
+        def show(label: str, line: str):
+            console.print(Text.assemble((label, "cyan"), " │ ", line) if multi else Text(line),
+                          highlight=False, soft_wrap=True)
+
+        window = read_log_window(project, lines)
+        for row in window["lines"]:
+            show(row["file"], row["text"])
+        console.print(f"[dim]Volgen: {', '.join(log_files)}  (Ctrl+C om te stoppen)[/]\n")
+        follower = LogFollower(
+            {lf: Path(project["path"]) / lf for lf in log_files},
+            start=_decode_cursor(window["newer"]),
+        )
         try:
-            subprocess.run(["tail", "-f", str(log_path)])
+            while True:
+                for label, line in follower.read_new():
+                    show(label, line)
+                follower.wait(1.0)
         except KeyboardInterrupt:
             pass
+        finally:
+            follower.close()
         return
 
     content = read_logs(project, lines)
@@ -761,7 +3453,10 @@ def cmd_logs(
 
 
 @app.command("disk", help="Schijfruimteoverzicht van alle projecten")
-def cmd_disk():
+def cmd_disk(
+    breakdown: bool = typer.Option(False, "--breakdown", "-b", help="Toon grootste submappen per project"),
+    top: int = typer.Option(8, "--top", help="Aantal submappen per project bij --breakdown"),
+):
     projects = load_projects()
     if not projects:
         console.print("[yellow]Geen projecten.[/]")
@@ -777,11 +3472,145 @@ def cmd_disk():
     table.add_column("Grootte", justify="right", style="bold yellow")
 
     for name, project in projects.items():
-        size = get_disk_usage(project)
-        table.add_row(name, project.get("path", "?"), size)
+        usage = get_disk_breakdown(project)
+        if not usage:
+            table.add_row(name, project.get("path", "?"), "?")
+            continue
+        table.add_row(name, project.get("path", "?"), _human_size(usage["total"]))
+        if breakdown:
+            parts = sorted(usage["breakdown"].items(), key=lambda kv: kv[1], reverse=True)
+            for sub, size in parts[:top]:
+                table.add_row("", f"[dim]└ {sub}/[/]", f"[yellow]{_human_size(size)}[/]")
+            if usage["files"]:
+                table.add_row("", "[dim]└ (bestanden)[/]", f"[yellow]{_human_size(usage['files'])}[/]")
+
+    console.print()
+    console.print(table)
+
+
+@app.command("tokens", help="Tokenverbruik per uur/dag en huidig verbruik")
+def cmd_tokens(
+    name: Optional[str] = typer.Argument(None, help="Projectnaam (leeg = alle)"),
+    since: str = typer.Option("24h", "--since", "-s", help="Periode, bv. 6h, 24h, 7d"),
+    step: Optional[str] = typer.Option(None, "--step", help="Bucketgrootte, bv. 15m, 1h, 1d"),
+):
+    try:
+        since_s = _parse_duration(since)
+        step_s = _parse_duration(step) if step else (3600 if since_s <= 2 * 86400 else 86400)
+        TokenSeries.tier(since_s, step_s)
+    except ValueError as e:
+        console.print(f"[red]✗  {e}[/]")
+        raise typer.Exit(1)
+
+    projects = load_projects()
+    targets = {name: get_project(name)} if name else projects
+    # Alleen nieuw toegevoegde logregels inlezen; de rest komt uit de buckets
+    for pname, project in targets.items():
+        parse_token_usage(project, pname)
+    start = time.time() - since_s
+
+    if name:
+        table = Table(box=box.SIMPLE, header_style="bold cyan",
+                      title=f"[bold]Tokens — {name}[/] (laatste {since})")
+        table.add_column("Vanaf")
+        table.add_column("Tokens", justify="right", style="bold yellow")
+        points = token_series.query(name, start, step=step_s)
+        fmt = "%Y-%m-%d %H:%M" if step_s < 86400 else "%Y-%m-%d"
+        for point in points:
+            tokens = point["tokens"]
+            table.add_row(time.strftime(fmt, time.localtime(point["t"])), f"{tokens:,}" if tokens else "[dim]—[/]")
+        console.print()
+        console.print(table)
+        console.print(f"  [dim]Totaal:[/] [bold]{sum(p['tokens'] for p in points):,}[/]   "
+                      f"[dim]Huidig verbruik:[/] [bold]{token_series.rate_per_hour(name):,.0f}[/] /uur\n")
+        return
+
+    table = Table(box=box.SIMPLE, header_style="bold cyan",
+                  title=f"[bold]Tokenverbruik[/] (laatste {since})")
+    table.add_column("Project", style="bold white")
+    table.add_column("Tokens", justify="right", style="bold yellow")
+    table.add_column("Per uur nu", justify="right")
+    for pname in targets:
+        total = sum(p["tokens"] for p in token_series.query(pname, start, step=step_s))
+        rate = token_series.rate_per_hour(pname)
+        table.add_row(pname, f"{total:,}" if total else "—", f"{rate:,.0f}" if rate else "—")
+    console.print()
+    console.print(table)
+
+
+@app.command("report", help="Resourcegebruik per project uit het metriekarchief")
+def cmd_report(
+    projects: Optional[List[str]] = typer.Option(None, "--project", "-p", help="Alleen dit project (meerdere mogelijk)"),
+    since: str = typer.Option("7d", "--since", "-s", help="Periode, bv. 24h, 7d, 30d"),
+):
+    try:
+        since_s = _parse_duration(since)
+    except ValueError as e:
+        console.print(f"[red]✗  {e}[/]")
+        raise typer.Exit(1)
+
+    rows = metrics_archive.report(since_s, projects)
+    if not rows:
+        console.print("[yellow]⚠  Geen archiefgegevens voor deze periode. "
+                      "Start het dashboard met: [bold]pmctl web --archive[/][/]")
+        return
 
+    table = Table(box=box.SIMPLE, header_style="bold cyan",
+                  title=f"[bold]Resourcegebruik[/] (laatste {since})")
+    table.add_column("Project", style="bold white")
+    table.add_column("Uptime", justify="right")
+    table.add_column("CPU-uren", justify="right", style="yellow")
+    table.add_column("Geheugen p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("max", justify="right", style="bold")
+    for name, r in rows.items():
+        pct = r["uptime_s"] / r["measured_s"] * 100 if r["measured_s"] else 0
+        running = r["uptime_s"] > 0
+        table.add_row(
+            name,
+            f"{r['uptime_s'] / 3600:.1f}u [dim]({pct:.0f}%)[/]",
+            f"{r['cpu_hours']:.2f}" if running else "—",
+            f"{r['mem_p50']:.0f} MB" if running else "—",
+            f"{r['mem_p95']:.0f} MB" if running else "—",
+            f"{r['mem_max']:.0f} MB" if running else "—",
+        )
     console.print()
     console.print(table)
+    resolution = next(iter(rows.values()))["resolution"]
+    console.print(f"  [dim]Uptime t.o.v. gemeten tijd; percentielen over {resolution // 60}-minuutgemiddelden.[/]\n")
+
+
+@app.command("grep", help="Zoek (regex) in de logs van alle projecten via de log-index")
+def cmd_grep(
+    pattern: str = typer.Argument(..., help="Reguliere expressie"),
+    project: Optional[List[str]] = typer.Option(None, "--project", "-p", help="Alleen deze project(en)"),
+    since: Optional[str] = typer.Option(None, "--since", "-s", help="Alleen recenter dan, bv. 1h, 2d"),
+    ignore_case: bool = typer.Option(False, "--ignore-case", "-i", help="Hoofdletterongevoelig"),
+    limit: int = typer.Option(200, "--limit", "-n", help="Max aantal treffers"),
+):
+    projects = load_projects()
+    targets = {p: get_project(p) for p in project} if project else projects
+    try:
+        since_ts = time.time() - _parse_duration(since) if since else None
+        result = log_index.search(pattern, targets, since_ts, ignore_case, limit)
+    except (ValueError, re.error) as e:
+        console.print(f"[red]✗  {e}[/]")
+        raise typer.Exit(1)
+
+    for hit in result["matches"]:
+        a, b = hit["span"]
+        line = Text(hit["text"])
+        line.stylize("bold red", a, b)
+        console.print(Text.assemble((f"{hit['project']}/{hit['file']}", "cyan"), ": ", line),
+                      highlight=False, soft_wrap=True)
+
+    stats = result["stats"]
+    console.print(
+        f"\n  [dim]{len(result['matches'])} treffer(s){' (afgekapt)' if result['truncated'] else ''}  •  "
+        f"{stats['blocks_read']}/{stats['blocks']} blokken gelezen ({_human_size(stats['bytes_read'])})[/]"
+    )
+    if stats["unindexed_bytes"]:
+        console.print(f"  [dim]{_human_size(stats['unindexed_bytes'])} oudere logs valt buiten de index-limiet.[/]")
 
 
 @app.command("deps", help="Dependencies van een project tonen")
@@ -824,8 +3653,7 @@ def cmd_add(
         console.print(f"[red]✗  Pad bestaat niet: {p}[/]")
         raise typer.Exit(1)
 
-    projects = load_projects()
-    if name in projects:
+    if config.get(name) is not None:
         console.print(f"[yellow]⚠  '{name}' bestaat al. Gebruik een andere naam of verwijder het eerst.[/]")
         raise typer.Exit(1)
 
@@ -858,10 +3686,12 @@ def cmd_add(
         "log_files": [],
         "notes": "",
     }
-    projects[name] = entry
-    save_projects(projects)
+    config.put(name, entry)
     console.print(f"[green]✓  '{name}' toegevoegd.[/]")
-    console.print(f"   [dim]Bewerk {PROJECTS_FILE} om poorten, relaties en notities in te stellen.[/]")
+    if isinstance(config, SqliteConfigStore):
+        console.print("   [dim]Poorten, relaties en notities instellen: pmctl config export, bewerken, pmctl config import.[/]")
+    else:
+        console.print(f"   [dim]Bewerk {PROJECTS_FILE} om poorten, relaties en notities in te stellen.[/]")
 
 
 @app.command("remove", help="Project verwijderen uit de lijst")
@@ -875,35 +3705,64 @@ def cmd_remove(
         if not bevestig:
             console.print("[dim]Geannuleerd.[/]")
             return
-    projects = load_projects()
-    del projects[name]
-    save_projects(projects)
+    config.delete(name)
     console.print(f"[green]✓  '{name}' verwijderd.[/]")
 
 
 def _resolve_port(service: str, preferred: int) -> int:
     """Vraag poort op bij centraal register; fallback naar preferred."""
     try:
-        import urllib.request, json as _json
-        body = _json.dumps({
+        port = port_registry.request("POST", "/ports/request", {
             "service": service, "project": "pmctl",
             "description": "pmctl web dashboard",
             "preferred_port": preferred,
-        }).encode()
-        req = urllib.request.Request(
-            "http://localhost:4444/ports/request",
-            data=body, headers={"Content-Type": "application/json"}, method="POST"
-        )
-        with urllib.request.urlopen(req, timeout=2) as r:
-            return _json.loads(r.read())["port"]
+        })["port"]
     except Exception:
         return preferred  # Register niet actief → gebruik default
+    port_registry.invalidate()
+    return port
+
+
+# ── Projectregister (JSON ↔ SQLite) ───────────────────────────────────────────
+config_app = typer.Typer(help="Projectregister: projects.json ↔ projects.db (SQLite)", no_args_is_help=True)
+app.add_typer(config_app, name="config")
+
+
+@config_app.command("import", help="JSON-config in projects.db laden; daarna gebruikt pmctl het SQLite-register")
+def cmd_config_import(
+    source: Path = typer.Argument(PROJECTS_FILE, help="JSON-bestand in het formaat van projects.json"),
+):
+    try:
+        with open(source) as f:
+            projects = json.load(f).get("projects", {})
+    except (OSError, ValueError) as e:
+        console.print(f"[red]✗  Kan {source} niet lezen: {e}[/]")
+        raise typer.Exit(1)
+    store = config if isinstance(config, SqliteConfigStore) else SqliteConfigStore()
+    store.save(projects)
+    console.print(f"[green]✓  {len(projects)} projecten geïmporteerd in {store.path}[/]")
+    console.print("   [dim]pmctl leest nu het SQLite-register; projects.json wordt niet meer gebruikt.[/]")
+
+
+@config_app.command("export", help="Register exporteren naar JSON")
+def cmd_config_export(
+    target: Path = typer.Argument(PROJECTS_FILE, help="Doelbestand"),
+    disable: bool = typer.Option(False, "--disable", help="Daarna projects.db verwijderen (terug naar JSON)"),
+):
+    projects = load_projects()
+    _write_atomic(target, json.dumps({"projects": projects}, indent=2))
+    console.print(f"[green]✓  {len(projects)} projecten geëxporteerd naar {target}[/]")
+    if disable and isinstance(config, SqliteConfigStore):
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{config.path}{suffix}").unlink(missing_ok=True)
+        console.print(f"   [dim]{config.path.name} verwijderd; pmctl gebruikt weer {target.name}.[/]")
 
 
 @app.command("web", help="Web dashboard starten (standaard poort 7777)")
 def cmd_web(
     port: int = typer.Option(7777, "--port", "-p", help="Poort voor het dashboard"),
     host: str = typer.Option("0.0.0.0", "--host", help="Bind-adres"),
+    archive: bool = typer.Option(False, "--archive", help="Metingen bewaren in .pmctl/metrics.db (voor pmctl report)"),
 ):
     if not HAS_FASTAPI:
         console.print("[red]✗  FastAPI niet geïnstalleerd. Voer uit: pip install fastapi uvicorn[/]")
@@ -916,9 +3775,11 @@ def cmd_web(
 
     console.print(f"\n[bold green]pmctl Web Dashboard[/]")
     console.print(f"  [cyan]http://localhost:{port}[/]\n")
+    if archive:
+        console.print(f"  [dim]Metriekarchief: {metrics_archive.path}[/]")
     console.print(f"  [dim]Ctrl+C om te stoppen[/]\n")
 
-    web_app = build_fastapi_app()
+    web_app = build_fastapi_app(archive=archive)
     _uvicorn.run(web_app, host=host, port=port, log_level="warning")
 
 
@@ -926,8 +3787,589 @@ def cmd_web(
 # WEB SERVER (FastAPI)
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def build_fastapi_app():
-    web = FastAPI(title="pmctl", docs_url=None, redoc_url=None)
+# ── Metriekgeschiedenis ───────────────────────────────────────────────────────
+# (resolutie in seconden, aantal buckets): 1 s × 10 min, 10 s × 6 uur, 1 min × 7 dagen
+HISTORY_TIERS = ((1, 600), (10, 2160), (60, 10080))
+HISTORY_METRICS = ("cpu", "rss", "procs", "ports")
+# Vaste kosten per project: bucketnummer (4 B) + som per metriek (4 B) + aantal (2 B)
+HISTORY_BYTES_PER_PROJECT = sum(size for _, size in HISTORY_TIERS) * (4 + 4 * len(HISTORY_METRICS) + 2)
+
+
+class _HistoryRing:
+    """Eén resolutie: `size` buckets van `step` seconden, kolomsgewijs in arrays."""
+
+    __slots__ = ("step", "size", "buckets", "sums", "counts")
+
+    def __init__(self, step: int, size: int):
+        self.step = step
+        self.size = size
+        self.buckets = array("I", [0]) * size   # t // step van de bucket op deze plek
+        self.sums = {m: array("f", [0.0]) * size for m in HISTORY_METRICS}
+        self.counts = array("H", [0]) * size
+
+    def add(self, ts: float, values: Dict[str, float]):
+        bucket = int(ts // self.step)
+        i = bucket % self.size
+        if self.buckets[i] != bucket:
+            # Oude bucket op deze plek overschrijven
+            self.buckets[i] = bucket
+            self.counts[i] = 0
+            for m in HISTORY_METRICS:
+                self.sums[m][i] = 0.0
+        if self.counts[i] < 0xFFFF:
+            self.counts[i] += 1
+            for m in HISTORY_METRICS:
+                self.sums[m][i] += values.get(m, 0.0)
+
+    def series(self, start: float, end: float) -> Dict[str, Any]:
+        first, last = int(start // self.step), int(end // self.step)
+        first = max(first, last - self.size + 1)
+        out: Dict[str, Any] = {"start": first * self.step, "step": self.step}
+        cols: Dict[str, List[Optional[float]]] = {m: [] for m in HISTORY_METRICS}
+        for bucket in range(first, last + 1):
+            i = bucket % self.size
+            n = self.counts[i] if self.buckets[i] == bucket else 0
+            for m in HISTORY_METRICS:
+                cols[m].append(round(self.sums[m][i] / n, 2) if n else None)
+        out.update(cols)
+        return out
+
+
+class MetricsHistory:
+    """
+    Geschiedenis van cpu, geheugen (rss, MB), aantal processen en open poorten per
+    project, in ringbuffers met vaste grootte per resolutie. Elke meting gaat in
+    alle resoluties (gemiddelde per bucket), dus het geheugengebruik is vooraf
+    bekend (HISTORY_BYTES_PER_PROJECT) en groeit niet met de uptime.
+    """
+
+    def __init__(self, tiers=HISTORY_TIERS):
+        self.tiers = tiers
+        self._rings: Dict[str, List[_HistoryRing]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, ts: float, values: Dict[str, float]):
+        with self._lock:
+            rings = self._rings.get(name)
+            if rings is None:
+                rings = self._rings[name] = [_HistoryRing(step, size) for step, size in self.tiers]
+            for ring in rings:
+                ring.add(ts, values)
+
+    def retain(self, names: Iterable[str]):
+        """Vergeet projecten die niet meer bestaan."""
+        keep = set(names)
+        with self._lock:
+            for name in [n for n in self._rings if n not in keep]:
+                del self._rings[name]
+
+    def query(self, name: str, range_s: float, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Kolommen per metriek over de laatste `range_s` seconden, uit de fijnste resolutie die dat dekt."""
+        now = now or time.time()
+        with self._lock:
+            rings = self._rings.get(name)
+            if rings is None:
+                return None
+            ring = next((r for r in rings if r.step * r.size >= range_s), rings[-1])
+            return ring.series(now - range_s, now)
+
+
+history = MetricsHistory()
+
+
+# ── Achtergrond-collector ─────────────────────────────────────────────────────
+# Interval per collector (seconden): goedkope runtimevelden vaak, dure velden zelden
+COLLECT_INTERVALS: Dict[str, float] = {
+    "processes": 1.0,   # status, geheugen, cpu, poorten
+    "tokens": 30.0,
+    "disk": 300.0,
+    "deps": 600.0,
+}
+
+# Velden van de trage collectors. Zo'n collector draait alleen zolang iemand een
+# van zijn velden de afgelopen COLLECT_DEMAND_TTL seconden opvroeg (API, stream, /metrics)
+COLLECTOR_FIELDS: Dict[str, tuple] = {
+    "tokens": ("token_usage", "token_rate"),
+    "disk": ("disk_usage", "disk_bytes"),
+    "deps": ("dependencies",),
+}
+# Detailvelden: alleen bijgehouden voor projecten waarvan ze opgevraagd zijn (uitgeklapte kaart)
+DETAIL_FIELDS = ("processes", "dependencies")
+COLLECT_DEMAND_TTL = 300.0
+
+# Standaardwaarden zolang een trage collector nog niet gedraaid heeft
+_SLOW_DEFAULTS: Dict[str, Any] = {
+    "disk_usage": "...",
+    "disk_bytes": None,
+    "token_usage": 0,
+    "token_rate": 0,
+    "dependencies": {},
+}
+
+
+# Ruisvelden worden pas bijgewerkt als de verandering boven de drempel komt,
+# zodat een stil systeem geen nieuwe versies (en dus geen stream-events) oplevert
+NOISE_THRESHOLDS: Dict[str, float] = {
+    "memory_mb": 5.0,
+    "cpu_percent": 2.0,
+}
+CHANGE_LOG_SIZE = 500  # aantal versies dat de collector als diff bijhoudt
+STREAM_POLL = 0.25      # hoe vaak een stream-client de collectorversie controleert
+STREAM_KEEPALIVE = 15.0
+# Histogramgrenzen (seconden) voor de duur van een collectorronde
+COLLECT_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _json_bytes(obj: Any) -> bytes:
+    """JSON-bytes; via orjson als dat geïnstalleerd is."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode()
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    """Controleer een If-None-Match header (lijst, W/-prefix of *) tegen een ETag."""
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+
+class _Histogram:
+    """Cumulatieve histogram zoals Prometheus die verwacht: teller per bucketgrens, som en aantal."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple = COLLECT_DURATION_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+# (metriek, type, omschrijving, waarde uit de projectinfo; None = weglaten)
+PROJECT_METRICS = (
+    ("pmctl_project_up", "gauge", "1 als het project draait, anders 0",
+     lambda i: 1 if i.get("status") == "running" else 0),
+    ("pmctl_project_memory_bytes", "gauge", "RSS van alle processen van het project",
+     lambda i: int(i.get("memory_mb", 0) * 1024 * 1024)),
+    ("pmctl_project_cpu_percent", "gauge", "CPU-gebruik van alle processen van het project",
+     lambda i: i.get("cpu_percent", 0)),
+    ("pmctl_project_processes", "gauge", "Aantal processen van het project",
+     lambda i: i.get("pid_count", 0)),
+    ("pmctl_project_open_ports", "gauge", "Aantal verwachte poorten dat luistert",
+     lambda i: len(i.get("open_ports", []))),
+    ("pmctl_project_disk_bytes", "gauge", "Schijfgebruik van de projectmap",
+     lambda i: i.get("disk_bytes")),
+    # Gauge, geen counter: het totaal kan dalen (ander voorrangspatroon, teller gereset)
+    ("pmctl_project_tokens", "gauge", "Tokens volgens de projectlogs",
+     lambda i: i.get("token_usage", 0)),
+)
+
+
+def _prom_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _project_metrics(state: Dict[str, Dict[str, Any]]) -> str:
+    """Projectmetrieken in het tekstformaat van Prometheus."""
+    lines = []
+    for metric, kind, help_text, value in PROJECT_METRICS:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, info in state.items():
+            v = value(info)
+            if v is None:
+                continue
+            labels = f'project="{_prom_label(name)}",category="{_prom_label(info.get("category", ""))}"'
+            lines.append(f"{metric}{{{labels}}} {v}")
+    return "\n".join(lines) + "\n"
+
+
+def _suppress_noise(old: Dict[str, Any], new: Dict[str, Any]):
+    """Houd kleine schommelingen van ruisvelden tegen (past `new` ter plekke aan)."""
+    for field, threshold in NOISE_THRESHOLDS.items():
+        if old.get(field) is not None and new.get(field) is not None and abs(new[field] - old[field]) < threshold:
+            new[field] = old[field]
+    # Proceslijst alleen vervangen als er echt iets aan de processen veranderde
+    if (new.get("processes") and old.get("processes")
+            and all(new.get(f) == old.get(f) for f in NOISE_THRESHOLDS)
+            and [p["pid"] for p in new["processes"]] == [p["pid"] for p in old["processes"]]):
+        new["processes"] = old["processes"]
+
+
+PROJECT_STATUSES = ("running", "stopped")
+PAGE_MAX = 1000  # maximale paginagrootte van /api/projects
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[frozenset]:
+    """'status,memory_mb' → verzameling veldnamen; leeg = alle velden (None)."""
+    if not fields:
+        return None
+    return frozenset(f.strip() for f in fields.split(",") if f.strip())
+
+
+def _pick(info: Dict[str, Any], fields: Optional[frozenset]) -> Dict[str, Any]:
+    return info if fields is None else {k: v for k, v in info.items() if k in fields}
+
+
+def _encode_page_cursor(name: str) -> str:
+    return base64.urlsafe_b64encode(name.encode()).decode().rstrip("=")
+
+
+def _decode_page_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode()
+    except ValueError:
+        raise ValueError("ongeldige cursor")
+
+
+class ProjectCollector:
+    """
+    Houdt de projectstatus voor het dashboard in het geheugen bij.
+    Elke collector draait in een eigen thread met een eigen deadline;
+    endpoints serialiseren alleen de huidige toestand.
+    """
+
+    def __init__(self, intervals: Optional[Dict[str, float]] = None, workers: int = 8,
+                 archive: Optional[MetricsArchive] = None):
+        self.intervals = {**COLLECT_INTERVALS, **(intervals or {})}
+        self.archive = archive
+        self._collectors = {
+            "processes": self._collect_processes,
+            "tokens": self._collect_tokens,
+            "disk": self._collect_disk,
+            "deps": self._collect_deps,
+        }
+        self._fields: Dict[str, Dict[str, Dict[str, Any]]] = {c: {} for c in self._collectors}
+        self._projects: Dict[str, Any] = {}
+        self._state: Dict[str, Dict[str, Any]] = {}
+        # Versies tellen door vanaf de starttijd (ms): na een herstart zijn ze groter dan
+        # alles wat de vorige server uitgaf, en het tijdperk zit ook in elke ETag
+        self.epoch = int(time.time() * 1000)
+        self.version = self.epoch
+        self._changes: deque = deque(maxlen=CHANGE_LOG_SIZE)  # (versie, gewijzigd, verwijderd)
+        self._project_versions: Dict[str, int] = {}  # laatste versie waarin een project veranderde
+        self._encoded: Dict[str, tuple] = {}           # sleutel → (versie, json, gzip)
+        self._lock = threading.Lock()
+        self._flight = _SingleFlight()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._deadlines = {c: 0.0 for c in self._collectors}
+        self._durations = {c: _Histogram() for c in self._collectors}
+        self._last_run: Dict[str, float] = {}
+        self._demand: Dict[str, float] = {}  # collector of "detail:<project>" → laatste vraag
+        self._wake = {c: threading.Event() for c in self._collectors}
+        self._stop = threading.Event()
+
+    def start(self):
+        for c in self._collectors:
+            threading.Thread(target=self._loop, args=(c,), daemon=True, name=f"pmctl-{c}").start()
+        threading.Thread(target=self._watch_config, daemon=True, name="pmctl-config").start()
+
+    def stop(self):
+        self._stop.set()
+        for ev in self._wake.values():
+            ev.set()
+        self._pool.shutdown(wait=False)
+        if self.archive:
+            self.archive.flush()
+
+    def poke(self, *collectors: str):
+        """Laat collectors (standaard: processen) meteen opnieuw draaien."""
+        for c in collectors or ("processes",):
+            self._deadlines[c] = 0.0
+            self._wake[c].set()
+
+    def want(self, fields: Optional[Iterable[str]] = None, names: Optional[Iterable[str]] = None):
+        """
+        Meld dat `fields` (None = alle) gevraagd worden, detailvelden voor `names`
+        (None = alle projecten). Een trage collector waarvan de gegevens ouder zijn
+        dan zijn interval draait meteen.
+        """
+        now = time.monotonic()
+        wanted = None if fields is None else set(fields)
+        if wanted is None or wanted.intersection(DETAIL_FIELDS):
+            for name in ("*",) if names is None else names:
+                self._demand[f"detail:{name}"] = now
+        for c, produced in COLLECTOR_FIELDS.items():
+            if wanted is None or wanted.intersection(produced):
+                self._demand[c] = now
+                if time.time() - self._last_run.get(c, 0.0) > self.intervals[c]:
+                    self.poke(c)
+
+    def load_details(self, names: Optional[Iterable[str]] = None, fields: Optional[Iterable[str]] = None):
+        """
+        Ontbrekende detailvelden meteen berekenen, voor `names` (None = alle projecten),
+        bv. een net uitgeklapte kaart. Roep eerst want() aan.
+        """
+        wanted = set(DETAIL_FIELDS if fields is None else fields)
+        names = list(self._projects) if names is None else list(names)
+        procs, deps = self._fields["processes"], self._fields["deps"]
+        if "processes" in wanted and any("processes" not in procs.get(n, {}) for n in names):
+            self.collect("processes")
+        if "dependencies" in wanted and any(n not in deps for n in names):
+            self.collect("deps")
+
+    def _wanted(self, key: str, now: float) -> bool:
+        return now - self._demand.get(key, float("-inf")) < COLLECT_DEMAND_TTL
+
+    def _detail_names(self, projects: Dict[str, Any]) -> Set[str]:
+        now = time.monotonic()
+        if self._wanted("detail:*", now):
+            return set(projects)
+        return {name for name in projects if self._wanted(f"detail:{name}", now)}
+
+    def collect(self, collector: str):
+        """Draai één collector; gelijktijdige aanroepen delen het resultaat."""
+        return self._flight.do(collector, lambda: self._run(collector))
+
+    def projects(self) -> Dict[str, Dict[str, Any]]:
+        if not self._projects:
+            self.collect("processes")
+        return self._state
+
+    def project(self, name: str) -> Optional[Dict[str, Any]]:
+        if name not in self._state:
+            self.collect("processes")
+        return self._state.get(name)
+
+    def project_entry(self, name: str):
+        """(versie van dit project, info) of None."""
+        info = self.project(name)
+        if info is None:
+            return None
+        with self._lock:
+            return self._project_versions.get(name, 0), self._state.get(name, info)
+
+    def encoded(self, key: str, version: int, build, encode=_json_bytes) -> tuple:
+        """JSON- (of `encode`-) en gzip-bytes voor `key`, één keer gecodeerd en gecomprimeerd per versie."""
+        with self._lock:
+            hit = self._encoded.get(key)
+        if hit and hit[0] == version:
+            return hit[1], hit[2]
+
+        def _encode():
+            raw = encode(build())
+            entry = (version, raw, gzip.compress(raw, 6))
+            with self._lock:
+                self._encoded[key] = entry
+            return entry
+
+        _, raw, gz = self._flight.do(("encode", key, version), _encode)
+        return raw, gz
+
+    def snapshot(self):
+        """(versie, toestand) als één consistent paar."""
+        if not self._projects:
+            self.collect("processes")
+        with self._lock:
+            return self.version, self._state
+
+    def changes_since(self, version: int):
+        """
+        Samengevoegde veldwijzigingen sinds `version`: (versie, {project: {veld: waarde}}, verwijderd).
+        Geeft None als de versie niet meer in het wijzigingslog staat of nieuwer is dan
+        de huidige (uitgegeven door een andere serverinstantie).
+        """
+        with self._lock:
+            current = self.version
+            if version > current:
+                return None
+            if version == current:
+                return current, {}, []
+            if not self._changes or self._changes[0][0] > version + 1:
+                return None
+            merged: Dict[str, Dict[str, Any]] = {}
+            removed: Set[str] = set()
+            for v, changed, gone in self._changes:
+                if v <= version:
+                    continue
+                for name, fields in changed.items():
+                    merged.setdefault(name, {}).update(fields)
+                    removed.discard(name)
+                for name in gone:
+                    merged.pop(name, None)
+                    removed.add(name)
+            return current, merged, sorted(removed)
+
+    def _loop(self, collector: str):
+        while not self._stop.is_set():
+            delay = self._deadlines[collector] - time.monotonic()
+            if delay > 0:
+                self._wake[collector].wait(delay)
+                self._wake[collector].clear()
+                if self._stop.is_set():
+                    break
+            if collector in COLLECTOR_FIELDS and not self._wanted(collector, time.monotonic()):
+                # Niemand vraagt deze velden: wachten tot want() hem weer nodig heeft
+                self._deadlines[collector] = time.monotonic() + self.intervals[collector]
+                continue
+            try:
+                self.collect(collector)
+            except Exception as e:
+                console.print(f"[red]✗  Collector '{collector}' mislukt: {e}[/]")
+            self._deadlines[collector] = time.monotonic() + self.intervals[collector]
+
+    def collector_metrics(self) -> str:
+        """Duur en tijdstip van de collectorrondes in het tekstformaat van Prometheus."""
+        metric = "pmctl_collector_duration_seconds"
+        lines = [f"# HELP {metric} Duur van een collectorronde",
+                 f"# TYPE {metric} histogram"]
+        for c, h in self._durations.items():
+            for bound, n in zip(h.bounds, h.counts):
+                lines.append(f'{metric}_bucket{{collector="{c}",le="{bound}"}} {n}')
+            lines.append(f'{metric}_bucket{{collector="{c}",le="+Inf"}} {h.count}')
+            lines.append(f'{metric}_sum{{collector="{c}"}} {h.sum:.6f}')
+            lines.append(f'{metric}_count{{collector="{c}"}} {h.count}')
+        lines += ["# HELP pmctl_collector_last_run_timestamp_seconds Einde van de laatste geslaagde ronde",
+                  "# TYPE pmctl_collector_last_run_timestamp_seconds gauge"]
+        for c, ts in self._last_run.items():
+            lines.append(f'pmctl_collector_last_run_timestamp_seconds{{collector="{c}"}} {ts:.3f}')
+        lines += ["# HELP pmctl_state_version Versie van de projecttoestand",
+                  "# TYPE pmctl_state_version gauge",
+                  f"pmctl_state_version {self.version}"]
+        return "\n".join(lines) + "\n"
+
+    def _run(self, collector: str):
+        t0 = time.perf_counter()
+        projects = load_projects()
+        results = self._collectors[collector](projects)
+        self._durations[collector].observe(time.perf_counter() - t0)
+        self._last_run[collector] = time.time()
+        with self._lock:
+            self._fields[collector] = results
+            if collector == "processes":
+                first = not self._projects
+                changed = [n for n, p in projects.items() if self._projects.get(n) != p]
+                self._projects = projects
+            self._rebuild()
+        # Nieuwe of gewijzigde projecten (hot reload) meteen ook door de trage collectors halen
+        if collector == "processes" and changed and not first:
+            self.poke("tokens", "disk", "deps")
+
+    def _watch_config(self):
+        """
+        Herlaad de config zodra projects.json of projects.db verandert (inotify). Zonder
+        inotify pikt de processen-collector een wijziging binnen zijn interval op.
+        """
+        fd = _inotify_watch({str(config.path.parent)})
+        if fd is None:
+            return
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd], [], [], 1.0)
+                if not ready:
+                    continue
+                try:
+                    while os.read(fd, 65536):
+                        pass
+                except BlockingIOError:
+                    pass
+                version = config.version
+                load_projects()
+                if config.version != version:
+                    self.poke()
+        finally:
+            os.close(fd)
+
+    def _rebuild(self):
+        old_state = self._state
+        state: Dict[str, Dict[str, Any]] = {}
+        changed: Dict[str, Dict[str, Any]] = {}
+        for name, project in self._projects.items():
+            info = {**_static_info(name, project), **_SLOW_DEFAULTS}
+            for fields in self._fields.values():
+                info.update(fields.get(name, {}))
+            old = old_state.get(name)
+            if old is None:
+                changed[name] = info
+            else:
+                _suppress_noise(old, info)
+                delta = {k: v for k, v in info.items() if old.get(k) != v}
+                # Weggevallen velden (bv. processes na het stoppen) als null meesturen
+                delta.update((k, None) for k in old if k not in info)
+                if delta:
+                    changed[name] = delta
+            state[name] = info
+        removed = [name for name in old_state if name not in state]
+        self._state = state
+        if changed or removed:
+            self.version += 1
+            self._changes.append((self.version, changed, removed))
+            for name in changed:
+                self._project_versions[name] = self.version
+            for name in removed:
+                self._project_versions.pop(name, None)
+                self._encoded.pop(f"project:{name}", None)
+
+    def _per_project(self, projects: Dict[str, Any], fn) -> Dict[str, Dict[str, Any]]:
+        return dict(self._pool.map(lambda item: (item[0], fn(*item)), projects.items()))
+
+    def _collect_processes(self, projects: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        snapshot = SystemSnapshot(projects)
+        conflicts = get_port_conflicts(projects)
+        details = self._detail_names(projects)
+        results = {name: _runtime_info(name, snapshot, conflicts, name in details, cpu_lifetime=False)
+                   for name in projects}
+        # Ongefilterde meetwaarden (vóór de ruisonderdrukking) naar de geschiedenis;
+        # een ronde met een nog ongemeten proces (cpu None) slaat de geschiedenis over
+        for name, info in results.items():
+            if info["cpu_percent"] is None:
+                continue
+            history.record(name, snapshot.taken_at, {
+                "cpu": info["cpu_percent"],
+                "rss": info["memory_mb"],
+                "procs": info["pid_count"],
+                "ports": len(info["open_ports"]),
+            })
+        history.retain(projects)
+        if self.archive:
+            self.archive.add(snapshot.taken_at, results)
+        return results
+
+    def _collect_tokens(self, projects: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        return self._per_project(projects, lambda name, p: {
+            "token_usage": parse_token_usage(p, name),
+            "token_rate": round(token_series.rate_per_hour(name)),
+        })
+
+    def _collect_disk(self, projects: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        def _disk(name: str, project: Dict[str, Any]) -> Dict[str, Any]:
+            usage = get_disk_breakdown(project)
+            return {
+                "disk_usage": _human_size(usage["total"]) if usage else "?",
+                "disk_bytes": usage["total"] if usage else None,
+            }
+
+        return self._per_project(projects, _disk)
+
+    def _collect_deps(self, projects: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        details = self._detail_names(projects)
+        projects = {name: p for name, p in projects.items() if name in details}
+        return self._per_project(projects, lambda name, p: {"dependencies": get_dependencies(p)})
+
+
+def build_fastapi_app(archive: bool = False):
+    collector = ProjectCollector(archive=metrics_archive if archive else None)
+    jobs = JobManager()
+
+    @asynccontextmanager
+    async def lifespan(_app):
+        collector.start()
+        yield
+        jobs.shutdown()
+        collector.stop()
+
+    web = FastAPI(title="pmctl", docs_url=None, redoc_url=None, lifespan=lifespan)
+    web.state.collector = collector
+    web.state.jobs = jobs
     web.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -939,17 +4381,152 @@ def build_fastapi_app():
     def index():
         return HTML_TEMPLATE
 
+    def cached_json(request: Request, key: str, version: int, build, variant: str = "") -> Response:
+        """
+        Voorgecodeerd antwoord met ETag; 304 als de client deze versie al heeft.
+        Een variant (filters, veldselectie) krijgt een eigen ETag maar wordt niet
+        bewaard: daar zijn er te veel van. Gzip en ongecomprimeerd zijn verschillende
+        bodies, dus ook verschillende (sterke) ETags.
+        """
+        gzip_ok = "gzip" in request.headers.get("accept-encoding", "")
+        tag = f"{key}-{collector.epoch:x}-{version}"
+        if variant:
+            tag += f"-{zlib.crc32(variant.encode()):08x}"
+        etag = f'"{tag}-gz"' if gzip_ok else f'"{tag}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if variant:
+            raw = _json_bytes(build())
+            gz = gzip.compress(raw, 6) if gzip_ok else None
+        else:
+            raw, gz = collector.encoded(key, version, build)
+        if gzip_ok:
+            headers["Content-Encoding"] = "gzip"
+            return Response(gz, media_type="application/json", headers=headers)
+        return Response(raw, media_type="application/json", headers=headers)
+
     @web.get("/api/projects")
-    def api_projects():
-        projects = load_projects()
+    def api_projects(request: Request, since: Optional[int] = None, fields: Optional[str] = None,
+                     category: Optional[str] = None, status: Optional[str] = None,
+                     limit: Optional[int] = None, cursor: Optional[str] = None):
+        """
+        Alle projecten, of met ?fields= alleen die velden, ?category= / ?status= als
+        filter en ?limit= / ?cursor= voor pagina's (op naam gesorteerd). Trage
+        collectors draaien alleen voor velden die iemand opvraagt.
+        """
+        selected = _parse_fields(fields)
+        if status is not None and status not in PROJECT_STATUSES:
+            return JSONResponse({"error": f"status moet {' of '.join(PROJECT_STATUSES)} zijn"}, status_code=400)
+        if limit is not None and not 1 <= limit <= PAGE_MAX:
+            return JSONResponse({"error": f"limit moet tussen 1 en {PAGE_MAX} liggen"}, status_code=400)
+        paged = limit is not None or cursor is not None
+        try:
+            after = _decode_page_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        size = limit or PAGE_MAX
+        collector.want(selected)
+        if selected is None or "processes" in selected:
+            # Proceslijst hoort bij de processen-collector: één extra ronde, geen wachttijd
+            # op de dependencies (die komen via de achtergrond binnen)
+            collector.load_details(None, ("processes",))
+        version, state = collector.snapshot()
+
+        if since is not None:
+            if category or status or paged:
+                return JSONResponse({"error": "since combineert alleen met fields"}, status_code=400)
+            # Alleen projecten die sinds `since` veranderden (volledige entries)
+            diff = collector.changes_since(since)
+            if diff is None:
+                payload = {"version": version, "full": True,
+                           "projects": {n: _pick(i, selected) for n, i in state.items()}, "removed": []}
+            else:
+                version, changed, removed = diff
+                _, state = collector.snapshot()
+                payload = {
+                    "version": version, "full": False,
+                    "projects": {n: _pick(state[n], selected) for n in changed if n in state},
+                    "removed": removed,
+                }
+            etag = f'"projects-{collector.epoch:x}-{since}-{version}"'
+            return Response(_json_bytes(payload), media_type="application/json",
+                            headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+        if selected is None and not (category or status or paged):
+            return cached_json(request, "projects", version, lambda: state)
+
+        def build() -> Dict[str, Any]:
+            names = [
+                n for n, i in state.items()
+                if (category is None or i.get("category") == category) and (status is None or i.get("status") == status)
+            ]
+            if not paged:
+                return {n: _pick(state[n], selected) for n in names}
+            names = sorted(n for n in names if after is None or n > after)
+            page = names[:size]
+            return {
+                "version": version,
+                "projects": {n: _pick(state[n], selected) for n in page},
+                "next_cursor": _encode_page_cursor(page[-1]) if len(names) > size else None,
+            }
 
-        def load_one(item):
-            name, project = item
-            return name, get_project_info(name, project)
+        variant = repr((sorted(selected) if selected is not None else None, category, status, paged and size, after))
+        return cached_json(request, "projects", version, build, variant)
+
+    @web.get("/api/stream")
+    async def api_stream(request: Request, fields: Optional[str] = None):
+        """
+        Server-Sent Events: volledige snapshot bij verbinden, daarna alleen veldwijzigingen.
+        Met ?fields= alleen die velden (en alleen patches die een ervan raken).
+        """
+        selected = _parse_fields(fields)
+
+        def event(kind: str, version: int, data: Dict[str, Any]) -> str:
+            return f"event: {kind}\nid: {version}\ndata: {_json_bytes(data).decode()}\n\n"
+
+        def project_all(state: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            return {n: _pick(i, selected) for n, i in state.items()}
+
+        async def gen():
+            collector.want(selected)
+            version, state = await asyncio.to_thread(collector.snapshot)
+            yield event("snapshot", version, {"version": version, "projects": project_all(state)})
+            idle = 0.0
+            while not await request.is_disconnected():
+                await asyncio.sleep(STREAM_POLL)
+                collector.want(selected)  # zolang de stream open is blijven de velden gevraagd
+                if collector.version == version:
+                    idle += STREAM_POLL
+                    if idle >= STREAM_KEEPALIVE:
+                        idle = 0.0
+                        yield ": keepalive\n\n"
+                    continue
+                idle = 0.0
+                diff = collector.changes_since(version)
+                if diff is None:
+                    # Te ver achter: opnieuw een volledige snapshot
+                    version, state = collector.snapshot()
+                    yield event("snapshot", version, {"version": version, "projects": project_all(state)})
+                    continue
+                version, changed, removed = diff
+                changed = {n: f for n, f in project_all(changed).items() if f}
+                if changed or removed:
+                    yield event("patch", version, {"version": version, "changed": changed, "removed": removed})
+
+        return StreamingResponse(
+            gen(), media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
-        with ThreadPoolExecutor(max_workers=len(projects) or 1) as ex:
-            result = dict(ex.map(load_one, projects.items()))
-        return JSONResponse(result)
+    @web.get("/metrics")
+    def metrics():
+        # Projectdeel één keer per toestandsversie opgebouwd; collectortijden zijn goedkoop
+        collector.want(("disk_bytes", "token_usage"))
+        version, state = collector.snapshot()
+        raw, _ = collector.encoded("metrics", version, lambda: _project_metrics(state), encode=str.encode)
+        return Response(raw + collector.collector_metrics().encode(),
+                        media_type="text/plain; version=0.0.4; charset=utf-8")
 
     @web.get("/api/system/stats")
     def api_system_stats():
@@ -960,104 +4537,328 @@ def build_fastapi_app():
             "boot_time": psutil.boot_time()
         })
 
+    registry_view = {"key": None, "version": 0}
+    registry_lock = threading.Lock()
+
+    @web.get("/api/registry")
+    def api_registry(request: Request):
+        """
+        Register samengevoegd met pmctl's eigen waarneming: luistert de poort echt en
+        welke projecten claimen hem. De browser praat zo nooit rechtstreeks met het
+        register; een onbereikbaar register levert de laatst bekende stand.
+        """
+        listening = ListenIndex()
+        by_port = port_index(load_projects())["by_port"]
+        services = {
+            svc: {**info, "listening": info.get("port") in listening, "projects": by_port.get(info.get("port"), [])}
+            for svc, info in port_registry.services().items()
+        }
+        status = {"online": port_registry.online, "breaker": port_registry.breaker, "error": port_registry.error}
+        key = (port_registry.version, tuple(status.values()),
+               tuple((svc, info["listening"], tuple(info["projects"])) for svc, info in services.items()))
+        with registry_lock:
+            if key != registry_view["key"]:
+                registry_view["key"] = key
+                registry_view["version"] += 1
+            version = registry_view["version"]
+        return cached_json(request, "registry", version,
+                           lambda: {**status, "url": REGISTRY_URL, "services": services})
+
     @web.get("/api/projects/{name}")
-    def api_project(name: str):
-        projects = load_projects()
-        if name not in projects:
+    def api_project(name: str, request: Request, fields: Optional[str] = None):
+        """Eén project; detailvelden (processen, dependencies) worden pas hier berekend."""
+        selected = _parse_fields(fields)
+        if collector.project(name) is None:
             return JSONResponse({"error": "niet gevonden"}, status_code=404)
-        return JSONResponse(get_project_info(name, projects[name]))
+        collector.want(selected, [name])
+        collector.load_details([name], selected)
+        entry = collector.project_entry(name)
+        if entry is None:
+            return JSONResponse({"error": "niet gevonden"}, status_code=404)
+        version, info = entry
+        if selected is None:
+            return cached_json(request, f"project:{name}", version, lambda: info)
+        return cached_json(request, f"project:{name}", version, lambda: _pick(info, selected), repr(sorted(selected)))
+
+    def job_accepted(job: Dict[str, Any]) -> JSONResponse:
+        return JSONResponse({"success": True, "job": job["id"], "state": job["state"],
+                             "message": f"{job['action']} ingepland"}, status_code=202)
+
+    def run_step(job: Dict[str, Any], name: str, step: str, fn) -> bool:
+        jobs.progress(job, name, step)
+        ok = fn()
+        jobs.progress(job, name, "klaar" if ok else "mislukt")
+        collector.poke()
+        return ok
 
     @web.post("/api/projects/{name}/start")
     def api_start(name: str):
-        projects = load_projects()
-        if name not in projects:
+        project = config.get(name)
+        if project is None:
             return JSONResponse({"success": False, "message": "niet gevonden"}, status_code=404)
-        project = projects[name]
-        if is_running(project):
-            return JSONResponse({"success": False, "message": "draait al"})
 
-        def _start():
-            do_start(name, project)
+        def _start(job):
+            # Pas hier controleren: een eerdere job op dit project kan net gestopt zijn
+            if is_running(project, name):
+                jobs.progress(job, name, "draait al")
+                return False, "draait al"
+            ok = run_step(job, name, "starten", lambda: do_start(name, project))
+            return ok, "gestart" if ok else "starten mislukt"
 
-        t = threading.Thread(target=_start, daemon=True)
-        t.start()
-        return JSONResponse({"success": True, "message": "gestart"})
+        return job_accepted(jobs.submit("start", [name], _start))
 
     @web.post("/api/projects/{name}/stop")
     def api_stop(name: str):
-        projects = load_projects()
-        if name not in projects:
+        project = config.get(name)
+        if project is None:
             return JSONResponse({"success": False, "message": "niet gevonden"}, status_code=404)
-        ok = do_stop(name, projects[name])
-        return JSONResponse({"success": ok})
+
+        def _stop(job):
+            ok = run_step(job, name, "stoppen", lambda: do_stop(name, project))
+            return ok, "gestopt" if ok else "stoppen mislukt"
+
+        return job_accepted(jobs.submit("stop", [name], _stop))
 
     @web.post("/api/projects/{name}/restart")
     def api_restart(name: str):
-        projects = load_projects()
-        if name not in projects:
+        project = config.get(name)
+        if project is None:
             return JSONResponse({"success": False, "message": "niet gevonden"}, status_code=404)
-        project = projects[name]
 
-        def _restart():
-            do_stop(name, project)
-            time.sleep(2)
-            do_start(name, project)
+        def _restart(job):
+            if not run_step(job, name, "stoppen", lambda: do_stop(name, project)):
+                return False, "stoppen mislukt"
+            ok = run_step(job, name, "starten", lambda: do_start(name, project))
+            return ok, "herstart" if ok else "starten mislukt"
+
+        return job_accepted(jobs.submit("restart", [name], _restart))
+
+    @web.get("/api/jobs")
+    def api_jobs():
+        return JSONResponse({"version": jobs.version, "jobs": jobs.recent()})
+
+    @web.get("/api/jobs/stream")
+    async def api_jobs_stream(request: Request, job: Optional[str] = None):
+        """
+        Server-Sent Events: alle (of met ?job= één) jobs bij verbinden, daarna elke
+        wijziging als 'job'-event. Met ?job= sluit de stream zodra die job klaar is.
+        """
+        if job is not None and jobs.get(job) is None:
+            return JSONResponse({"error": "niet gevonden"}, status_code=404)
+
+        def event(kind: str, version: int, data: Any) -> str:
+            return f"event: {kind}\nid: {version}\ndata: {_json_bytes(data).decode()}\n\n"
+
+        async def gen():
+            version = jobs.version
+            current = [jobs.get(job)] if job else jobs.recent()
+            yield event("snapshot", version, {"version": version, "jobs": current})
+            if job and current[0]["finished"] is not None:
+                return
+            idle = 0.0
+            while not await request.is_disconnected():
+                await asyncio.sleep(STREAM_POLL)
+                if jobs.version == version:
+                    idle += STREAM_POLL
+                    if idle >= STREAM_KEEPALIVE:
+                        idle = 0.0
+                        yield ": keepalive\n\n"
+                    continue
+                idle = 0.0
+                version, changed = jobs.changes_since(version)
+                for info in changed:
+                    if job is None or info["id"] == job:
+                        yield event("job", version, info)
+                        if job and info["finished"] is not None:
+                            return
+
+        return StreamingResponse(
+            gen(), media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @web.get("/api/jobs/{job_id}")
+    def api_job(job_id: str):
+        job = jobs.get(job_id)
+        if job is None:
+            return JSONResponse({"error": "niet gevonden"}, status_code=404)
+        return JSONResponse(job)
+
+    @web.get("/api/projects/{name}/tokens")
+    def api_tokens(name: str, range: str = "24h", step: str = "1h"):
+        project = config.get(name)
+        if project is None:
+            return JSONResponse({"error": "niet gevonden"}, status_code=404)
+        # De tokens-collector draait alleen op vraag: houd hem levend en lees nu de nieuwe logregels
+        collector.want(("token_usage",))
+        parse_token_usage(project, name)
+        try:
+            range_s, step_s = _parse_duration(range), _parse_duration(step)
+            points = token_series.query(name, time.time() - range_s, step=step_s)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse({
+            "name": name,
+            "range": range_s,
+            "step": max(60, step_s // 60 * 60),
+            "total": sum(p["tokens"] for p in points),
+            "rate_per_hour": round(token_series.rate_per_hour(name)),
+            "points": points,
+        })
 
-        t = threading.Thread(target=_restart, daemon=True)
-        t.start()
-        return JSONResponse({"success": True, "message": "herstarten..."})
+    @web.get("/api/projects/{name}/history")
+    def api_history(name: str, range: str = "10m"):
+        if config.get(name) is None:
+            return JSONResponse({"error": "niet gevonden"}, status_code=404)
+        try:
+            range_s = _parse_duration(range)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        series = history.query(name, range_s)
+        if series is None:
+            # Nog geen meting (collector net gestart)
+            collector.collect("processes")
+            series = history.query(name, range_s) or {}
+        return JSONResponse({"name": name, "range": range_s, **series})
 
     @web.get("/api/projects/{name}/logs")
-    def api_logs(name: str, lines: int = 100):
-        projects = load_projects()
-        if name not in projects:
+    def api_logs(name: str, lines: int = 100, cursor: Optional[str] = None, direction: str = "older"):
+        project = config.get(name)
+        if project is None:
+            return JSONResponse({"error": "niet gevonden"}, status_code=404)
+        if direction not in ("older", "newer"):
+            return JSONResponse({"error": "direction moet 'older' of 'newer' zijn"}, status_code=400)
+        try:
+            window = read_log_window(project, max(1, min(lines, 5000)), cursor, direction)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse({**window, "content": format_log_window(window)})
+
+    @web.get("/api/projects/{name}/logs/stream")
+    async def api_logs_stream(name: str, request: Request, cursor: Optional[str] = None):
+        """Server-Sent Events met nieuwe logregels van alle logbestanden van het project."""
+        project = config.get(name)
+        if project is None:
             return JSONResponse({"error": "niet gevonden"}, status_code=404)
-        content = read_logs(projects[name], lines)
-        return JSONResponse({"content": content})
+        try:
+            start = _decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        files = {lf: Path(project["path"]) / lf for lf in _log_names(project)}
+        if not files:
+            return JSONResponse({"error": "geen log-bestanden"}, status_code=404)
+
+        async def gen():
+            follower = LogFollower(files, start)
+            loop = asyncio.get_running_loop()
+            ready = asyncio.Event()
+            fd = follower.fileno()
+            if fd is not None:
+                loop.add_reader(fd, ready.set)
+            try:
+                idle = 0.0
+                while not await request.is_disconnected():
+                    lines = follower.read_new()
+                    if lines:
+                        idle = 0.0
+                        data = {"lines": [{"file": f, "text": t} for f, t in lines], "cursor": follower.cursor()}
+                        yield f"event: lines\ndata: {_json_bytes(data).decode()}\n\n"
+                        if follower.pending:
+                            continue
+                    if fd is not None:
+                        try:
+                            await asyncio.wait_for(ready.wait(), STREAM_KEEPALIVE)
+                        except asyncio.TimeoutError:
+                            yield ": keepalive\n\n"
+                        ready.clear()
+                        follower.drain()
+                    else:
+                        await asyncio.sleep(follower.interval)
+                        idle += follower.interval
+                        if idle >= STREAM_KEEPALIVE:
+                            idle = 0.0
+                            yield ": keepalive\n\n"
+            finally:
+                if fd is not None:
+                    loop.remove_reader(fd)
+                follower.close()
+
+        return StreamingResponse(
+            gen(), media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @web.get("/api/logs/search")
+    def api_logs_search(q: str, project: Optional[str] = None, since: Optional[str] = None,
+                        ignore_case: bool = False, limit: int = 200):
+        if project:
+            entry = config.get(project)
+            if entry is None:
+                return JSONResponse({"error": "niet gevonden"}, status_code=404)
+            projects = {project: entry}
+        else:
+            projects = load_projects()
+        try:
+            since_ts = time.time() - _parse_duration(since) if since else None
+            result = log_index.search(q, projects, since_ts, ignore_case, max(1, min(limit, 5000)))
+        except (ValueError, re.error) as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        return JSONResponse(result)
 
     @web.delete("/api/projects/{name}")
     def api_delete_project(name: str):
-        projects = load_projects()
-        if name not in projects:
+        if not config.delete(name):
             return JSONResponse({"success": False, "message": "niet gevonden"}, status_code=404)
-        del projects[name]
-        save_projects(projects)
+        collector.poke()
         return JSONResponse({"success": True, "message": f"{name} verwijderd"})
 
     @web.post("/api/pm2/stop-all")
     def api_pm2_stop_all():
-        projects = load_projects()
-        pm2_to_stop = []
-        for name, proj in projects.items():
-            pm2_name = proj.get("pm2_name")
-            if pm2_name and proj.get("category") != "infra":
-                pm2_to_stop.append(pm2_name)
-        
-        if not pm2_to_stop:
-            return JSONResponse({"success": True, "message": "Geen actieve agents om te stoppen"})
-            
-        for p_name in pm2_to_stop:
-            subprocess.run(["pm2", "stop", p_name])
-            
-        return JSONResponse({"success": True, "message": "Agents gestopt"})
+        projects = {n: p for n, p in load_projects().items() if p.get("category") != "infra"}
+        if not projects:
+            return JSONResponse({"success": True, "message": "Geen agents om te stoppen"})
+
+        def _stop_all(job):
+            snapshot = SystemSnapshot(projects)
+            to_stop = [n for n, p in projects.items() if p.get("pm2_name") or snapshot.is_running(n)]
+            for n in projects.keys() - set(to_stop):
+                jobs.progress(job, n, "draait niet")
+            if not to_stop:
+                return True, "Geen actieve agents om te stoppen"
+            for n in to_stop:
+                jobs.progress(job, n, "stoppen")
+            # PM2-agents in één pm2-aanroep, de overige parallel
+            results = stop_many(projects, to_stop)
+            for n, ok in results.items():
+                jobs.progress(job, n, "klaar" if ok else "mislukt")
+            collector.poke()
+            failed = [n for n, ok in results.items() if not ok]
+            return not failed, f"Stoppen mislukt: {', '.join(failed)}" if failed else "Agents gestopt"
+
+        return job_accepted(jobs.submit("stop-all", sorted(projects), _stop_all))
+
+    def pm2_projects() -> List[str]:
+        return sorted(n for n, p in load_projects().items() if p.get("pm2_name"))
 
     @web.post("/api/pm2/shutdown")
     def api_pm2_shutdown():
-        # Geef de response eerst terug voordat we alles killen
-        def _kill():
-            time.sleep(1)
-            subprocess.run(["pm2", "stop", "all"])
+        def _shutdown(job):
+            ok = pm2.action("stop", ["all"])
             # Optioneel: pm2 kill om de daemon ook te stoppen
             # subprocess.run(["pm2", "kill"])
+            collector.poke()
+            return ok, "PM2-processen gestopt" if ok else "pm2 stop all mislukt"
 
-        t = threading.Thread(target=_kill, daemon=True)
-        t.start()
-        return JSONResponse({"success": True, "message": "Systeem wordt afgesloten..."})
+        return job_accepted(jobs.submit("shutdown", pm2_projects(), _shutdown))
 
     @web.post("/api/pm2/start-all")
     def api_pm2_start_all():
-        result = subprocess.run(["pm2", "start", "all"], capture_output=True, text=True)
-        return JSONResponse({"success": result.returncode == 0, "output": result.stdout + result.stderr})
+        def _start_all(job):
+            ok = pm2.action("start", ["all"])
+            collector.poke()
+            return ok, "PM2-processen gestart" if ok else "pm2 start all mislukt"
+
+        return job_accepted(jobs.submit("start-all", pm2_projects(), _start_all))
 
     @web.post("/api/projects")
     async def api_add_project(request: Request):
@@ -1065,10 +4866,9 @@ def build_fastapi_app():
         name = body.get("name", "").strip()
         if not name:
             return JSONResponse({"success": False, "message": "naam verplicht"}, status_code=400)
-        projects = load_projects()
-        if name in projects:
+        if config.get(name) is not None:
             return JSONResponse({"success": False, "message": "naam bestaat al"}, status_code=400)
-        projects[name] = {
+        config.put(name, {
             "category": body.get("category", "agent"),
             "path": body.get("path", ""),
             "description": body.get("description", ""),
@@ -1081,8 +4881,8 @@ def build_fastapi_app():
             "relations": [],
             "log_files": [],
             "notes": ""
-        }
-        save_projects(projects)
+        })
+        collector.poke()
         return JSONResponse({"success": True, "message": f"{name} toegevoegd"})
 
     return web
@@ -1176,6 +4976,11 @@ HTML_TEMPLATE = """<!DOCTYPE html>
     .tag-tech { background: rgba(227,179,65,0.1); color: var(--yellow); border: 1px solid rgba(227,179,65,0.2); }
     .tag-port-conflict { background: rgba(227,179,65,0.15); color: var(--yellow); border: 1px solid rgba(227,179,65,0.4); cursor: help; }
 
+    /* Sparklines */
+    .spark-row { display: grid; grid-template-columns: 1fr 1fr; gap: 8px; margin-bottom: 12px; }
+    .spark-row:empty { display: none; }
+    .spark { width: 100%; height: 28px; display: block; }
+
     /* Meta row */
     .meta-row { margin-bottom: 8px; }
     .meta-lbl { font-size: 0.65rem; color: var(--muted); text-transform: uppercase; letter-spacing: 0.7px; margin-bottom: 3px; }
@@ -1194,6 +4999,10 @@ HTML_TEMPLATE = """<!DOCTYPE html>
     .btn-restart { background: var(--yellow); color: #000; }
     .btn-logs  { background: var(--border); color: var(--text); }
 
+    /* Procesregels in de details */
+    .proc-line { font-size: 0.72rem; font-family: 'Cascadia Code', 'Fira Code', monospace; color: var(--text); }
+    .proc-line span { color: var(--muted); }
+
     /* Notes */
     .notes-box {
       background: rgba(227,179,65,0.06); border: 1px solid rgba(227,179,65,0.2);
@@ -1263,7 +5072,7 @@ HTML_TEMPLATE = """<!DOCTYPE html>
     <div id="proj-grid" class="proj-grid"><!-- kaarten komen hier --></div>
   </div>
   <div id="view-registry" style="display:none">
-    <h5 style="color:var(--muted);margin-bottom:16px"><i class="bi bi-diagram-3 me-2"></i>Centraal Poortenregister <span style="font-size:0.75rem;color:var(--green)">● live via :4444</span></h5>
+    <h5 style="color:var(--muted);margin-bottom:16px"><i class="bi bi-diagram-3 me-2"></i>Centraal Poortenregister <span style="font-size:0.75rem;color:var(--green)">● live via pmctl</span></h5>
     <div id="registry-content">laden...</div>
   </div>
 </div>
@@ -1280,6 +5089,8 @@ HTML_TEMPLATE = """<!DOCTYPE html>
         <div id="log-content" class="log-box">laden...</div>
       </div>
       <div class="modal-footer" style="border-top:1px solid var(--border);">
+        <button class="btn btn-sm btn-secondary" id="log-live-btn" onclick="toggleLiveLogs()"><i class="bi bi-broadcast me-1"></i>Live</button>
+        <button class="btn btn-sm btn-secondary" onclick="loadOlderLogs()"><i class="bi bi-arrow-up me-1"></i>Ouder</button>
         <button class="btn btn-sm btn-secondary" onclick="refreshLogs()"><i class="bi bi-arrow-clockwise me-1"></i>Vernieuwen</button>
         <button class="btn btn-sm btn-secondary" data-bs-dismiss="modal">Sluiten</button>
       </div>
@@ -1291,6 +5102,13 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 <script>
 let allProjects = {};
 let activeLogProject = null;
+let logCursors = { older: null, newer: null };
+let logStream = null;
+let histories = {};
+// Velden voor de kaarten; processen en dependencies pas bij het uitklappen
+const CARD_FIELDS = 'status,memory_mb,disk_usage,token_usage,tech,description,category,log_files,notes,ports,open_ports,port_conflicts,relations';
+let expanded = new Set();
+let details = {};
 
 function statusBadge(status) {
   if (status === 'running') {
@@ -1327,6 +5145,80 @@ function depCount(deps) {
   return total;
 }
 
+function sparkline(values, color) {
+  const pts = values.map((v, i) => [i, v]).filter(([, v]) => v !== null);
+  if (pts.length < 2) return '<svg class="spark"></svg>';
+  const max = Math.max(...pts.map(([, v]) => v)) || 1;
+  const n = Math.max(values.length - 1, 1);
+  const d = pts.map(([i, v], k) => `${k ? 'L' : 'M'}${(i / n * 100).toFixed(1)},${(28 - v / max * 26).toFixed(1)}`).join('');
+  return `<svg class="spark" viewBox="0 0 100 30" preserveAspectRatio="none"><path d="${d}" stroke="${color}" fill="none" stroke-width="1.5" vector-effect="non-scaling-stroke"/></svg>`;
+}
+
+function historyRow(name) {
+  const h = histories[name];
+  if (!h || !h.cpu || allProjects[name]?.status !== 'running') return '';
+  const peak = Math.max(0, ...h.rss.filter(v => v !== null));
+  return `
+    <div class="spark-box">
+      <div class="meta-lbl">CPU · 10 min</div>${sparkline(h.cpu, 'var(--green)')}
+    </div>
+    <div class="spark-box">
+      <div class="meta-lbl">Geheugen · piek ${peak.toFixed(0)} MB</div>${sparkline(h.rss, 'var(--blue)')}
+    </div>`;
+}
+
+// Geschiedenis van draaiende projecten ophalen; alleen de sparkline-rij bijwerken
+async function loadHistories() {
+  const running = Object.keys(allProjects).filter(n => allProjects[n].status === 'running');
+  await Promise.all(running.map(async name => {
+    try {
+      const r = await fetch(`/api/projects/${name}/history?range=10m`);
+      if (r.ok) histories[name] = await r.json();
+    } catch(e) {}
+    const row = document.getElementById(`spark-${name}`);
+    if (row) row.innerHTML = historyRow(name);
+  }));
+}
+
+function detailsBox(name) {
+  if (!expanded.has(name)) return '';
+  const d = details[name];
+  if (!d) return '<div class="meta-row" style="font-size:0.75rem;color:var(--muted)">laden...</div>';
+  const deps = depCount(d.dependencies || {});
+  const procs = (d.processes || []).map(p =>
+    `<div class="proc-line" title="${p.cmdline}"><b>${p.pid}</b> ${p.name} <span>${p.memory_mb} MB · ${p.cpu_percent ?? '–'}%</span></div>`
+  ).join('') || '<span style="font-size:0.75rem;color:var(--muted)">—</span>';
+  return `
+    <div class="meta-row">
+      <div class="meta-lbl"><i class="bi bi-box me-1"></i>Dependencies</div>
+      <span style="font-size:0.75rem; color:var(--muted)">${deps > 0 ? `${deps} packages` : '—'}</span>
+    </div>
+    <div class="meta-row">
+      <div class="meta-lbl"><i class="bi bi-cpu me-1"></i>Processen</div>
+      ${procs}
+    </div>`;
+}
+
+// Details van één project ophalen; alleen dat blok bijwerken
+async function loadDetails(name) {
+  try {
+    const r = await fetch(`/api/projects/${name}?fields=processes,dependencies`);
+    if (r.ok) details[name] = await r.json();
+  } catch(e) {}
+  const box = document.getElementById(`details-${name}`);
+  if (box) box.innerHTML = detailsBox(name);
+}
+
+function toggleDetails(name) {
+  if (expanded.has(name)) expanded.delete(name);
+  else {
+    expanded.add(name);
+    loadDetails(name);
+  }
+  const card = document.getElementById(`card-${name}`);
+  if (card && allProjects[name]) card.outerHTML = renderCard(name, allProjects[name]);
+}
+
 function renderCard(name, info) {
   const running = info.status === 'running';
   const mem = running ? `${info.memory_mb} MB` : '—';
@@ -1350,8 +5242,7 @@ function renderCard(name, info) {
     ? `<div class="notes-box"><i class="bi bi-info-circle me-1"></i>${info.notes}</div>`
     : '';
 
-  const deps = depCount(info.dependencies || {});
-  const depsStr = deps > 0 ? `${deps} packages` : '—';
+  const detailsBtn = `<button class="btn-act btn-logs" onclick="toggleDetails('${name}')"><i class="bi bi-chevron-${expanded.has(name) ? 'up' : 'down'}"></i>Details</button>`;
 
   return `
     <div class="proj-card ${running ? 'running' : 'stopped'}" id="card-${name}">
@@ -1380,6 +5271,8 @@ function renderCard(name, info) {
           </div>
         </div>
 
+        <div class="spark-row" id="spark-${name}">${historyRow(name)}</div>
+
         <div class="meta-row">
           <div class="meta-lbl"><i class="bi bi-hdd-network me-1"></i>Poorten</div>
           ${portTags(info.ports, info.open_ports, info.port_conflicts)}
@@ -1395,35 +5288,70 @@ function renderCard(name, info) {
           ${relationTags(info.relations)}
         </div>
 
-        <div class="meta-row">
-          <div class="meta-lbl"><i class="bi bi-box me-1"></i>Dependencies</div>
-          <span style="font-size:0.75rem; color:var(--muted)">${depsStr}</span>
-        </div>
+        <div id="details-${name}">${detailsBox(name)}</div>
 
         ${notes}
 
         <div class="action-row">
-          ${startBtn}${stopBtn}${restartBtn}${logsBtn}
+          ${startBtn}${stopBtn}${restartBtn}${logsBtn}${detailsBtn}
         </div>
       </div>
     </div>`;
 }
 
+function renderAll() {
+  const grid = document.getElementById('proj-grid');
+  grid.innerHTML = Object.entries(allProjects).map(([n, i]) => renderCard(n, i)).join('');
+  updateCounters();
+}
+
+function updateCounters() {
+  const running = Object.values(allProjects).filter(p => p.status === 'running').length;
+  const total = Object.keys(allProjects).length;
+  document.getElementById('running-num').textContent = `${running}/${total}`;
+  document.getElementById('update-time').textContent = new Date().toLocaleTimeString('nl-NL');
+}
+
+// Alleen de kaarten van gewijzigde projecten opnieuw tekenen
+function applyPatch(patch) {
+  const grid = document.getElementById('proj-grid');
+  for (const [name, fields] of Object.entries(patch.changed)) {
+    const project = Object.assign(allProjects[name] || {}, fields);
+    for (const [key, value] of Object.entries(fields)) if (value === null) delete project[key];
+    allProjects[name] = project;
+    const card = document.getElementById(`card-${name}`);
+    if (card) card.outerHTML = renderCard(name, allProjects[name]);
+    else grid.insertAdjacentHTML('beforeend', renderCard(name, allProjects[name]));
+  }
+  for (const name of patch.removed) {
+    delete allProjects[name];
+    const card = document.getElementById(`card-${name}`);
+    if (card) card.remove();
+  }
+  updateCounters();
+}
+
+let stream = null;
+function startStream() {
+  stream = new EventSource(`/api/stream?fields=${CARD_FIELDS}`);
+  stream.addEventListener('snapshot', e => {
+    allProjects = JSON.parse(e.data).projects;
+    renderAll();
+  });
+  stream.addEventListener('patch', e => applyPatch(JSON.parse(e.data)));
+  stream.onerror = () => {
+    document.getElementById('update-time').textContent = 'verbinding verbroken...';
+  };
+}
+
 async function loadProjects() {
   const icon = document.getElementById('refresh-icon');
   icon.classList.add('refreshing');
 
   try {
-    const r = await fetch('/api/projects');
+    const r = await fetch(`/api/projects?fields=${CARD_FIELDS}`);
     allProjects = await r.json();
-
-    const grid = document.getElementById('proj-grid');
-    grid.innerHTML = Object.entries(allProjects).map(([n, i]) => renderCard(n, i)).join('');
-
-    const running = Object.values(allProjects).filter(p => p.status === 'running').length;
-    const total = Object.keys(allProjects).length;
-    document.getElementById('running-num').textContent = `${running}/${total}`;
-    document.getElementById('update-time').textContent = new Date().toLocaleTimeString('nl-NL');
+    renderAll();
   } catch(e) {
     document.getElementById('update-time').textContent = 'fout bij laden';
   } finally {
@@ -1431,47 +5359,125 @@ async function loadProjects() {
   }
 }
 
+// Volg een job tot hij klaar is (kort pollen; houdt geen extra verbinding open)
+async function followJob(id, onProgress) {
+  while (true) {
+    const r = await fetch(`/api/jobs/${id}`);
+    const job = await r.json().catch(() => ({}));
+    // Onbekende of verlopen job (bv. na een herstart van pmctl): niet blijven pollen
+    if (!r.ok) throw new Error(`job ${id}: ${job.error || 'HTTP ' + r.status}`);
+    onProgress(job);
+    if (job.finished) return job;
+    await new Promise(res => setTimeout(res, 400));
+  }
+}
+
 async function doAction(name, action) {
   const card = document.getElementById(`card-${name}`);
   const buttons = card ? card.querySelectorAll('.btn-act') : [];
   buttons.forEach(b => b.disabled = true);
 
-  const labels = { start: 'Starten...', stop: 'Stoppen...', restart: 'Herstarten...' };
+  const labels = { wacht: 'Wachten...', start: 'Starten...', stop: 'Stoppen...', restart: 'Herstarten...',
+                   starten: 'Starten...', stoppen: 'Stoppen...' };
   if (buttons.length) buttons[0].textContent = labels[action] || '...';
 
   try {
     const r = await fetch(`/api/projects/${name}/${action}`, { method: 'POST' });
     const data = await r.json();
-    if (!data.success && data.message !== 'gestart' && data.message !== 'herstarten...') {
-      console.warn(`${name} ${action}: ${data.message}`);
-    }
+    if (!r.ok) throw new Error(data.message || 'HTTP ' + r.status);
+    const job = await followJob(data.job, j => {
+      const step = labels[j.progress[name]];
+      if (buttons.length && step) buttons[0].textContent = step;
+    });
+    if (!job.success) console.warn(`${name} ${action}: ${job.message}`);
   } catch(e) {
     alert('Fout: ' + e);
   }
 
-  // Ververs na actie
-  const delay = action === 'start' ? 4000 : action === 'restart' ? 6000 : 2000;
-  setTimeout(loadProjects, delay);
+  // Kaart opnieuw tekenen (knoppen weer actief); zonder stream eerst verversen
+  if (!stream) await loadProjects();
+  else if (allProjects[name]) {
+    const current = document.getElementById(`card-${name}`);
+    if (current) current.outerHTML = renderCard(name, allProjects[name]);
+  }
 }
 
 async function showLogs(name) {
+  stopLiveLogs();
   activeLogProject = name;
+  logCursors = { older: null, newer: null };
   document.getElementById('logTitle').innerHTML = `<i class="bi bi-terminal me-2"></i>Logs — <b>${name}</b>`;
   document.getElementById('log-content').textContent = 'laden...';
   new bootstrap.Modal(document.getElementById('logModal')).show();
   await refreshLogs();
 }
 
+async function fetchLogs(cursor, direction) {
+  let url = `/api/projects/${activeLogProject}/logs?lines=100&direction=${direction}`;
+  if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+  const r = await fetch(url);
+  return r.json();
+}
+
+// Eerste keer: de staart; daarna alleen regels die er sinds de vorige keer bij kwamen
 async function refreshLogs() {
   if (!activeLogProject) return;
+  const box = document.getElementById('log-content');
   try {
-    const r = await fetch(`/api/projects/${activeLogProject}/logs?lines=100`);
-    const data = await r.json();
-    const box = document.getElementById('log-content');
-    box.textContent = data.content || '(geen logs)';
+    const first = !logCursors.newer;
+    const data = await fetchLogs(logCursors.newer, first ? 'older' : 'newer');
+    if (first) {
+      logCursors.older = data.older;
+      box.textContent = data.content || '(geen logs)';
+    } else if (data.lines.length) {
+      box.textContent += '\\n' + data.content;
+    }
+    logCursors.newer = data.newer;
     box.scrollTop = box.scrollHeight;
   } catch(e) {
-    document.getElementById('log-content').textContent = 'Fout bij laden logs';
+    box.textContent = 'Fout bij laden logs';
+  }
+}
+
+// Live: nieuwe regels van alle logbestanden via de stream, vanaf de laatst getoonde positie
+function toggleLiveLogs() {
+  if (logStream) { stopLiveLogs(); return; }
+  if (!activeLogProject) return;
+  const multi = (allProjects[activeLogProject]?.log_files || []).length > 1;
+  let url = `/api/projects/${activeLogProject}/logs/stream`;
+  if (logCursors.newer) url += `?cursor=${encodeURIComponent(logCursors.newer)}`;
+  logStream = new EventSource(url);
+  logStream.addEventListener('lines', e => {
+    const data = JSON.parse(e.data);
+    const box = document.getElementById('log-content');
+    const atBottom = box.scrollTop + box.clientHeight >= box.scrollHeight - 20;
+    box.textContent += '\\n' + data.lines.map(l => multi ? `${l.file} │ ${l.text}` : l.text).join('\\n');
+    logCursors.newer = data.cursor;
+    if (atBottom) box.scrollTop = box.scrollHeight;
+  });
+  document.getElementById('log-live-btn').classList.replace('btn-secondary', 'btn-success');
+}
+
+function stopLiveLogs() {
+  if (logStream) { logStream.close(); logStream = null; }
+  const btn = document.getElementById('log-live-btn');
+  if (btn) btn.classList.replace('btn-success', 'btn-secondary');
+}
+
+document.getElementById('logModal').addEventListener('hidden.bs.modal', stopLiveLogs);
+
+async function loadOlderLogs() {
+  if (!activeLogProject || !logCursors.older) return;
+  const box = document.getElementById('log-content');
+  try {
+    const data = await fetchLogs(logCursors.older, 'older');
+    if (!data.lines.length) return;
+    logCursors.older = data.older;
+    const height = box.scrollHeight;
+    box.textContent = data.content + '\\n' + box.textContent;
+    box.scrollTop = box.scrollHeight - height;
+  } catch(e) {
+    console.warn('Oudere logs laden mislukt', e);
   }
 }
 
@@ -1490,11 +5496,15 @@ function showTab(tab) {
 async function loadRegistry() {
   const el = document.getElementById('registry-content');
   try {
-    const r = await fetch('http://localhost:4444/ports');
+    const r = await fetch('/api/registry');
     if (!r.ok) throw new Error('HTTP ' + r.status);
-    const data = await r.json();
-    const rows = Object.entries(data).map(([svc, info]) => {
-      const inUse = info.in_use;
+    const reg = await r.json();
+    const entries = Object.entries(reg.services);
+    if (!reg.online && !entries.length) throw new Error(reg.error || 'offline');
+    const rows = entries.map(([svc, info]) => {
+      // pmctl ziet zelf of de poort luistert; het register kan achterlopen
+      const inUse = info.listening;
+      const claimed = info.projects.filter(p => p !== info.project);
       const dot = inUse
         ? '<span class="dot-pulse" style="background:var(--green);width:7px;height:7px;border-radius:50%;display:inline-block"></span>'
         : '<span style="background:var(--border);width:7px;height:7px;border-radius:50%;display:inline-block"></span>';
@@ -1504,12 +5514,15 @@ async function loadRegistry() {
       return `<tr>
         <td>${dot} <strong style="color:var(--blue)">${svc}</strong></td>
         <td>${portLink}</td>
-        <td style="color:var(--muted)">${info.project || '—'}</td>
+        <td style="color:var(--muted)">${info.project || '—'}${claimed.length ? ` <span class="tag" title="pmctl-projecten op deze poort">${claimed.join(', ')}</span>` : ''}</td>
         <td style="color:var(--text)">${info.description || '—'}</td>
         <td style="color:var(--muted);font-size:0.72rem">${inUse ? '<span style="color:var(--green)">actief</span>' : 'gestopt'}</td>
       </tr>`;
     }).join('');
-    el.innerHTML = `<div class="reg-card">
+    const stale = reg.online ? '' : `<p style="font-size:0.75rem;color:var(--yellow);margin-bottom:10px">
+      <i class="bi bi-exclamation-triangle me-1"></i>Register niet bereikbaar (${reg.error || reg.breaker}); laatst bekende gegevens, poortstatus is live.
+    </p>`;
+    el.innerHTML = `${stale}<div class="reg-card">
       <table class="reg-table">
         <thead><tr><th>Service</th><th>Poort</th><th>Project</th><th>Beschrijving</th><th>Status</th></tr></thead>
         <tbody>${rows}</tbody>
@@ -1517,8 +5530,8 @@ async function loadRegistry() {
     </div>
     <p style="font-size:0.72rem;color:var(--muted);margin-top:10px">
       <i class="bi bi-info-circle me-1"></i>
-      Bron: <a href="http://localhost:4444/ports" target="_blank">http://localhost:4444/ports</a> &nbsp;·&nbsp;
-      Docs: <a href="http://localhost:4444/docs" target="_blank">http://localhost:4444/docs</a>
+      Bron: <a href="${reg.url}/ports" target="_blank">${reg.url}/ports</a> &nbsp;·&nbsp;
+      Docs: <a href="${reg.url}/docs" target="_blank">${reg.url}/docs</a>
     </p>`;
   } catch(e) {
     el.innerHTML = `<div class="reg-offline">
@@ -1529,12 +5542,19 @@ async function loadRegistry() {
   }
 }
 
-// ── Laad meteen, daarna iedere 5 seconden ─────────────────────────────────────
-loadProjects();
+// ── Live via de stream; zonder EventSource iedere 5 seconden pollen ───────────
+if (window.EventSource) startStream();
+else loadProjects();
 setInterval(() => {
-  if (currentTab === 'projects') loadProjects();
-  else loadRegistry();
+  if (currentTab === 'registry') loadRegistry();
+  else if (!stream) loadProjects();
 }, 5000);
+setTimeout(loadHistories, 1000);
+setInterval(() => {
+  if (currentTab === 'registry') return;
+  loadHistories();
+  expanded.forEach(loadDetails);
+}, 10000);
 </script>
 </body>
 </html>"""
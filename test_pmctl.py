@@ -0,0 +1,988 @@
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+import pmctl
+
+
+# ── Procesherkenning ──────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("patterns, text, expected", [
+    ({"uvicorn": {"a"}}, "python -m uvicorn app:main", {"a"}),
+    ({"uvicorn": {"a"}}, "python -m gunicorn", set()),
+    # Overlappend: een patroon dat in een ander zit, en gedeelde voorvoegsels
+    ({"app.py": {"a"}, "myapp.py": {"b"}}, "python myapp.py", {"a", "b"}),
+    ({"app.py": {"a"}, "myapp.py": {"b"}}, "python app.py", {"a"}),
+    ({"serve": {"a"}, "server": {"b"}, "erver.js": {"c"}}, "node server.js", {"a", "b", "c"}),
+    ({"abcd": {"a"}, "bce": {"b"}}, "xabcex", {"b"}),  # faalverwijzing na een bijna-treffer
+    ({"aab": {"a"}}, "aaab", {"a"}),
+    ({"bot": {"a", "b"}}, "run-bot --fast", {"a", "b"}),  # hetzelfde patroon bij twee projecten
+    ({"bot": {"a"}}, "", set()),
+    ({"x": {"a"}}, "x", {"a"}),
+])
+def test_pattern_matcher(patterns, text, expected):
+    assert pmctl._PatternMatcher(patterns).match(text) == expected
+    # Zelfde uitkomst als naïef zoeken
+    assert expected == {o for p, owners in patterns.items() if p in text for o in owners}
+
+
+PROJECT_PATHS = {"root": "/srv", "api": "/srv/api", "api2": "/srv/api2", "deep": "/srv/api/workers/", "dup": "/srv/api"}
+
+
+@pytest.mark.parametrize("cwd, expected", [
+    ("/srv/api", {"root", "api", "dup"}),
+    ("/srv/api/", {"root", "api", "dup"}),
+    ("/srv/api/src/x", {"root", "api", "dup"}),
+    ("/srv/api2/src", {"root", "api2"}),        # voorvoegsel als tekst, niet als pad: geen api
+    ("/srv/ap", {"root"}),
+    ("/srv/api/workers", {"root", "api", "dup", "deep"}),
+    ("/srv//api", {"root", "api", "dup"}),
+    ("/srvx", set()),
+    ("/", set()),
+    ("srv/api", set()),                         # relatief: nooit een treffer
+    ("", set()),
+])
+def test_path_trie(cwd, expected):
+    assert pmctl._PathTrie(PROJECT_PATHS).match(cwd) == expected
+
+
+def test_path_trie_root_project_matches_every_absolute_cwd():
+    trie = pmctl._PathTrie({"all": "/", "api": "/srv/api"})
+    assert trie.match("/tmp") == {"all"}
+    assert trie.match("/srv/api/x") == {"all", "api"}
+    assert trie.match("tmp") == set()
+
+
+PROC_TCP = """\
+  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 0100007F:1F90 00000000:0000 0A 00000000:00000000 00:00000000 00000000  1000        0 1001 1 0000000000000000 100 0 0 10 0
+   1: 00000000:0016 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 1002 1 0000000000000000 100 0 0 10 0
+   2: 0100007F:1F90 0100007F:D431 01 00000000:00000000 00:00000000 00000000  1000        0 1003 1 0000000000000000 20 4 30 10 -1
+   3: 0100007F:C350 0100007F:1F90 06 00000000:00000000 03:00000DA4 00000000     0        0 0 3 0000000000000000
+   4: 0100007F:2328 00000000:0000 07 00000000:00000000 00:00000000 00000000  1000        0 1004 2 0000000000000000
+"""
+PROC_TCP6 = """\
+  sl  local_address                         remote_address                        st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 00000000000000000000000000000000:1F90 00000000000000000000000000000000:0000 0A 00000000:00000000 00:00000000 00000000  1000        0 2001 1 0000000000000000 100 0 0 10 0
+   1: 00000000000000000000000001000000:0BB8 00000000000000000000000000000000:0000 0A 00000000:00000000 00:00000000 00000000  1000        0 2002 1 0000000000000000 100 0 0 10 0
+   2: 0000000000000000FFFF00000100007F:1F90 0000000000000000FFFF00000100007F:E0A2 01 00000000:00000000 00:00000000 00000000  1000        0 2003 1 0000000000000000 20 4 30 10 -1
+   3: 00000000000000000000000001000000:1F41 00000000000000000000000000000000:0000 0A 00000000:00000000
+"""
+
+
+def test_listen_index_reads_proc_net_tcp(tmp_path, monkeypatch):
+    (tmp_path / "tcp").write_text(PROC_TCP)
+    (tmp_path / "tcp6").write_text(PROC_TCP6)
+    monkeypatch.setattr(pmctl, "PROC_NET_TCP", (str(tmp_path / "tcp"), str(tmp_path / "tcp6")))
+    index = pmctl.ListenIndex()
+    # Alleen LISTEN (0A); IPv4 en IPv6 op dezelfde poort komen samen; korte regels worden overgeslagen
+    assert index._inodes == {8080: {1001, 2001}, 22: {1002}, 3000: {2002}}
+    assert 8080 in index and 3000 in index
+    assert 9000 not in index     # CLOSE (07)
+    assert 0xC350 not in index   # TIME_WAIT, client-kant van een verbinding
+    assert 8001 not in index     # afgekapte regel
+
+
+def test_listen_index_without_proc_uses_psutil(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    monkeypatch.setattr(pmctl, "PROC_NET_TCP", (str(tmp_path / "ontbreekt"),))
+    conns = [
+        SimpleNamespace(status="LISTEN", laddr=SimpleNamespace(port=8080), pid=42),
+        SimpleNamespace(status="ESTABLISHED", laddr=SimpleNamespace(port=5000), pid=43),
+        SimpleNamespace(status="LISTEN", laddr=SimpleNamespace(port=22), pid=None),
+    ]
+    monkeypatch.setattr(pmctl.psutil, "net_connections", lambda kind: conns)
+    index = pmctl.ListenIndex()
+    assert 5000 not in index
+    assert index.pids([8080, 22, 5000]) == {8080: {42}, 22: set()}
+
+
+# ── PM2 jlist ─────────────────────────────────────────────────────────────────
+JLIST_APP = {
+    "name": "agent",
+    "pid": 4242,
+    "pm2_env": {"status": "online", "restart_time": 3, "pm_uptime": 1_700_000_000_000},
+    "monit": {"cpu": 1.5, "memory": 50 * 1024 * 1024},
+}
+
+
+def _fake_pm2(tmp_path, stdout: str, exit_code: int = 0):
+    out = tmp_path / "jlist.out"
+    out.write_text(stdout)
+    binary = tmp_path / "pm2"
+    binary.write_text(f"#!/bin/sh\ncat {out}\nexit {exit_code}\n")
+    binary.chmod(0o755)
+    return pmctl.PM2Adapter(binary=str(binary))
+
+
+def test_parse_jlist_skips_pm2_banner_lines():
+    out = "[PM2] Spawning PM2 daemon with pm2_home=/root/.pm2\n[PM2] PM2 Successfully daemonized\n"
+    out += json.dumps([JLIST_APP]) + "\n"
+    assert pmctl._parse_jlist(out) == [JLIST_APP]
+
+
+def test_parse_jlist_empty_and_garbage():
+    assert pmctl._parse_jlist("[PM2] Spawning PM2 daemon\n[]\n") == []
+    assert pmctl._parse_jlist("[PM2][WARN] Current process list is not synchronized\n") == []
+    assert pmctl._parse_jlist("") == []
+
+
+def test_jlist_with_banner(tmp_path):
+    pm2 = _fake_pm2(tmp_path, "[PM2] Spawning PM2 daemon\n" + json.dumps([JLIST_APP]) + "\n")
+    apps = pm2.jlist()
+    assert apps["agent"]["pid"] == 4242
+    assert apps["agent"]["status"] == "online"
+    assert apps["agent"]["restarts"] == 3
+    assert apps["agent"]["started_at"] == 1_700_000_000
+    assert apps["agent"]["memory_mb"] == 50.0
+
+
+def test_jlist_failed_command(tmp_path):
+    pm2 = _fake_pm2(tmp_path, json.dumps([JLIST_APP]), exit_code=1)
+    assert pm2.jlist() == {}
+
+
+def test_jlist_missing_binary(tmp_path):
+    pm2 = pmctl.PM2Adapter(binary=str(tmp_path / "geen-pm2"))
+    assert pm2.jlist() == {}
+
+
+def test_action_invalidates_jlist_cache(tmp_path):
+    pm2 = _fake_pm2(tmp_path, json.dumps([{**JLIST_APP, "pm2_env": {"status": "stopped"}}]))
+    assert pm2.jlist()["agent"]["status"] == "stopped"
+    (tmp_path / "jlist.out").write_text(json.dumps([JLIST_APP]))
+    assert pm2.jlist()["agent"]["status"] == "stopped"  # nog uit de cache
+    assert pm2.action("start", ["all"])
+    assert pm2.jlist()["agent"]["status"] == "online"
+
+
+def test_action_backs_off_when_binary_missing(tmp_path, monkeypatch):
+    pm2 = pmctl.PM2Adapter(binary=str(tmp_path / "geen-pm2"))
+    assert not pm2.action("start", ["all"])
+    calls = []
+    monkeypatch.setattr(pmctl.subprocess, "run", lambda *a, **k: calls.append(a))
+    assert not pm2.action("start", ["all"])
+    assert calls == []
+
+
+# ── Poortenregister ───────────────────────────────────────────────────────────
+
+class _RegistryStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        time.sleep(server.delay)
+        body = json.dumps(server.services).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Sluit zonder "Connection: close", zoals een server die idle keep-alives opruimt
+        self.close_connection = server.drop_keepalive
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def registry_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RegistryStub)
+    server.services, server.requests, server.delay, server.drop_keepalive = {"api": {"port": 8000}}, 0, 0.0, False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_refreshed(client, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while client._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_registry_retries_once_when_keepalive_was_dropped(registry_stub):
+    client = pmctl.RegistryClient(f"http://127.0.0.1:{registry_stub.server_address[1]}")
+    registry_stub.drop_keepalive = True
+    assert client.request("GET", "/ports") == {"api": {"port": 8000}}
+    stale = client._conn
+    assert stale is not None  # de client denkt dat hij de verbinding kan hergebruiken
+    time.sleep(0.05)
+    assert client.request("GET", "/ports") == {"api": {"port": 8000}}
+    assert client._conn is not stale
+    assert client.breaker == "closed" and client.error is None
+
+
+def test_registry_breaker_opens_and_half_opens(registry_stub, monkeypatch):
+    client = pmctl.RegistryClient(f"http://127.0.0.1:{_free_port()}")
+    for _ in range(pmctl.REGISTRY_BREAKER_FAILS):
+        with pytest.raises(OSError):
+            client.request("GET", "/ports")
+    assert client.breaker == "open"
+    # Open: geen netwerkpoging meer, meteen een fout
+    client._port = registry_stub.server_address[1]
+    with pytest.raises(ConnectionError, match="circuit breaker"):
+        client.request("GET", "/ports")
+    assert registry_stub.requests == 0
+
+    # Na de cooldown mag één proefaanvraag door; slaagt die, dan sluit de breaker
+    client._open_until = time.time() - 1
+    assert client.breaker == "half-open"
+    assert client.request("GET", "/ports") == {"api": {"port": 8000}}
+    assert client.breaker == "closed"
+
+
+def test_registry_serves_stale_while_one_refresh_runs(registry_stub):
+    client = pmctl.RegistryClient(f"http://127.0.0.1:{registry_stub.server_address[1]}")
+    assert client.services() == {"api": {"port": 8000}}
+    assert registry_stub.requests == 1
+
+    registry_stub.services = {"api": {"port": 8001}}
+    registry_stub.delay = 1.0
+    client.invalidate()
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        seen = list(ex.map(lambda _: client.services(), range(64)))
+    # Iedereen krijgt meteen de laatst bekende stand; er loopt maar één verversing
+    assert time.monotonic() - t0 < 0.5
+    assert all(s == {"api": {"port": 8000}} for s in seen)
+    _wait_refreshed(client)
+    assert registry_stub.requests == 2
+    assert client.services() == {"api": {"port": 8001}}
+
+    # Register onbereikbaar: de laatst bekende services blijven staan
+    client._port = _free_port()
+    client._conn = None
+    client.invalidate()
+    client.services()
+    _wait_refreshed(client)
+    assert client.services() == {"api": {"port": 8001}}
+    assert not client.online
+
+
+# ── Opstarten met afhankelijkheden ────────────────────────────────────────────
+RELATIONS = {
+    "db": [], "cache": [], "api": ["db", "cache"], "worker": ["api"], "web": ["api"], "docs": [],
+}
+
+
+@pytest.fixture
+def fake_start(monkeypatch):
+    """start_project zonder processen: registreert de volgorde, uitkomst per project instelbaar."""
+    started: Dict[str, float] = {}
+    outcomes: Dict[str, str] = {}
+    lock = threading.Lock()
+
+    def start_project(name, project):
+        time.sleep(0.02)
+        with lock:
+            started[name] = time.monotonic()
+        return outcomes.get(name, pmctl.START_READY)
+
+    class Snapshot:
+        def __init__(self, projects, **kwargs):
+            pass
+
+        def is_running(self, name):
+            return False
+
+    monkeypatch.setattr(pmctl, "start_project", start_project)
+    monkeypatch.setattr(pmctl, "SystemSnapshot", Snapshot)
+    monkeypatch.setattr(pmctl, "is_running", lambda project, name=None: name in started)
+    return started, outcomes
+
+
+def _projects(relations):
+    return {name: {"relations": deps} for name, deps in relations.items()}
+
+
+def test_dependency_graph_limits_to_targets_and_their_deps():
+    projects = _projects(RELATIONS)
+    graph = pmctl.dependency_graph(projects, ["worker"])
+    assert graph == {"worker": ["api"], "api": ["db", "cache"], "db": [], "cache": []}
+    assert pmctl.dependency_graph(projects, ["worker", "db"], with_deps=False) == {"worker": [], "db": []}
+
+
+@pytest.mark.parametrize("graph, cycle", [
+    ({"a": ["b"], "b": []}, None),
+    ({"a": ["a"]}, ["a", "a"]),
+    ({"a": ["b"], "b": ["c"], "c": ["a"]}, ["a", "b", "c", "a"]),
+    ({"x": [], "a": ["b"], "b": ["x", "a"]}, ["a", "b", "a"]),
+])
+def test_find_cycle(graph, cycle):
+    assert pmctl.find_cycle(graph) == cycle
+
+
+def test_start_respects_dependency_order(fake_start):
+    started, _ = fake_start
+    projects = _projects(RELATIONS)
+    graph = pmctl.dependency_graph(projects, list(projects))
+    results = pmctl.start_with_dependencies(projects, graph, parallel=4)
+    assert set(results) == set(projects) and all(r["ok"] for r in results.values())
+    for name, deps in graph.items():
+        for dep in deps:
+            assert started[dep] < started[name]
+            assert results[dep]["end"] <= results[name]["start"]
+    path = pmctl.critical_path(graph, results)
+    assert path[-1] in ("worker", "web") and path[-2] == "api" and path[0] in ("db", "cache")
+
+
+@pytest.mark.parametrize("bad, outcome, skipped", [
+    ("api", pmctl.START_FAILED, {"worker", "web"}),
+    ("api", pmctl.START_NOT_READY, {"worker", "web"}),
+    ("cache", pmctl.START_UNSTARTABLE, {"api", "worker", "web"}),
+])
+def test_start_skips_dependents_of_failed_project(fake_start, bad, outcome, skipped):
+    started, outcomes = fake_start
+    outcomes[bad] = outcome
+    projects = _projects(RELATIONS)
+    results = pmctl.start_with_dependencies(projects, pmctl.dependency_graph(projects, list(projects)))
+    assert results[bad]["outcome"] == outcome and not results[bad]["ok"]
+    assert {n for n, r in results.items() if r["skipped"]} == skipped
+    # Overgeslagen projecten worden niet eens geprobeerd; de rest start gewoon
+    assert set(started) == set(projects) - skipped
+    assert all(results[n]["ok"] for n in set(projects) - skipped - {bad})
+    assert results["worker"]["reason"] == "wacht op api"
+
+
+# ── Tokens ────────────────────────────────────────────────────────────────────
+
+def test_token_query_minute_steps_past_retention(tmp_path):
+    series = pmctl.TokenSeries(tmp_path / "series.json")
+    with pytest.raises(ValueError):
+        series.query("p", time.time() - 7 * 86400, step=300)
+
+
+def test_token_query_hour_steps_and_recent_minutes(tmp_path):
+    series = pmctl.TokenSeries(tmp_path / "series.json")
+    now = time.time()
+    series.record("p", now - 3 * 86400, 100)  # alleen nog in de uurbuckets
+    series.record("p", now - 120, 7)
+    assert sum(p["tokens"] for p in series.query("p", now - 7 * 86400, step=3600)) == 107
+    assert sum(p["tokens"] for p in series.query("p", now - 3600, step=300)) == 7
+
+
+def test_token_backfill_keeps_untimed_history_out_of_series(tmp_path, monkeypatch):
+    series = pmctl.TokenSeries(tmp_path / "series.json")
+    monkeypatch.setattr(pmctl, "token_series", series)
+    tracker = pmctl.TokenUsageTracker(tmp_path / "offsets.json")
+    log = tmp_path / "agent.log"
+    log.write_text('{"total_tokens": 5000}\n{"total_tokens": 7000}\n')
+
+    assert tracker.update(log, series_name="p") == 12000
+    assert series.rate_per_hour("p") == 0
+
+    # Later toegevoegde regels zonder tijdstip zijn wel "nu"
+    with open(log, "a") as f:
+        f.write('{"total_tokens": 30}\n')
+    assert tracker.update(log, series_name="p") == 12030
+    assert series.rate_per_hour("p") == 30 * 3600 / pmctl.TOKEN_RATE_WINDOW
+
+
+def test_token_totals_survive_copytruncate_and_regrow(tmp_path):
+    tracker = pmctl.TokenUsageTracker(tmp_path / "offsets.json")
+    log = tmp_path / "agent.log"
+    log.write_text('{"total_tokens": 100}\n')
+    assert tracker.update(log) == 100
+
+    # copytruncate: zelfde inode, afgekapt en vóór de volgende scan weer langer dan de offset
+    with open(log, "r+") as f:
+        f.truncate(0)
+        f.write('{"total_tokens": 200}\n' + "x" * 40 + "\n")
+    assert tracker.update(log) == 300
+
+    with open(log, "a") as f:
+        f.write('{"total_tokens": 5}\n')
+    assert tracker.update(log) == 305
+
+    # De vingerafdruk overleeft een herstart
+    tracker.save()
+    assert pmctl.TokenUsageTracker(tmp_path / "offsets.json").update(log) == 305
+
+
+# ── Schijfgebruik ─────────────────────────────────────────────────────────────
+
+def test_disk_usage_counts_hard_links_once_like_du(tmp_path):
+    if not shutil.which("du"):
+        pytest.skip("du niet beschikbaar")
+    root = tmp_path / "proj"
+    store, a, b = root / "store", root / "a", root / "b"
+    for d in (store, a, b):
+        d.mkdir(parents=True)
+    for i in range(4):
+        (store / f"blob{i}").write_bytes(os.urandom(20_000 * (i + 1)))
+        os.link(store / f"blob{i}", a / f"blob{i}")  # zelfde inode in twee submappen
+        os.link(store / f"blob{i}", store / f"alias{i}")  # en twee keer in dezelfde map
+    (b / "eigen.txt").write_bytes(os.urandom(50_000))
+
+    du = int(subprocess.run(["du", "-sB1", str(root)], capture_output=True, text=True, check=True).stdout.split()[0])
+    index = pmctl.DiskUsageIndex(tmp_path / "du_index.json")
+    assert index.scan(str(root))["total"] == du
+    # Tweede scan komt uit de cache en telt net zo
+    assert index.scan(str(root))["total"] == du
+    index.save()
+    assert pmctl.DiskUsageIndex(tmp_path / "du_index.json").scan(str(root))["total"] == du
+
+
+# ── Logvenster ────────────────────────────────────────────────────────────────
+
+def _untimed_logs(tmp_path, sizes):
+    for name, n in sizes.items():
+        (tmp_path / name).write_text("".join(f"{name} regel {i}\n" for i in range(n)))
+    return {"path": str(tmp_path)}
+
+
+@pytest.mark.parametrize("direction", ["older", "newer"])
+def test_log_window_caps_unmerged_files_at_lines(tmp_path, direction):
+    project = _untimed_logs(tmp_path, {"a.log": 100, "b.log": 100, "c.log": 10})
+    seen, cursor = [], None
+    while True:
+        window = pmctl.read_log_window(project, lines=50, cursor=cursor, direction=direction)
+        assert not window["merged"]
+        assert len(window["lines"]) <= 50
+        if not window["lines"]:
+            break
+        if cursor is None:
+            # Eerste pagina: c.log levert er 10, de rest gaat naar a en b
+            assert len(window["lines"]) == 50
+        seen += [(l["file"], l["text"]) for l in window["lines"]]
+        cursor = window[direction]
+    # Doorbladeren levert elke regel precies één keer
+    expected = {(f, f"{f} regel {i}") for f, n in (("a.log", 100), ("b.log", 100), ("c.log", 10)) for i in range(n)}
+    assert len(seen) == len(set(seen)) == len(expected)
+    assert set(seen) == expected
+
+
+def test_log_follower_restarts_after_copytruncate_and_regrow(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_text("before-trunc\n")
+    follower = pmctl.LogFollower({"app.log": log})
+    assert follower.read_new() == []
+
+    # Afgekapt en snel herschreven tussen twee reads: weer langer dan de oude offset
+    with open(log, "r+") as f:
+        f.truncate(0)
+        f.write("after-trunc\nand-more\n")
+    assert follower.read_new() == [("app.log", "after-trunc"), ("app.log", "and-more")]
+
+    with open(log, "a") as f:
+        f.write("appended\n")
+    assert follower.read_new() == [("app.log", "appended")]
+    follower.close()
+
+
+# ── Logindex ──────────────────────────────────────────────────────────────────
+LOG_LINES = [
+    "2026-10-01T10:00:00 ABCD start",
+    "2026-10-01T10:00:01 Error: disk full",
+    "2026-10-01T10:00:02 error 42 in handler",
+    "2026-10-01T10:00:03 héllo wörld",
+    "2026-10-01T10:00:04 user=alice id=7",
+    "2026-10-01T10:00:05 WARN timeout after 30s",
+    "2026-10-01T10:00:06 path a.b.c",
+    "2026-10-01T10:00:07 tab\tsep",
+    "",
+    "   doorlopende regel zonder tijdstempel",
+]
+
+GREP_PATTERNS = [
+    r"ABCD", r"\x41BCD", r"\101BCD", r"\u0041BCD", r"[A]BCD", r"(?i)abcd", r"(?i)error", r"error|WARN",
+    r"\d{2}s", r"user=\w+ id=\d", r"disk\s+full", r"a\.b\.c", r"\N{LATIN SMALL LETTER E WITH ACUTE}llo",
+    r"(?i)HÉLLO", r"id=(\d)\b", r"tab\tsep", r"(err)or \d+ in\b", r"(\w)\1", r"timeout (after )?30s",
+    r"^$", r"^\s+doorlopende", r"regel\Z", r"\0101BCD",
+]
+
+
+def _write_logs(tmp_path, repeat: int = 40):
+    project = tmp_path / "proj"
+    project.mkdir(exist_ok=True)
+    for name, shift in (("app.log", 0), ("worker.log", 3)):
+        lines = [LOG_LINES[(i + shift) % len(LOG_LINES)] for i in range(repeat * len(LOG_LINES))]
+        (project / name).write_text("\n".join(lines) + "\n")
+    return {"p": {"path": str(project)}}
+
+
+def _plain_grep(projects, pattern, ignore_case=False):
+    regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    hits = []
+    for name, project in projects.items():
+        for lf in sorted(pmctl._log_names(project)):
+            offset = 0
+            for raw in (Path(project["path"]) / lf).read_bytes().split(b"\n")[:-1]:
+                if regex.search(raw.decode("utf-8", "replace")):
+                    hits.append((name, lf, offset))
+                offset += len(raw) + 1
+    return hits
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # Kleine blokken, zodat de trigramfilter echt blokken overslaat
+    monkeypatch.setattr(pmctl, "LOG_INDEX_BLOCK", 256)
+
+
+@pytest.mark.parametrize("ignore_case", [False, True])
+@pytest.mark.parametrize("pattern", GREP_PATTERNS)
+def test_log_index_matches_plain_scan(tmp_path, small_blocks, pattern, ignore_case):
+    projects = _write_logs(tmp_path)
+    index = pmctl.LogIndex(tmp_path / "logindex.db")
+    result = index.search(pattern, projects, ignore_case=ignore_case, limit=10_000)
+    hits = [(m["project"], m["file"], m["offset"]) for m in result["matches"]]
+    assert hits == _plain_grep(projects, pattern, ignore_case)
+
+
+def test_log_index_skips_blocks_without_trigrams(tmp_path, small_blocks):
+    projects = _write_logs(tmp_path)
+    with open(Path(projects["p"]["path"]) / "app.log", "a") as f:
+        f.write("2026-10-01T11:00:00 zeldzaam-woord\n")
+    result = pmctl.LogIndex(tmp_path / "logindex.db").search("zeldzaam", projects)
+    assert len(result["matches"]) == 1
+    assert result["stats"]["blocks_read"] == 1 < result["stats"]["blocks"]
+
+
+def test_log_index_cap_evicts_oldest_blocks(tmp_path, small_blocks, monkeypatch):
+    monkeypatch.setattr(pmctl, "LOG_INDEX_MAX_BLOCKS", 4)
+    project = tmp_path / "proj"
+    project.mkdir()
+    lines = [f"2026-10-01T{10 + i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d} tick {i}" for i in range(500)]
+    (project / "app.log").write_text("\n".join(lines) + "\n")
+    projects = {"p": {"path": str(project)}}
+    result = pmctl.LogIndex(tmp_path / "logindex.db").search("tick", projects, limit=10_000)
+    assert result["stats"]["blocks"] == 4
+    assert result["stats"]["unindexed_bytes"] > 0
+    # Alleen de nieuwste blokken blijven doorzoekbaar
+    found = [m["text"] for m in result["matches"]]
+    assert 0 < len(found) < len(lines)
+    assert found == lines[-len(found):]
+
+
+def test_log_index_resets_after_rotation_and_truncation(tmp_path):
+    projects = _write_logs(tmp_path, repeat=2)
+    log = Path(projects["p"]["path"]) / "app.log"
+    index = pmctl.LogIndex(tmp_path / "logindex.db")
+    assert index.search("ABCD", projects)["matches"]
+
+    # Rotatie: nieuw bestand (andere inode) met andere inhoud
+    log.rename(log.with_suffix(".log.1"))
+    log.write_text("2026-10-02T09:00:00 na de rotatie\n")
+    hits = index.search("rotatie|ABCD", projects, limit=10_000)["matches"]
+    assert [(m["project"], m["file"], m["offset"]) for m in hits] == _plain_grep(projects, "rotatie|ABCD")
+    assert hits[0]["text"] == "2026-10-02T09:00:00 na de rotatie"
+
+    # Afkappen: zelfde inode, kleiner bestand
+    log.write_text("kort\n")
+    hits = index.search("kort|rotatie", projects)["matches"]
+    assert [(m["file"], m["offset"], m["text"]) for m in hits] == [("app.log", 0, "kort")]
+
+
+def test_log_index_resets_after_copytruncate_and_regrow(tmp_path, small_blocks):
+    projects = _write_logs(tmp_path, repeat=2)
+    log = Path(projects["p"]["path"]) / "app.log"
+    index = pmctl.LogIndex(tmp_path / "logindex.db")
+    old_size = log.stat().st_size
+    assert index.search("ABCD", projects)["matches"]
+
+    # copytruncate: zelfde inode, afgekapt en vóór de volgende zoekopdracht voorbij de oude offset
+    with open(log, "r+") as f:
+        f.truncate(0)
+        f.write("".join(f"2026-10-02T09:{i % 60:02d}:00 nieuw {i}\n" for i in range(80)))
+    assert log.stat().st_size > old_size
+    hits = index.search("nieuw|ABCD", projects, limit=10_000)["matches"]
+    assert [(m["project"], m["file"], m["offset"]) for m in hits] == _plain_grep(projects, "nieuw|ABCD")
+    assert sum(m["file"] == "app.log" for m in hits) == 80
+
+
+def test_log_index_since(tmp_path):
+    project = tmp_path / "proj"
+    project.mkdir()
+    lines = [f"2026-10-01T10:{m:02d}:00 tick {m}" for m in range(60)]
+    (project / "app.log").write_text("\n".join(lines) + "\n")
+    since = pmctl._line_timestamp("2026-10-01T10:45:00")
+    result = pmctl.LogIndex(tmp_path / "logindex.db").search("tick", {"p": {"path": str(project)}}, since=since)
+    assert [m["text"] for m in result["matches"]] == lines[45:]
+
+
+# ── API ───────────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def api():
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    web = pmctl.build_fastapi_app()
+    collector = web.state.collector
+    # Vaste toestand in plaats van de collectorthreads (geen lifespan)
+    collector._projects = {f"p{i}": {} for i in range(5)}
+    collector._state = {f"p{i}": {"name": f"p{i}", "status": "stopped", "category": "agent"} for i in range(5)}
+    collector.version = 1
+    yield TestClient(web)
+    collector.stop()
+
+
+@pytest.mark.parametrize("limit", [0, -1, pmctl.PAGE_MAX + 1])
+def test_projects_limit_out_of_bounds(api, limit):
+    r = api.get("/api/projects", params={"fields": "status", "limit": limit})
+    assert r.status_code == 400
+    assert "limit" in r.json()["error"]
+
+
+def test_projects_pages_with_cursor(api):
+    seen, cursor = [], None
+    while True:
+        params = {"fields": "status", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = api.get("/api/projects", params=params).json()
+        assert len(body["projects"]) <= 2
+        seen += list(body["projects"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"p{i}" for i in range(5)]
+
+
+def test_projects_invalid_cursor(api):
+    assert api.get("/api/projects", params={"fields": "status", "limit": 2, "cursor": "!!"}).status_code == 400
+
+
+def test_projects_etag_differs_per_encoding(api):
+    plain = api.get("/api/projects", headers={"Accept-Encoding": "identity"})
+    gz = api.get("/api/projects", headers={"Accept-Encoding": "gzip"})
+    assert plain.headers["etag"] != gz.headers["etag"]
+    assert gz.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in plain.headers["vary"]
+    # Elke ETag valideert alleen de eigen codering
+    assert api.get("/api/projects", headers={"Accept-Encoding": "gzip",
+                                             "If-None-Match": gz.headers["etag"]}).status_code == 304
+    assert api.get("/api/projects", headers={"Accept-Encoding": "gzip",
+                                             "If-None-Match": plain.headers["etag"]}).status_code == 200
+    delta = api.get("/api/projects", params={"since": 0}, headers={"Accept-Encoding": "identity"})
+    assert delta.headers["etag"] not in (plain.headers["etag"], gz.headers["etag"])
+
+
+def test_tokens_endpoint_reads_new_log_lines(api, tmp_path, monkeypatch):
+    project = tmp_path / "proj"
+    project.mkdir()
+    (project / "agent.log").write_text('{"total_tokens": 5000}\n')
+    projects_file = tmp_path / "projects.json"
+    projects_file.write_text(json.dumps({"projects": {"p0": {"path": str(project)}}}))
+    monkeypatch.setattr(pmctl, "config", pmctl.ConfigStore(projects_file))
+    monkeypatch.setattr(pmctl, "token_tracker", pmctl.TokenUsageTracker(tmp_path / "offsets.json"))
+    monkeypatch.setattr(pmctl, "token_series", pmctl.TokenSeries(tmp_path / "series.json"))
+
+    # Eerste scan is backfill (geen tijdstip = oud); daarna telt een nieuwe regel als "nu"
+    assert api.get("/api/projects/p0/tokens").json()["total"] == 0
+    with open(project / "agent.log", "a") as f:
+        f.write('{"total_tokens": 42}\n')
+    assert api.get("/api/projects/p0/tokens", params={"range": "1h", "step": "5m"}).json()["total"] == 42
+    # En de collector wordt weer gevraagd
+    assert api.app.state.collector._wanted("tokens", time.monotonic())
+
+
+def test_collector_delta_sends_removed_fields():
+    collector = pmctl.ProjectCollector()
+    collector._projects = {"p": {"path": "/tmp"}}
+    collector._fields["processes"] = {"p": {"status": "running", "processes": [{"pid": 1}]}}
+    collector._rebuild()
+    version = collector.version
+
+    collector._fields["processes"] = {"p": {"status": "stopped"}}
+    collector._rebuild()
+    _, changed, removed = collector.changes_since(version)
+    assert changed == {"p": {"status": "stopped", "processes": None}}
+    assert removed == []
+    collector.stop()
+
+
+def test_collector_since_from_another_server_gets_full_snapshot():
+    old = pmctl.ProjectCollector()
+    old._projects = {"p": {}}
+    for status in ("running", "stopped", "running"):
+        old._fields["processes"] = {"p": {"status": status}}
+        old._rebuild()
+    old.stop()
+
+    # Herstart: de nieuwe server begint later en kent de versie van de client niet
+    time.sleep(0.01)
+    new = pmctl.ProjectCollector()
+    new._projects = {"p": {}}
+    new._fields["processes"] = {"p": {"status": "stopped"}}
+    new._rebuild()
+    assert new.version > old.version
+    assert new.changes_since(old.version) is None
+    assert new.changes_since(new.version + 5) is None
+    assert new.changes_since(new.version) == (new.version, {}, [])
+    new.stop()
+
+
+def test_etag_is_not_reused_after_restart(api):
+    first = api.get("/api/projects", headers={"Accept-Encoding": "identity"})
+    assert api.get("/api/projects", headers={"Accept-Encoding": "identity",
+                                             "If-None-Match": first.headers["etag"]}).status_code == 304
+    # Zelfde versienummer in een nieuw proces (ander tijdperk): geen valse 304
+    api.app.state.collector.epoch += 1
+    again = api.get("/api/projects", headers={"Accept-Encoding": "identity", "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 200
+    assert again.headers["etag"] != first.headers["etag"]
+
+
+# ── Toestandsbestanden ────────────────────────────────────────────────────────
+
+def test_write_atomic_leaves_no_tmp(tmp_path):
+    target = tmp_path / "state" / "x.json"
+    pmctl._write_atomic(target, "{}")
+    pmctl._write_atomic(target, '{"a":1}')
+    assert json.loads(target.read_text()) == {"a": 1}
+    assert [p.name for p in target.parent.iterdir()] == ["x.json"]
+
+
+def test_config_store_concurrent_puts_keep_every_edit(tmp_path):
+    store = pmctl.ConfigStore(tmp_path / "projects.json")
+    store.save({})
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(lambda i: store.put(f"p{i}", {"path": f"/tmp/p{i}"}), range(50)))
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(lambda i: store.delete(f"p{i}"), range(0, 50, 2)))
+    on_disk = json.loads((tmp_path / "projects.json").read_text())["projects"]
+    assert sorted(on_disk) == sorted(f"p{i}" for i in range(1, 50, 2))
+    assert [p.name for p in tmp_path.iterdir()] == ["projects.json"]
+
+
+def test_sqlite_config_store_syncs_changes_between_instances(tmp_path):
+    writer = pmctl.SqliteConfigStore(tmp_path / "projects.db")
+    reader = pmctl.SqliteConfigStore(tmp_path / "projects.db")
+    writer.save({"a": {"category": "agent", "ports": [8000]}, "b": {"category": "web"}})
+    assert reader.load() == {"a": {"category": "agent", "ports": [8000]}, "b": {"category": "web"}}
+    version = reader.version
+
+    # Niets veranderd: geen nieuwe versie
+    assert reader.load() == writer.load()
+    assert reader.version == version
+
+    writer.put("c", {"category": "agent"})
+    writer.put("a", {"category": "agent", "ports": [8001]})
+    assert writer.delete("b")
+    assert not writer.delete("bestaat-niet")
+    assert reader.load() == {"a": {"category": "agent", "ports": [8001]}, "c": {"category": "agent"}}
+    assert reader.version == version + 1
+
+    # Verwijderd en daarna opnieuw toegevoegd tussen twee loads
+    writer.delete("c")
+    writer.put("c", {"category": "web"})
+    assert reader.load()["c"] == {"category": "web"}
+
+    # save() vervangt de hele set en verwijdert wat ontbreekt
+    writer.save({"c": {"category": "web"}})
+    assert reader.load() == {"c": {"category": "web"}}
+
+
+def test_sqlite_config_store_queries(tmp_path):
+    store = pmctl.SqliteConfigStore(tmp_path / "projects.db")
+    store.save({
+        "a": {"category": "agent", "ports": [8000, 8001], "services": ["redis"]},
+        "b": {"category": "agent", "ports": [9000]},
+        "c": {"category": "web", "services": ["postgres"]},
+    })
+    other = pmctl.SqliteConfigStore(tmp_path / "projects.db")
+    assert list(other.query(category="agent")) == ["a", "b"]
+    assert list(other.query(category="web", names=["a", "c"])) == ["c"]
+    assert other.get("b") == {"category": "agent", "ports": [9000]}
+    assert other.get("x") is None
+    assert set(other.on_ports({8001}, set())) == {"a"}
+    assert set(other.on_ports({9000}, {"postgres"})) == {"b", "c"}
+    assert other.on_ports(set(), set()) == {}
+
+    # De poort- en service-indexen volgen put en delete
+    store.put("a", {"category": "web", "ports": [9000]})
+    store.delete("c")
+    assert set(other.on_ports({8000, 8001}, {"redis", "postgres"})) == set()
+    assert set(other.on_ports({9000}, set())) == {"a", "b"}
+    assert list(other.query(category="web")) == ["a"]
+
+
+def test_session_lookup_does_not_rewrite_unchanged_session(tmp_path):
+    pytest.importorskip("psutil")
+    proc = subprocess.Popen(["sleep", "30"], start_new_session=True)
+    try:
+        registry = pmctl.SessionRegistry(tmp_path / "sessions.json")
+        created = pmctl.psutil.Process(proc.pid).create_time()
+        registry._sessions = {"p": {"sid": proc.pid, "members": {str(proc.pid): created},
+                                    "started_at": 0, "scanned_at": 0}}
+        registry._save()
+        before = registry.path.stat().st_mtime_ns
+        time.sleep(0.01)
+        assert list(registry.lookup("p")) == [proc.pid]  # opnieuw opgemeten (scanned_at is oud)…
+        assert registry.path.stat().st_mtime_ns == before  # …maar niets veranderd, dus niet herschreven
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+# ── CPU-metingen ──────────────────────────────────────────────────────────────
+
+def test_first_cpu_sample_is_unmeasured_for_the_collector():
+    pytest.importorskip("psutil")
+    me = pmctl.psutil.Process()
+    cache = pmctl.ProcessCache()
+    assert cache.cpu_percent(me, lifetime=False) is None
+    assert isinstance(cache.cpu_percent(me, lifetime=False), float)
+    # CLI: eenmalige weergave mag het gemiddelde sinds de start tonen
+    assert isinstance(pmctl.ProcessCache().cpu_percent(me), float)
+
+
+def test_unmeasured_cpu_stays_out_of_archive(tmp_path):
+    archive = pmctl.MetricsArchive(tmp_path / "metrics.db")
+    running = {"status": "running", "memory_mb": 10.0}
+    archive.add(1000.0, {"p": {**running, "cpu_percent": None}})
+    archive.add(1001.0, {"p": {**running, "cpu_percent": None}})  # nog steeds ongemeten
+    assert archive._pending == {}
+    archive.add(1002.0, {"p": {**running, "cpu_percent": 50.0}})
+    (row,) = archive._pending.values()
+    assert row[:3] == [1.0, 1.0, 0.5]
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+_PROM_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+_PROM_LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\\n]|\\[\\"n])*)"(,|$)')
+
+
+def _parse_prometheus(text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Minimale parser voor het tekstformaat 0.0.4: {familie: {help, type, samples}}.
+    Faalt op alles wat een echte scraper zou afwijzen of verkeerd zou lezen.
+    """
+    families: Dict[str, Dict[str, Any]] = {}
+    current = None
+    assert text.endswith("\n")
+    for line in text[:-1].split("\n"):
+        if line.startswith("# HELP ") or line.startswith("# TYPE "):
+            kind, name, rest = line[2:6], *line[7:].split(" ", 1)
+            fam = families.setdefault(name, {"help": None, "type": None, "samples": []})
+            assert not fam["samples"], f"{kind} van {name} na de samples"
+            assert fam[kind.lower()] is None, f"dubbele {kind} voor {name}"
+            fam[kind.lower()] = rest
+            current = name
+            continue
+        m = _PROM_SAMPLE.match(line)
+        assert m, f"ongeldige regel: {line!r}"
+        name, raw_labels, value = m.groups()
+        family = name
+        if current and families[current]["type"] == "histogram" and name in (
+                f"{current}_bucket", f"{current}_sum", f"{current}_count"):
+            family = current
+        assert family == current, f"{name} hoort niet bij familie {current} (familie twee keer of zonder HELP/TYPE)"
+        labels, pos = {}, 0
+        while raw_labels and pos < len(raw_labels):
+            lm = _PROM_LABEL.match(raw_labels, pos)
+            assert lm, f"ongeldige labels: {raw_labels!r}"
+            labels[lm.group(1)] = re.sub(r"\\(.)", lambda e: "\n" if e.group(1) == "n" else e.group(1), lm.group(2))
+            pos = lm.end()
+        families[family]["samples"].append((name, labels, float(value)))
+    for name, fam in families.items():
+        assert fam["help"] is not None and fam["type"] is not None, name
+    return families
+
+
+def _check_histograms(families: Dict[str, Dict[str, Any]]):
+    for name, fam in families.items():
+        if fam["type"] != "histogram":
+            continue
+        series: Dict[tuple, Dict[str, Any]] = {}
+        for sample, labels, value in fam["samples"]:
+            key = tuple(sorted((k, v) for k, v in labels.items() if k != "le"))
+            entry = series.setdefault(key, {"buckets": [], "count": None})
+            if sample.endswith("_bucket"):
+                entry["buckets"].append((float(labels["le"]), value))
+            elif sample.endswith("_count"):
+                entry["count"] = value
+        assert series, name
+        for key, entry in series.items():
+            bounds = [b for b, _ in entry["buckets"]]
+            counts = [n for _, n in entry["buckets"]]
+            assert bounds == sorted(bounds) and bounds[-1] == float("inf"), key
+            assert counts == sorted(counts), f"{name}{key}: buckets niet cumulatief"
+            assert counts[-1] == entry["count"], f"{name}{key}: +Inf ≠ _count"
+
+
+def _ring_bytes(ring) -> int:
+    arrays = [ring.buckets, ring.counts, *ring.sums.values()]
+    return sum(a.itemsize * len(a) for a in arrays)
+
+
+def test_history_has_fixed_size_per_project():
+    history = pmctl.MetricsHistory()
+    t0 = 1_700_000_000
+    history.record("p", t0, {"cpu": 1.0, "rss": 10.0, "procs": 1, "ports": 0})
+    size = sum(_ring_bytes(r) for r in history._rings["p"])
+    assert size == pmctl.HISTORY_BYTES_PER_PROJECT
+    # Acht dagen aan metingen (langer dan de grofste resolutie bewaart): groeit niet
+    for ts in range(t0, t0 + 8 * 86400, 30):
+        history.record("p", ts, {"cpu": 2.0, "rss": 20.0, "procs": 2, "ports": 1})
+    assert sum(_ring_bytes(r) for r in history._rings["p"]) == size
+    week = history.query("p", 7 * 86400, now=t0 + 8 * 86400)
+    assert week["step"] == 60 and len(week["cpu"]) == 10080
+
+
+def test_project_metrics_text_format():
+    state = {
+        "a": {"status": "running", "category": 'x"y\\z\nw', "memory_mb": 2, "cpu_percent": 1.5,
+              "pid_count": 3, "open_ports": [8000], "disk_bytes": 4096, "token_usage": 10},
+        "b": {"status": "stopped", "category": "agent", "disk_bytes": None},
+    }
+    families = _parse_prometheus(pmctl._project_metrics(state))
+    assert families["pmctl_project_up"]["type"] == "gauge"
+    assert families["pmctl_project_tokens"]["type"] == "gauge"
+    up = {l["project"]: (l["category"], v) for _, l, v in families["pmctl_project_up"]["samples"]}
+    # Labelwaarden komen na het unescapen ongewijzigd terug
+    assert up == {"a": ('x"y\\z\nw', 1.0), "b": ("agent", 0.0)}
+    assert families["pmctl_project_memory_bytes"]["samples"][0][2] == 2 * 1024 * 1024
+    # Onbekend schijfgebruik wordt weggelaten, niet als 0 gerapporteerd
+    assert [l["project"] for _, l, _ in families["pmctl_project_disk_bytes"]["samples"]] == ["a"]
+
+
+def test_histogram_is_cumulative():
+    h = pmctl._Histogram((0.1, 1.0))
+    for v in (0.05, 0.5, 5.0):
+        h.observe(v)
+    assert h.counts == [1, 2]
+    assert h.count == 3
+    assert h.sum == pytest.approx(5.55)
+
+
+def test_metrics_endpoint(api):
+    collector = api.app.state.collector
+    collector._state['we"ird\\naam'] = {"status": "running", "category": "a\nb", "memory_mb": 1}
+    for v in (0.003, 0.02, 0.02, 0.7, 99.0):
+        collector._durations["processes"].observe(v)
+    collector._durations["disk"].observe(1.5)
+    collector._last_run["processes"] = time.time()
+
+    r = api.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    families = _parse_prometheus(r.text)
+    _check_histograms(families)
+
+    projects = {l["project"]: l["category"] for _, l, _ in families["pmctl_project_up"]["samples"]}
+    assert projects['we"ird\\naam'] == "a\nb"
+    assert set(projects) == set(collector._state)
+    count = {l["collector"]: v for n, l, v in families["pmctl_collector_duration_seconds"]["samples"]
+             if n.endswith("_count")}
+    assert count["processes"] == 5 and count["disk"] == 1
+    assert families["pmctl_state_version"]["samples"] == [("pmctl_state_version", {}, 1.0)]